@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import json, random, os, time, shutil, base64, sys
+import json, random, os, time, shutil, base64, sys, threading, struct, contextvars, atexit, select
+from array import array
+from collections import deque
 from pathlib import Path
-from datetime import datetime
 from colorama import Fore, Back, Style, init
+import strategia, probabilita, halloffame
+from layout import Blocco, affianca, riga_centrata
 
 init(autoreset=True)  # Inizializza colorama
 
@@ -14,13 +17,31 @@ init(autoreset=True)  # Inizializza colorama
 NUM_MAZZI = 8
 CUT_PERCENT = 0.5
 SALVA_FILE = Path(__file__).parent / "blackjack_save.dat"   # cifrato
-HALL_OF_FAME_FILE = Path(__file__).parent / "blackjack_hof.txt"
+GIORNALE_FILE = Path(__file__).parent / "blackjack_save.log"  # azioni dopo l'ultimo snapshot
+HALL_OF_FAME_FILE = halloffame.TESTO_FILE  # Vecchio formato testuale, importato una volta nel database
+HALL_OF_FAME_DB = halloffame.DB_FILE
 MAX_GIOCATORI_TAVOLO = 5
 MAX_CPU_GLOBALI = 20
-DIFFICOLTA_CPU = ["cauta", "equilibrata", "aggressiva"]
+DIFFICOLTA_CPU = ["cauta", "equilibrata", "aggressiva", "base", "contatore"]
+STRATEGIA_BASE = ("base", "contatore")  # Profili che giocano la strategia base ottimale
+STATS_CHIAVI = ("mani", "vittorie", "sconfitte", "pareggi", "sballi", "blackjacks", "guadagno",
+                "doubles", "splits", "surrenders", "assicurazioni_vinte")
 BANCO_START_BANKROLL = 10_000
 START_SALDO = 500
 MAX_SPLIT = 4  # Massimo numero di mani dopo split
+FORMATO_SALVATAGGIO = "binario"  # "binario" (compatto, versionato) o "json" (JSON + XOR + base64)
+MODALITA_SALVATAGGIO = "giornale"  # "giornale" (azioni in append) o "asincrono" (snapshot coalescenti)
+SNAPSHOT_OGNI_MANI = 20  # In modalità giornale: snapshot completo + compattazione ogni N mani
+SALVA_INTERVALLO = 2.0  # Secondi massimi di stato non salvato (salvataggio asincrono)
+MOSTRA_PROBABILITA_BANCO = True  # Suggerimento al giocatore: esiti possibili del banco
+CONTEGGIO_PER_DIFFICOLTA = {"contatore": "hilo"}  # CPU che variano la puntata col true count
+VERBOSO = True  # False = modalità headless (niente output, niente pause)
+MOSTRA_STATISTICHE_RENDER = False  # Byte e ms dell'ultimo frame del tavolo in fondo alla vista
+# Velocità delle animazioni: fattore sulle pause. Fuori da "realistica" le azioni
+# delle CPU non vengono stampate una a una ma riassunte a fine turno.
+VELOCITA_PRESET = {"realistica": 1.0, "veloce": 0.3, "istantanea": 0.0}
+VELOCITA = "realistica"
+REGISTRO_MAX_RIGHE = 5000  # Righe del registro completo delle azioni riassunte
 
 # Nomi reali
 NOMI_REALI = [
@@ -35,6 +56,26 @@ NOMI_REALI = [
 SEMI = ['♠', '♥', '♦', '♣']
 VALORI = {str(i): i for i in range(2, 11)} | {'J': 10, 'Q': 10, 'K': 10, 'A': 11}
 
+# Carte codificate come interi 0..51: rango * 4 + seme (stesso ordine di VALORI x SEMI).
+# Il motore lavora solo sugli interi; le stringhe "A♠" servono per grafica e salvataggio.
+NOMI_CARTE = tuple(f"{v}{s}" for v in VALORI for s in SEMI)
+RANGO_CARTA = tuple(v for v in VALORI for _ in SEMI)
+SEME_CARTA = tuple(s for _ in VALORI for s in SEMI)
+VALORE_CARTA = tuple(VALORI[v] for v in RANGO_CARTA)
+E_ASSO = tuple(1 if v == 'A' else 0 for v in RANGO_CARTA)
+CARTA_DA_NOME = {n: i for i, n in enumerate(NOMI_CARTE)}
+# Valore per i conteggi del sabot: 1 = Asso, 2..9, 10 = 10/J/Q/K
+VALORE_CONTEGGIO = tuple(1 if a else v for v, a in zip(VALORE_CARTA, E_ASSO))
+_TRADUCI_VALORE = bytes(VALORE_CONTEGGIO) + bytes(256 - len(VALORE_CONTEGGIO))
+INDICE_SCOPERTA = tuple(strategia.indice_scoperta(1 if a else v) for v, a in zip(VALORE_CARTA, E_ASSO))
+
+# Generatore casuale del gioco. Tutta la casualità passa da qui (o dall'rng
+# del singolo Mazzo), così le simulazioni sono riproducibili dato un seed.
+rng = random.Random()
+
+def imposta_seed(seed):
+    rng.seed(seed)
+
 # Chiave semplice per XOR (puoi cambiarla)
 SAVE_KEY = "blackjack_secure_key_v1"
 
@@ -43,16 +84,216 @@ SAVE_KEY = "blackjack_secure_key_v1"
 # ===============================
 
 def clear_screen():
-    os.system("cls" if os.name == "nt" else "clear")
+    # Sequenza ANSI invece di os.system("clear"): niente processo figlio
+    renderer.chiudi()
+    sys.stdout.write("\x1b[2J\x1b[H")
+    sys.stdout.flush()
+
+def imposta_verboso(attivo):
+    global VERBOSO
+    VERBOSO = attivo
+
+def out(*args, **kwargs):
+    if VERBOSO:
+        if ritmo.in_raccolta():
+            ritmo.annota(" ".join(map(str, args)))
+            return
+        print(*args, **kwargs)
+
+def attendi(secondi):
+    if VERBOSO:
+        ritmo.attendi(secondi)
+
+def out_carte(mano):
+    # Il rendering ASCII costa: in headless non viene nemmeno costruito
+    if VERBOSO:
+        if ritmo.in_raccolta():
+            ritmo.annota(" ".join(nomi_carte(mano)))
+            return
+        print(mostra_carte_ascii(mano))
+
+def _invio_premuto(secondi):
+    # Attende fino a `secondi`; True se nel frattempo è stato premuto Invio.
+    # Con l'input da pipe non legge nulla: le risposte sono per i prompt.
+    if not sys.stdin.isatty():
+        time.sleep(secondi)
+        return False
+    if os.name == "nt":
+        import msvcrt
+        fine = time.monotonic() + secondi
+        while time.monotonic() < fine:
+            if msvcrt.kbhit():
+                while msvcrt.kbhit():
+                    msvcrt.getwch()
+                return True
+            time.sleep(0.02)
+        return False
+    pronto, _, _ = select.select([sys.stdin], [], [], secondi)
+    if pronto:
+        sys.stdin.readline()
+    return bool(pronto)
+
+class Ritmo:
+    # Scheduler delle pause del gioco. Invio durante un'animazione salta tutte
+    # le pause fino al prossimo prompt del giocatore umano ("salta al mio turno").
+    # Durante il turno di una CPU raggruppato le righe finiscono nel registro e
+    # a video va solo il riepilogo.
+    def __init__(self, velocita=VELOCITA):
+        self.imposta(velocita)
+        self.salta = False
+        self.registro = deque(maxlen=REGISTRO_MAX_RIGHE)
+        self.mano = []  # Righe raccolte nella mano in corso
+        self._azioni = None  # Indice mano -> azioni della CPU di turno
+
+    def imposta(self, velocita):
+        if velocita not in VELOCITA_PRESET:
+            raise ValueError(f"Velocità sconosciuta: {velocita}")
+        self.velocita = velocita
+        self.fattore = VELOCITA_PRESET[velocita]
+
+    def raggruppa(self):
+        return self.fattore < 1.0 or self.salta
+
+    def in_raccolta(self):
+        return self._azioni is not None
+
+    def attendi(self, secondi):
+        if self.salta or self._azioni is not None:
+            return
+        secondi *= self.fattore
+        if secondi > 0 and _invio_premuto(secondi):
+            self.salta = True
+
+    def prompt(self):
+        # Il giocatore umano deve decidere: le pause tornano normali
+        self.salta = False
+
+    def nuova_mano(self):
+        self.mano = []
+
+    def annota(self, riga):
+        self.mano.append(riga)
+        self.registro.append(riga)
+
+    def inizia_cpu(self):
+        self._azioni = {}
+
+    def azione(self, i, verbo):
+        if self._azioni is not None:
+            self._azioni.setdefault(i, []).append(verbo)
+
+    def fine_cpu(self, g):
+        azioni, self._azioni = self._azioni, None
+        parti = []
+        for i, m in enumerate(g.mani):
+            esito = ", ".join(azioni.get(i, ()))
+            if m.blackjack:
+                esito = "Blackjack"
+            elif m.punteggio > 21:
+                esito = f"{esito}, sballa" if esito else "sballa"
+            parti.append(f"{' '.join(nomi_carte(m))} ({m.punteggio}){': ' + esito if esito else ''}")
+        return f"🤖 {g.nome}: " + " | ".join(parti)
+
+# Uno per processo, per il terminale: le mani headless (tavoli, server,
+# simulazioni) non lo toccano, nemmeno da più thread.
+ritmo = Ritmo()
+
+def imposta_velocita(velocita):
+    ritmo.imposta(velocita)
+
+def pausa_invio():
+    ritmo.prompt()
+    if not ritmo.mano:
+        input("Premi Invio per continuare...")
+        return
+    if input("Premi Invio per continuare ([L] registro delle CPU)... ").strip().lower() == "l":
+        print("\n".join(ritmo.mano))
+        input("Premi Invio per continuare...")
 
-def crea_mazzo():
-    mazzo = [f"{v}{s}" for v in VALORI for s in SEMI] * NUM_MAZZI
-    random.shuffle(mazzo)
+def _chiedi_terminale(g, testo, **contesto):
+    return input(testo)
+
+# Chi risponde alle decisioni dei giocatori umani. Di default il terminale; il
+# gestore multi-tavolo (tavoli.py) la imposta per ogni tavolo nel suo contesto.
+_chiedi = contextvars.ContextVar("chiedi", default=_chiedi_terminale)
+
+def imposta_chiedi(fn):
+    # fn(g, testo, **contesto) -> risposta testuale. contesto: tipo ("puntata",
+    # "assicurazione", "azione"), predefinito e, secondo il tipo, mano, massimo,
+    # opzioni, carta_banco.
+    _chiedi.set(fn)
+
+def chiedi(g, testo, **contesto):
+    if VERBOSO:
+        ritmo.prompt()
+    if prima_del_prompt is not None:
+        prima_del_prompt()
+    return _chiedi.get()(g, testo, **contesto)
+
+# Chiamata nel thread di gioco prima di ogni decisione umana (es.
+# SalvataggioAsincrono.al_prompt). None = nessun costo.
+prima_del_prompt = None
+
+def imposta_prima_del_prompt(fn):
+    global prima_del_prompt
+    prima_del_prompt = fn
+
+# Registratore opzionale dello storico delle mani (storico.RegistratoreMani):
+# gioca_mano lo chiama dopo le puntate e a fine mano. None = nessun costo. Come
+# _chiedi vale nel contesto corrente: ogni tavolo di tavoli.py ha il suo.
+_registratore = contextvars.ContextVar("registratore", default=None)
+
+def imposta_registratore(r):
+    _registratore.set(r)
+
+def crea_mazzo(generatore=None, num_mazzi=NUM_MAZZI):
+    mazzo = array('B', range(len(NOMI_CARTE))) * num_mazzi
+    (generatore or rng).shuffle(mazzo)
     return mazzo
 
+def nomi_carte(carte):
+    return [NOMI_CARTE[c] for c in carte]
+
+def carte_da_nomi(nomi):
+    return [CARTA_DA_NOME[n] for n in nomi]
+
+_tabelle_base = {}
+_blocco_tabelle = threading.Lock()
+
+def tabelle_strategia_base(regole=None):
+    # Calcolate (o lette dalla cache su disco) al primo uso, una volta per set di regole
+    regole = regole or REGOLE_STANDARD
+    tabelle = _tabelle_base.get(regole.chiave)
+    if tabelle is None:
+        with _blocco_tabelle:  # Tavoli in più thread: un solo calcolo e una sola scrittura del file
+            tabelle = _tabelle_base.get(regole.chiave)
+            if tabelle is None:
+                tabelle = _tabelle_base[regole.chiave] = strategia.carica_tabelle(
+                    regole.num_mazzi, regole.max_split, **regole.parametri_strategia())
+    return tabelle
+
+def composizione_sabot_iniziale(regole=None):
+    return (regole or REGOLE_STANDARD).composizione_iniziale
+
+def composizione_non_vista(mazzo, banco=None):
+    # Carte non ancora viste dal giocatore, per valore: sabot residuo + carta coperta del banco
+    conteggi = list(mazzo.conteggi)
+    if banco is not None and len(banco) > 1:
+        conteggi[VALORE_CONTEGGIO[banco[1]] - 1] += 1
+    return conteggi
+
+def probabilita_banco(mazzo, banco):
+    # Distribuzione esatta dei totali finali del banco dalla sua carta scoperta.
+    # Con l'Asso scoperto il Blackjack del banco è già stato escluso.
+    scoperta = VALORE_CONTEGGIO[banco[0]]
+    return probabilita.distribuzione_banco(scoperta, composizione_non_vista(mazzo, banco),
+                                           senza_blackjack=scoperta == 1, h17=mazzo.regole.banco_h17)
+
 def calcola_punteggio(mano):
-    tot = sum(VALORI[c[:-1]] for c in mano)
-    assi = sum(1 for c in mano if c.startswith("A"))
+    if type(mano) is Mano:
+        return mano.punteggio
+    tot = sum(map(VALORE_CARTA.__getitem__, mano))
+    assi = sum(map(E_ASSO.__getitem__, mano))
     while tot > 21 and assi:
         tot -= 10
         assi -= 1
@@ -61,52 +302,41 @@ def calcola_punteggio(mano):
 def get_color(seme):
     return Fore.RED if seme in '♥♦' else Fore.BLACK
 
-def carta_ascii_lines(carta, coperta=False):
-    if coperta:
-        bg = Back.BLUE + Fore.WHITE
-        return [
-            f"{bg}+-----+" + Style.RESET_ALL,
-            f"{bg}|#####|" + Style.RESET_ALL,
-            f"{bg}|#####|" + Style.RESET_ALL,
-            f"{bg}|#####|" + Style.RESET_ALL,
-            f"{bg}+-----+" + Style.RESET_ALL
-        ]
-    valore = ''.join(ch for ch in carta if ch not in SEMI)
-    seme = ''.join(ch for ch in carta if ch in SEMI)
+def _disegna_carta(carta):
+    valore = RANGO_CARTA[carta]
+    seme = SEME_CARTA[carta]
     color = get_color(seme)
     bg = Back.WHITE  # Sfondo bianco per tutte le carte
-    return [
+    return (
         f"{bg}{color}+-----+{Style.RESET_ALL}",
         f"{bg}{color}|{valore:<2}   |{Style.RESET_ALL}",
         f"{bg}{color}|  {seme}  |{Style.RESET_ALL}",
         f"{bg}{color}|   {valore:>2}|{Style.RESET_ALL}",
-        f"{bg}{color}+-----+{Style.RESET_ALL}"
-    ]
+        f"{bg}{color}+-----+{Style.RESET_ALL}",
+    )
 
-def mostra_carte_ascii(mano, coperta=False):
+# Le 52 facce e il dorso, disegnati una volta sola: le righe sono immutabili e condivise
+CARTE_ASCII = tuple(_disegna_carta(c) for c in range(len(NOMI_CARTE)))
+DORSO_ASCII = tuple(f"{Back.BLUE + Fore.WHITE}{riga}{Style.RESET_ALL}"
+                    for riga in ("+-----+", "|#####|", "|#####|", "|#####|", "+-----+"))
+ALTEZZA_CARTA = len(DORSO_ASCII)
+
+def carta_ascii_lines(carta, coperta=False):
+    return DORSO_ASCII if coperta else CARTE_ASCII[carta]
+
+LARGHEZZA_CARTA = 9  # 7 colonne di carta + 2 di spazio
+
+def blocco_carte(mano, coperta=False):
+    # Larghezza nota dal numero di carte: nessuna misura delle righe colorate
     if not mano:
-        return "[vuoto]"
-    righe = ["", "", "", "", ""]
-    carte = mano if not coperta else mano[:-1] + ["COPERTA"]
-    for c in carte:
-        blocco = carta_ascii_lines(c, coperta=(c == "COPERTA"))
-        for i in range(5):
-            righe[i] += blocco[i] + "  "
-    return "\n".join(righe)
-
-def block_width(text):
-    return max(len(r) for r in text.split("\n")) if text else 0
-
-def center_text_line(line, width):
-    pad = max(0, (width - len(line)) // 2)
-    return " " * pad + line
-
-def print_centered_block(text, cols):
-    lines = text.split("\n")
-    w = block_width(text)
-    pad = max(0, (cols - w) // 2)
-    for ln in lines:
-        print(" " * pad + ln)
+        return Blocco(("[vuoto]",))
+    blocchi = [CARTE_ASCII[c] for c in mano]
+    if coperta:
+        blocchi[-1] = DORSO_ASCII
+    return Blocco.uniforme(("  ".join(riga) + "  " for riga in zip(*blocchi)), LARGHEZZA_CARTA * len(mano))
+
+def mostra_carte_ascii(mano, coperta=False):
+    return "\n".join(blocco_carte(mano, coperta).righe)
 
 def fmt_euro(n):
     return f"{n:,}".replace(",", ".") + "€"
@@ -115,33 +345,219 @@ def fmt_euro(n):
 # CIFRATURA SALVATAGGIO (Base64 + XOR)
 # ===============================
 
+def xor_chiave(data, k, inizio=0):
+    # XOR con chiave ripetuta in un'unica operazione su interi grandi
+    # (stesso risultato byte per byte del vecchio ciclo per-byte).
+    # `inizio` = posizione del primo byte nel flusso, per decifrare una sezione.
+    n = len(data)
+    if not n:
+        return b""
+    inizio %= len(k)
+    flusso = (k * ((n + inizio) // len(k) + 1))[inizio:inizio + n]
+    return (int.from_bytes(data, "little") ^ int.from_bytes(flusso, "little")).to_bytes(n, "little")
+
 def encrypt_data(text, key=SAVE_KEY):
-    data = text.encode("utf-8")
-    k = key.encode("utf-8")
-    enc = bytes([b ^ k[i % len(k)] for i, b in enumerate(data)])
+    enc = xor_chiave(text.encode("utf-8"), key.encode("utf-8"))
     return base64.b64encode(enc).decode("ascii")
 
 def decrypt_data(encoded, key=SAVE_KEY):
     raw = base64.b64decode(encoded.encode("ascii"))
-    k = key.encode("utf-8")
-    dec = bytes([b ^ k[i % len(k)] for i, b in enumerate(raw)])
-    return dec.decode("utf-8")
+    return xor_chiave(raw, key.encode("utf-8")).decode("utf-8")
 
 # ===============================
 # CLASSI DI GIOCO
 # ===============================
 
+class Mano(list):
+    # Lista di carte che tiene aggiornati totale duro (assi = 1) e numero di assi
+    # a ogni append/pop, così il punteggio costa O(1) anche dopo split.
+    __slots__ = ("duro", "assi")
+
+    def __init__(self, carte=()):
+        super().__init__(carte)
+        self._ricalcola()
+    def __reduce__(self):
+        return (Mano, (list(self),))
+    def _ricalcola(self):
+        self.assi = sum(map(E_ASSO.__getitem__, self))
+        self.duro = sum(map(VALORE_CARTA.__getitem__, self)) - 10 * self.assi
+    def append(self, carta):
+        super().append(carta)
+        if E_ASSO[carta]:
+            self.duro += 1
+            self.assi += 1
+        else:
+            self.duro += VALORE_CARTA[carta]
+    def pop(self, i=-1):
+        carta = super().pop(i)
+        if E_ASSO[carta]:
+            self.duro -= 1
+            self.assi -= 1
+        else:
+            self.duro -= VALORE_CARTA[carta]
+        return carta
+    def extend(self, carte):
+        for c in carte:
+            self.append(c)
+    def __iadd__(self, carte):
+        self.extend(carte)
+        return self
+    # Mutazioni rare: ricalcolo completo
+    def __setitem__(self, i, v):
+        super().__setitem__(i, v)
+        self._ricalcola()
+    def __delitem__(self, i):
+        super().__delitem__(i)
+        self._ricalcola()
+    def insert(self, i, v):
+        super().insert(i, v)
+        self._ricalcola()
+    def remove(self, v):
+        super().remove(v)
+        self._ricalcola()
+    def clear(self):
+        super().clear()
+        self.duro = self.assi = 0
+
+    @property
+    def soft(self):
+        return self.assi > 0 and self.duro <= 11
+    @property
+    def punteggio(self):
+        return self.duro + 10 if self.assi and self.duro <= 11 else self.duro
+    @property
+    def blackjack(self):
+        return len(self) == 2 and self.assi == 1 and self.duro == 11
+    @property
+    def sballata(self):
+        return self.duro > 21
+    @property
+    def coppia(self):
+        return len(self) == 2 and RANGO_CARTA[self[0]] == RANGO_CARTA[self[1]]
+
+# ===============================
+# CONTEGGIO CARTE
+# ===============================
+
+class SistemaConteggio:
+    # valori: peso per valore di carta 1..10 (1 = Asso, 10 = 10/J/Q/K).
+    # Sistemi sbilanciati (KO) partono da un running count iniziale non nullo.
+    def __init__(self, nome, valori, bilanciato=True):
+        self.nome = nome
+        self.valori = tuple(valori)
+        self.bilanciato = bilanciato
+    def running_iniziale(self, num_mazzi):
+        return 0 if self.bilanciato else 4 - 4 * num_mazzi
+
+SISTEMI_CONTEGGIO = {}
+
+def registra_sistema_conteggio(sistema):
+    SISTEMI_CONTEGGIO[sistema.nome] = sistema
+
+#                                          A  2  3  4  5  6  7  8   9  10
+registra_sistema_conteggio(SistemaConteggio("hilo",   (-1, 1, 1, 1, 1, 1, 0, 0,  0, -1)))
+registra_sistema_conteggio(SistemaConteggio("ko",     (-1, 1, 1, 1, 1, 1, 1, 0,  0, -1), bilanciato=False))
+registra_sistema_conteggio(SistemaConteggio("omega2", ( 0, 1, 1, 2, 2, 2, 1, 0, -1, -2)))
+
+# ===============================
+# REGOLE DEL TAVOLO
+# ===============================
+
+RESA_VARIANTI = ("qualsiasi", "iniziale", "nessuna")
+
+def _banco_pesca_s17(banco):
+    return banco.punteggio < 17
+
+def _banco_pesca_h17(banco):
+    return banco.punteggio < 17 or (banco.punteggio == 17 and banco.soft)
+
+def _resa_qualsiasi(g, i):
+    return len(g.mani[i]) == 2
+
+def _resa_iniziale(g, i):
+    return len(g.mani) == 1 and len(g.mani[0]) == 2
+
+def _resa_nessuna(g, i):
+    return False
+
+_RESA = dict(zip(RESA_VARIANTI, (_resa_qualsiasi, _resa_iniziale, _resa_nessuna)))
+
+class Regole:
+    # Regole di un tavolo, legate al suo Mazzo. Le varianti sono risolte qui una
+    # volta sola (funzioni del banco e della resa, soglia di rimischio): il motore
+    # chiama direttamente la funzione scelta invece di controllare le opzioni a ogni
+    # carta. Tavoli con regole diverse convivono nello stesso processo.
+    def __init__(self, num_mazzi=NUM_MAZZI, penetrazione=CUT_PERCENT, max_split=MAX_SPLIT,
+                 banco_h17=False, pagamento_blackjack=1.5, raddoppio_dopo_split=True,
+                 risplit_assi=True, resa="qualsiasi"):
+        if resa not in _RESA:
+            raise ValueError(f"Variante di resa sconosciuta: {resa}")
+        if num_mazzi < 1 or not 0 < penetrazione <= 1:
+            raise ValueError("Numero di mazzi o penetrazione non validi.")
+        self.num_mazzi = num_mazzi
+        self.penetrazione = penetrazione
+        self.max_split = max_split
+        self.banco_h17 = banco_h17
+        self.pagamento_blackjack = pagamento_blackjack
+        self.raddoppio_dopo_split = raddoppio_dopo_split
+        self.risplit_assi = risplit_assi
+        self.resa = resa
+        self.banco_pesca = _banco_pesca_h17 if banco_h17 else _banco_pesca_s17
+        self.resa_consentita = _RESA[resa]
+        self.soglia_rimischio = int(len(NOMI_CARTE) * num_mazzi * penetrazione)
+        self.composizione_iniziale = probabilita.composizione_sabot(num_mazzi)
+        self.chiave = (num_mazzi, penetrazione, max_split, banco_h17, pagamento_blackjack,
+                       raddoppio_dopo_split, risplit_assi, resa)
+    def parametri_strategia(self):
+        # La penetrazione non cambia la strategia base
+        return {"h17": self.banco_h17, "pagamento_bj": self.pagamento_blackjack,
+                "das": self.raddoppio_dopo_split, "resa": self.resa, "risplit_assi": self.risplit_assi}
+    def descrizione(self):
+        bj = "3:2" if self.pagamento_blackjack == 1.5 else "6:5" if self.pagamento_blackjack == 1.2 \
+            else f"x{self.pagamento_blackjack:g}"
+        return (f"{self.num_mazzi} mazzi, {'H17' if self.banco_h17 else 'S17'}, BJ {bj}, "
+                f"{'DAS' if self.raddoppio_dopo_split else 'no DAS'}, resa {self.resa}, "
+                f"split fino a {self.max_split} mani{'' if self.risplit_assi else ' (Assi una volta)'}, "
+                f"penetrazione {self.penetrazione:.0%}")
+
+REGOLE_STANDARD = Regole()
+
 class Mazzo:
-    def __init__(self):
-        self.mazzo = crea_mazzo()
+    # conteggi[v-1] = carte di valore v (1 = Asso .. 10) ancora nel sabot, aggiornati
+    # a ogni pesca: running e true count costano O(1) (10 valori) senza rileggere il sabot.
+    # Le carte sono contate quando escono dal sabot: alla fase di puntata tutte le
+    # carte pescate nelle mani precedenti sono già state scoperte.
+    def __init__(self, generatore=None, regole=None):
+        self.generatore = generatore  # None = rng del modulo
+        self.regole = regole or REGOLE_STANDARD
+        self.mazzo = crea_mazzo(generatore, self.regole.num_mazzi)
         self.usate = 0
+        self.mescolate = 0
+        self.ricalcola_conteggi()
+    def ricalcola_conteggi(self):
+        # Da chiamare se self.mazzo viene sostituito (es. caricamento salvataggio)
+        valori = bytes(self.mazzo).translate(_TRADUCI_VALORE)
+        self.conteggi = [valori.count(v) for v in range(1, 11)]
     def pesca(self):
-        if self.usate >= len(self.mazzo) * CUT_PERCENT:
-            print("\n🔄 Rimischio automatico (~50% carte usate).")
-            self.mazzo = crea_mazzo()
+        if self.usate >= self.regole.soglia_rimischio:
+            out(f"\n🔄 Rimischio automatico (~{self.regole.penetrazione:.0%} carte usate).")
+            self.mazzo = crea_mazzo(self.generatore, self.regole.num_mazzi)
             self.usate = 0
+            self.mescolate += 1
+            self.ricalcola_conteggi()
         self.usate += 1
-        return self.mazzo.pop()
+        carta = self.mazzo.pop()
+        self.conteggi[VALORE_CONTEGGIO[carta] - 1] -= 1
+        return carta
+    def running_count(self, sistema="hilo"):
+        s = SISTEMI_CONTEGGIO[sistema]
+        iniziali = self.regole.composizione_iniziale
+        return s.running_iniziale(self.regole.num_mazzi) + sum(
+            peso * (tot - rimaste) for peso, tot, rimaste in zip(s.valori, iniziali, self.conteggi))
+    def mazzi_rimanenti(self):
+        return max(len(self.mazzo), 1) / len(NOMI_CARTE)
+    def true_count(self, sistema="hilo"):
+        return self.running_count(sistema) / self.mazzi_rimanenti()
 
 class Giocatore:
     def __init__(self, nome, saldo=START_SALDO, cpu=False, difficolta="equilibrata",
@@ -150,19 +566,32 @@ class Giocatore:
         self.saldo = saldo
         self.cpu = cpu
         self.difficolta = difficolta
-        self.mani = mani if mani is not None else [[]]
+        self.mani = [Mano(m) for m in mani] if mani is not None else [Mano()]
         self.puntate = puntate if puntate is not None else [0]
         self.assicurazioni = assicurazioni if assicurazioni is not None else [0]
-        self.stats = stats or {
-            "mani": 0, "vittorie": 0, "sconfitte": 0,
-            "pareggi": 0, "sballi": 0, "blackjacks": 0, "guadagno": 0,
-            "doubles": 0, "splits": 0, "surrenders": 0, "assicurazioni_vinte": 0
-        }
+        self.vincite = []  # Netto di ogni mano, scritto da applica_risultati_e_bankroll
+        self.stats = stats or dict.fromkeys(STATS_CHIAVI, 0)
+        self.generatore = None  # Casualità delle decisioni CPU: None = rng del modulo, un Tavolo dà la sua
     def reset(self):
-        self.mani = [[]]
+        self.mani = [Mano()]
         self.puntate = [0]
         self.assicurazioni = [0]
-    def decide_pesca(self, punteggio):
+    # Politiche CPU: carta_banco è la carta scoperta del banco (intero 0..51),
+    # mano la Mano in gioco, regole le Regole del tavolo. I profili a soglie li
+    # ignorano; "base", "contatore" (strategia base + puntate col conteggio Hi-Lo)
+    # e le politiche personalizzate (sottoclassi di Giocatore) possono usarli.
+    def decide_puntata(self, mazzo=None):
+        sistema = CONTEGGIO_PER_DIFFICOLTA.get(self.difficolta)
+        if sistema and mazzo is not None:
+            # 10€ a conteggio neutro o negativo, poi 10€ per punto di true count (max 80€)
+            unita = max(1, min(8, int(mazzo.true_count(sistema))))
+            return min(10 * unita, self.saldo)
+        scelte = [x for x in [10, 20, 50] if x <= self.saldo]
+        return (self.generatore or rng).choice(scelte) if scelte else 0
+    def decide_pesca(self, punteggio, carta_banco=None, mano=None, regole=None):
+        if self.difficolta in STRATEGIA_BASE:
+            soft = 1 if mano is not None and mano.soft else 0
+            return tabelle_strategia_base(regole)["pesca"][soft][punteggio][INDICE_SCOPERTA[carta_banco]]
         if self.difficolta == "cauta":
             soglia = 15
         elif self.difficolta == "aggressiva":
@@ -170,97 +599,526 @@ class Giocatore:
         else:
             soglia = 17
         return punteggio < soglia
-    def decide_double(self, punteggio):
+    def decide_double(self, punteggio, carta_banco=None, mano=None, regole=None):
+        if self.difficolta in STRATEGIA_BASE:
+            soft = 1 if mano is not None and mano.soft else 0
+            return tabelle_strategia_base(regole)["due_carte"][soft][punteggio][INDICE_SCOPERTA[carta_banco]] == "D"
         if self.difficolta == "cauta":
             return punteggio in [9, 10, 11]
         elif self.difficolta == "aggressiva":
             return punteggio in [8, 9, 10, 11, 12]
         else:
             return punteggio in [9, 10, 11]
-    def decide_split(self, valore):
+    def decide_split(self, valore, carta_banco=None, regole=None):
+        if self.difficolta in STRATEGIA_BASE:
+            v = 1 if valore == 'A' else VALORI[valore]
+            return tabelle_strategia_base(regole)["split"][v][INDICE_SCOPERTA[carta_banco]]
         if self.difficolta == "cauta":
             return valore in ['A', '8']
         elif self.difficolta == "aggressiva":
             return valore in ['A', '2', '3', '6', '7', '8', '9']
         else:
             return valore in ['A', '8', '9']
-    def decide_surrender(self, punteggio):
+    def decide_surrender(self, punteggio, carta_banco=None, mano=None, regole=None):
+        if self.difficolta in STRATEGIA_BASE:
+            # La resa viene chiesta prima dello split: non arrendersi con una coppia da dividere
+            if mano is not None and mano.coppia and self.decide_split(RANGO_CARTA[mano[0]], carta_banco, regole):
+                return False
+            soft = 1 if mano is not None and mano.soft else 0
+            return tabelle_strategia_base(regole)["due_carte"][soft][punteggio][INDICE_SCOPERTA[carta_banco]] == "R"
         if self.difficolta == "cauta":
             return punteggio in [15, 16]
         else:
             return False
     def decide_assicurazione(self):
+        if self.difficolta in STRATEGIA_BASE:
+            return False
         if self.difficolta == "cauta":
             return True
         elif self.difficolta == "aggressiva":
             return False
         else:
-            return random.choice([True, False])
+            return (self.generatore or rng).choice([True, False])
 
 # ===============================
 # STATO & SALVATAGGIO
 # ===============================
 
+# Lo stato in memoria (snapshot / carica_stato) e i record del giornale usano
+# le carte intere; i nomi "A♠" compaiono solo nel formato JSON.
+
+def giocatore_to_dict(g):
+    # Copia indipendente: lo snapshot può essere serializzato da un altro thread
+    d = dict(g.__dict__)
+    del d["generatore"]
+    d["mani"] = [list(m) for m in g.mani]
+    d["puntate"] = list(g.puntate)
+    d["assicurazioni"] = list(g.assicurazioni)
+    d["stats"] = dict(g.stats)
+    return d
+
 def snapshot(giocatori, mazzo, banco_bankroll):
     return {
-        "giocatori": [g.__dict__ for g in giocatori],
-        "mazzo": mazzo.mazzo,
+        "giocatori": [giocatore_to_dict(g) for g in giocatori],
+        "mazzo": bytes(mazzo.mazzo),
         "usate": mazzo.usate,
         "banco_bankroll": banco_bankroll
     }
 
+def stato_to_json(stato):
+    d = dict(stato)
+    d["giocatori"] = [dict(g, mani=[nomi_carte(m) for m in g["mani"]]) for g in stato["giocatori"]]
+    d["mazzo"] = nomi_carte(stato["mazzo"])
+    return d
+
+def stato_da_json(d):
+    stato = dict(d)
+    stato["giocatori"] = [dict(g, mani=[carte_da_nomi(m) for m in g.get("mani", [[]])])
+                          for g in d.get("giocatori", [])]
+    if "mazzo" in d:
+        stato["mazzo"] = bytes(carte_da_nomi(d["mazzo"]))
+    return stato
+
+# -------------------------------
+# Formato binario (versione 2)
+# -------------------------------
+# Header in chiaro, poi sezioni cifrate con xor_chiave alla loro posizione:
+#   header   : magic, versione, n_giocatori, banco_bankroll, usate, seq,
+#              offset tabella giocatori, offset mazzo, lunghezza mazzo
+#   tabella  : n_giocatori offset (uint32), uno per record
+#   record   : saldo, cpu, difficoltà, stats, nome, mani, puntate, assicurazioni
+#   mazzo    : un byte per carta
+# La tabella permette di leggere i giocatori senza toccare il mazzo.
+
+MAGIC_BINARIO = b"BJSV"
+VERSIONE_BINARIO = 2
+HEADER_BINARIO = struct.Struct("<4sBHqIIIII")
+RECORD_FISSO = struct.Struct("<qBB" + "q" * len(STATS_CHIAVI))
+
+def _codifica_giocatore(g):
+    diff = DIFFICOLTA_CPU.index(g["difficolta"]) if g["difficolta"] in DIFFICOLTA_CPU else 255
+    stats = g.get("stats") or {}
+    nome = g["nome"].encode("utf-8")
+    parti = [
+        RECORD_FISSO.pack(g["saldo"], 1 if g["cpu"] else 0, diff, *(stats.get(k, 0) for k in STATS_CHIAVI)),
+        struct.pack("<H", len(nome)), nome,
+        struct.pack("<B", len(g["mani"])),
+    ]
+    for m in g["mani"]:
+        parti.append(struct.pack("<B", len(m)))
+        parti.append(bytes(m))
+    n = len(g["mani"])
+    parti.append(struct.pack(f"<{n}q{n}q", *g["puntate"][:n], *g["assicurazioni"][:n]))
+    return b"".join(parti)
+
+def codifica_binario(stato, key=SAVE_KEY):
+    record = [_codifica_giocatore(g) for g in stato["giocatori"]]
+    n = len(record)
+    off_tabella = HEADER_BINARIO.size
+    offsets = []
+    pos = off_tabella + 4 * n
+    for rec in record:
+        offsets.append(pos)
+        pos += len(rec)
+    mazzo = bytes(stato["mazzo"])
+    header = HEADER_BINARIO.pack(MAGIC_BINARIO, VERSIONE_BINARIO, n, stato["banco_bankroll"],
+                                 stato["usate"], stato.get("seq", 0), off_tabella, pos, len(mazzo))
+    corpo = struct.pack(f"<{n}I", *offsets) + b"".join(record) + mazzo
+    return header + xor_chiave(corpo, key.encode("utf-8"), off_tabella)
+
+class SalvataggioBinario:
+    # Lettore del formato binario: header subito, giocatori e mazzo solo su richiesta
+    def __init__(self, raw, key=SAVE_KEY):
+        (magic, versione, self.n_giocatori, self.banco_bankroll, self.usate, self.seq,
+         self._off_tabella, self._off_mazzo, self._len_mazzo) = HEADER_BINARIO.unpack_from(raw)
+        if magic != MAGIC_BINARIO or versione != VERSIONE_BINARIO:
+            raise ValueError("Formato di salvataggio non supportato")
+        self._raw = raw
+        self._k = key.encode("utf-8")
+        self._offsets = struct.unpack(f"<{self.n_giocatori}I", self._sezione(self._off_tabella, 4 * self.n_giocatori))
+
+    def _sezione(self, inizio, lunghezza):
+        return xor_chiave(self._raw[inizio:inizio + lunghezza], self._k, inizio)
+
+    def giocatore(self, i):
+        inizio = self._offsets[i]
+        fine = self._offsets[i + 1] if i + 1 < self.n_giocatori else self._off_mazzo
+        rec = self._sezione(inizio, fine - inizio)
+        campi = RECORD_FISSO.unpack_from(rec)
+        pos = RECORD_FISSO.size
+        (ln,) = struct.unpack_from("<H", rec, pos); pos += 2
+        nome = rec[pos:pos + ln].decode("utf-8"); pos += ln
+        n_mani = rec[pos]; pos += 1
+        mani = []
+        for _ in range(n_mani):
+            nc = rec[pos]; pos += 1
+            mani.append(list(rec[pos:pos + nc])); pos += nc
+        valori = struct.unpack_from(f"<{n_mani}q{n_mani}q", rec, pos)
+        return {
+            "nome": nome,
+            "saldo": campi[0],
+            "cpu": bool(campi[1]),
+            "difficolta": DIFFICOLTA_CPU[campi[2]] if campi[2] < len(DIFFICOLTA_CPU) else "equilibrata",
+            "stats": dict(zip(STATS_CHIAVI, campi[3:])),
+            "mani": mani,
+            "puntate": list(valori[:n_mani]),
+            "assicurazioni": list(valori[n_mani:]),
+        }
+
+    def giocatori(self):
+        return [self.giocatore(i) for i in range(self.n_giocatori)]
+
+    def mazzo(self):
+        return self._sezione(self._off_mazzo, self._len_mazzo)
+
+    def stato(self):
+        return {
+            "giocatori": self.giocatori(),
+            "mazzo": self.mazzo(),
+            "usate": self.usate,
+            "banco_bankroll": self.banco_bankroll,
+            "seq": self.seq,
+        }
+
+def scrivi_atomico(percorso, dati):
+    # Scrive su file temporaneo e poi rinomina: mai un salvataggio troncato
+    tmp = percorso.with_name(percorso.name + ".tmp")
+    with open(tmp, "wb" if isinstance(dati, bytes) else "w") as f:
+        f.write(dati)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, percorso)
+    return len(dati)
+
+def scrivi_snapshot(stato):
+    if FORMATO_SALVATAGGIO == "binario":
+        scrivi_atomico(SALVA_FILE, codifica_binario(stato))
+    else:
+        scrivi_atomico(SALVA_FILE, encrypt_data(json.dumps(stato_to_json(stato))))
+
 def salva_stato(giocatori, mazzo, banco_bankroll):
     try:
-        data = json.dumps(snapshot(giocatori, mazzo, banco_bankroll))
-        enc = encrypt_data(data)
-        with open(SALVA_FILE, "w") as f:
-            f.write(enc)
+        scrivi_snapshot(snapshot(giocatori, mazzo, banco_bankroll))
     except Exception as e:
         print(f"⚠️ Errore nel salvataggio: {e}")
 
+class SalvataggioAsincrono:
+    # salva_cb segna solo lo stato come modificato. Uno snapshot viene catturato
+    # al massimo ogni `intervallo` secondi (o subito con flush() a fine mano) e
+    # serializzato, cifrato e scritto da un thread in background. Le catture
+    # avvengono solo nel thread di gioco, tra un'azione e l'altra (salva_cb,
+    # flush, al_prompt): il thread di scrittura non legge mai lo stato vivo.
+    def __init__(self, sorgente, intervallo=SALVA_INTERVALLO):
+        self.sorgente = sorgente  # callable che restituisce lo snapshot corrente
+        self.intervallo = intervallo
+        self._cond = threading.Condition()
+        self._sporco = False  # Solo thread di gioco
+        self._ultima_cattura = time.monotonic()  # Solo thread di gioco
+        self._pronto = None
+        self._in_scrittura = False
+        self._chiuso = False
+        self._giornale_rimosso = False  # Solo thread di scrittura
+        self._thread = threading.Thread(target=self._ciclo, name="salvataggio", daemon=True)
+        self._thread.start()
+
+    def segna_modificato(self, azione=None, g=None):
+        if time.monotonic() - self._ultima_cattura >= self.intervallo:
+            self._cattura()
+        else:
+            self._sporco = True
+
+    def al_prompt(self):
+        # Prima di attendere un input: l'attesa può durare, lo stato modificato va catturato ora
+        if self._sporco:
+            self._cattura()
+
+    def flush(self, completo=False, attendi_scrittura=False):
+        # A fine mano non si aspetta il disco: chiudi() attende comunque l'ultima scrittura
+        self._cattura()
+        if attendi_scrittura:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pronto is None and not self._in_scrittura)
+
+    def chiudi(self, salva=True):
+        if salva:
+            self._cattura()
+        with self._cond:
+            if not salva:
+                self._pronto = None
+            self._chiuso = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _cattura(self):
+        stato = self.sorgente()
+        self._sporco = False
+        self._ultima_cattura = time.monotonic()
+        with self._cond:
+            self._pronto = stato
+            self._cond.notify_all()
+
+    def _ciclo(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pronto is not None or self._chiuso)
+                stato, self._pronto = self._pronto, None
+                chiuso = self._chiuso
+                self._in_scrittura = stato is not None
+            if stato is not None:
+                try:
+                    scrivi_snapshot(stato)
+                    if not self._giornale_rimosso:
+                        # Un giornale di una sessione precedente verrebbe rigiocato sopra questo snapshot (seq 0)
+                        GIORNALE_FILE.unlink(missing_ok=True)
+                        self._giornale_rimosso = True
+                except Exception as e:
+                    print(f"⚠️ Errore nel salvataggio: {e}")
+                with self._cond:
+                    self._in_scrittura = False
+                    self._cond.notify_all()
+            if chiuso:
+                return
+
+def stato_giocatore(g):
+    # Copia dei campi che cambiano durante una mano: base dei record differenziali
+    return g.saldo, [list(m) for m in g.mani], list(g.puntate), list(g.assicurazioni), dict(g.stats)
+
+def differenza_giocatore(prima, g):
+    # Solo ciò che è cambiato da `prima` (stato_giocatore):
+    #   d: delta del saldo            k: numero di mani (se cambiato)
+    #   c: [mano, carte aggiunte...]  h: [mano, carte...] se la mano non è solo cresciuta (split)
+    #   p, q: puntate, assicurazioni  t: [[indice in STATS_CHIAVI, delta], ...]
+    saldo, mani, puntate, assicurazioni, stats = prima
+    rec = {}
+    if g.saldo != saldo:
+        rec["d"] = g.saldo - saldo
+    if len(g.mani) != len(mani):
+        rec["k"] = len(g.mani)
+    for i, m in enumerate(g.mani):
+        vecchia = mani[i] if i < len(mani) else []
+        if m == vecchia:
+            continue
+        if len(m) > len(vecchia) and m[:len(vecchia)] == vecchia:
+            rec.setdefault("c", []).append([i, *m[len(vecchia):]])
+        else:
+            rec.setdefault("h", []).append([i, *m])
+    if g.puntate != puntate:
+        rec["p"] = list(g.puntate)
+    if g.assicurazioni != assicurazioni:
+        rec["q"] = list(g.assicurazioni)
+    variate = [[j, g.stats.get(k, 0) - stats.get(k, 0)] for j, k in enumerate(STATS_CHIAVI)
+               if g.stats.get(k, 0) != stats.get(k, 0)]
+    if variate:
+        rec["t"] = variate
+    return rec
+
+def applica_differenza(g, rec):
+    # Inverso di differenza_giocatore su un giocatore in forma di dict (snapshot)
+    g["saldo"] += rec.get("d", 0)
+    if "k" in rec:
+        mani = [list(m) for m in g["mani"][:rec["k"]]]
+        g["mani"] = mani + [[] for _ in range(rec["k"] - len(mani))]
+    for i, *carte in rec.get("c", ()):
+        g["mani"][i] = list(g["mani"][i]) + carte
+    for i, *carte in rec.get("h", ()):
+        g["mani"][i] = carte
+    if "p" in rec:
+        g["puntate"] = rec["p"]
+    if "q" in rec:
+        g["assicurazioni"] = rec["q"]
+    for j, delta in rec.get("t", ()):
+        g["stats"][STATS_CHIAVI[j]] = g["stats"].get(STATS_CHIAVI[j], 0) + delta
+
+class GiornaleSalvataggio:
+    # Ogni azione (puntata, carta, raddoppio, split, resa, assicurazione,
+    # risultato) viene aggiunta in coda a GIORNALE_FILE come record cifrato, una
+    # riga per record, con solo ciò che l'azione ha cambiato: carte nuove, delta
+    # di saldo e statistiche, puntate, lunghezza del sabot (differenza_giocatore). Ogni SNAPSHOT_OGNI_MANI mani si scrive uno
+    # snapshot completo e il giornale viene svuotato. Ogni record ha un numero
+    # di sequenza: in caricamento si rigiocano solo quelli successivi allo snapshot.
+    def __init__(self, stato_corrente, ogni_mani=SNAPSHOT_OGNI_MANI):
+        self.stato_corrente = stato_corrente  # callable -> (giocatori, mazzo, banco_bankroll)
+        self.ogni_mani = ogni_mani
+        self._seq = 0
+        self._mani = 0
+        self._f = None
+        self._indici = {}
+        self._ultimi = {}  # id(g) -> stato_giocatore all'ultimo record
+        self._sabot = None  # (carte rimaste, usate) all'ultimo record
+        self._mescolate = 0
+        self.flush(completo=True)
+
+    def segna_modificato(self, azione=None, g=None):
+        giocatori, mazzo, _ = self.stato_corrente()
+        rec = {"a": azione}
+        if g is not None:
+            idx = self._indici.get(id(g))
+            if idx is None:
+                # Giocatore non presente nell'ultimo snapshot: ne serve uno nuovo
+                self.flush(completo=True)
+                return
+            rec["i"] = idx
+            rec.update(differenza_giocatore(self._ultimi[id(g)], g))
+            self._ultimi[id(g)] = stato_giocatore(g)
+        if mazzo.mescolate != self._mescolate:
+            self._mescolate = mazzo.mescolate
+            self._sabot = None
+            self._scrivi({"a": "mescola", "m": list(mazzo.mazzo)})
+        sabot = (len(mazzo.mazzo), mazzo.usate)
+        if sabot != self._sabot:
+            self._sabot = sabot
+            rec["n"], rec["u"] = sabot
+        if rec.keys() - {"a", "i"}:  # Azione senza effetti sullo stato salvato: niente record
+            self._scrivi(rec)
+
+    def flush(self, completo=False):
+        giocatori, mazzo, banco_bankroll = self.stato_corrente()
+        self._mani += 1
+        if not completo and self._mani < self.ogni_mani:
+            self._scrivi({"a": "fine", "b": banco_bankroll})
+            return
+        stato = snapshot(giocatori, mazzo, banco_bankroll)
+        stato["seq"] = self._seq
+        try:
+            scrivi_snapshot(stato)
+        except Exception as e:
+            print(f"⚠️ Errore nel salvataggio: {e}")
+            if self._f is None:
+                self._riprendi(giocatori, mazzo, banco_bankroll)
+            return
+        self._apri("w", giocatori, mazzo)
+        self._mani = 0
+
+    def _riprendi(self, giocatori, mazzo, banco_bankroll):
+        # Primo snapshot non scritto: si continua il giornale dello snapshot già su
+        # disco, con seq successive a quelle già usate, solo se snapshot + giornale
+        # danno esattamente lo stato attuale. Altrimenti il giornale viene svuotato
+        # e non si registra nulla fino al prossimo snapshot riuscito.
+        try:
+            stato = leggi_snapshot() if SALVA_FILE.exists() else None
+            righe = GIORNALE_FILE.read_text().splitlines() if GIORNALE_FILE.exists() else []
+            record = list(leggi_giornale())
+            affidabile = (stato is not None and len(record) == len(righe)
+                          and stesso_stato(applica_giornale(dict(stato)), snapshot(giocatori, mazzo, banco_bankroll)))
+        except Exception:
+            affidabile = False
+        if affidabile:
+            self._seq = max([stato.get("seq", 0)] + [rec["s"] for rec in record])
+            self._apri("a", giocatori, mazzo)
+        else:
+            self._apri("w", giocatori, mazzo)
+            if self._f:
+                self._f.close()
+                self._f = None
+
+    def _apri(self, modo, giocatori, mazzo):
+        if self._f:
+            self._f.close()
+            self._f = None
+        self._indici = {id(g): i for i, g in enumerate(giocatori)}
+        self._ultimi = {id(g): stato_giocatore(g) for g in giocatori}
+        self._sabot = (len(mazzo.mazzo), mazzo.usate)
+        self._mescolate = mazzo.mescolate
+        try:
+            self._f = open(GIORNALE_FILE, modo)
+        except Exception as e:
+            print(f"⚠️ Errore nel salvataggio: {e}")
+
+    def chiudi(self, salva=True):
+        if salva:
+            self.flush(completo=True)
+        if self._f:
+            self._f.close()
+            self._f = None
+
+    def _scrivi(self, rec):
+        self._seq += 1
+        rec["s"] = self._seq
+        if self._f is None:
+            return 0
+        riga = encrypt_data(json.dumps(rec, separators=(",", ":"))) + "\n"
+        try:
+            self._f.write(riga)
+            self._f.flush()
+        except Exception as e:
+            print(f"⚠️ Errore nel salvataggio: {e}")
+            return 0
+        return len(riga)
+
+def leggi_giornale():
+    if not GIORNALE_FILE.exists():
+        return
+    with open(GIORNALE_FILE, "r") as f:
+        for riga in f:
+            try:
+                yield json.loads(decrypt_data(riga.strip()))
+            except Exception:
+                return  # ultima riga troncata da un crash
+
+def applica_giornale(stato):
+    seq = stato.get("seq", 0)
+    for rec in leggi_giornale():
+        if rec["s"] <= seq:
+            continue
+        if rec["a"] == "mescola":
+            stato["mazzo"] = bytes(rec["m"])
+        elif rec["a"] == "fine":
+            stato["banco_bankroll"] = rec["b"]
+        else:
+            if "n" in rec:
+                stato["mazzo"] = stato["mazzo"][:rec["n"]]
+                stato["usate"] = rec["u"]
+            if "i" in rec:
+                applica_differenza(stato["giocatori"][rec["i"]], rec)
+    return stato
+
+def stesso_stato(a, b):
+    # Confronto dei campi salvati (i dict di snapshot() hanno anche attributi non salvati)
+    campi = ("nome", "saldo", "mani", "puntate", "assicurazioni")
+    return (bytes(a["mazzo"]) == bytes(b["mazzo"]) and a["usate"] == b["usate"]
+            and a["banco_bankroll"] == b["banco_bankroll"] and len(a["giocatori"]) == len(b["giocatori"])
+            and all([ga[k] for k in campi] == [gb[k] for k in campi]
+                    and all(ga["stats"].get(k, 0) == gb["stats"].get(k, 0) for k in STATS_CHIAVI)
+                    for ga, gb in zip(a["giocatori"], b["giocatori"])))
+
+def leggi_snapshot():
+    # Riconosce il formato dal contenuto: i vecchi salvataggi JSON+XOR+base64
+    # vengono caricati e riscritti nel formato corrente al primo salvataggio.
+    raw = SALVA_FILE.read_bytes()
+    if raw.startswith(MAGIC_BINARIO):
+        return SalvataggioBinario(raw).stato()
+    enc = raw.decode("ascii").strip()
+    if not enc:
+        return None
+    return stato_da_json(json.loads(decrypt_data(enc)))
+
 def carica_stato():
     if not SALVA_FILE.exists():
         return None
     try:
-        with open(SALVA_FILE, "r") as f:
-            enc = f.read().strip()
-            if not enc:
-                return None
-            data = decrypt_data(enc)
-            return json.loads(data)
+        stato = leggi_snapshot()
+        return applica_giornale(stato) if stato else None
     except Exception:
         print("⚠️ Salvataggio non leggibile, verrà ricreato.")
-        try: SALVA_FILE.unlink(missing_ok=True)
-        except Exception: pass
+        elimina_salvataggio()
         return None
 
 def elimina_salvataggio():
-    try: SALVA_FILE.unlink(missing_ok=True)
-    except Exception: pass
+    for f in (SALVA_FILE, GIORNALE_FILE):
+        try: f.unlink(missing_ok=True)
+        except Exception: pass
 
 # ===============================
 # HALL OF FAME
 # ===============================
 
 def scrivi_hof(motivo, giocatori_totali, banco_bankroll):
-    righe = []
-    righe.append("======================================")
-    righe.append(datetime.now().strftime("Partita chiusa il %Y-%m-%d %H:%M:%S"))
-    righe.append(f"Motivo: {motivo}")
-    righe.append(f"Bankroll banco finale: {fmt_euro(banco_bankroll)}")
-    righe.append("Classifica finale (saldo):")
-    finali = sorted(
-        [(g.nome, g.saldo, ("CPU "+g.difficolta) if g.cpu else "Giocatore") for g in giocatori_totali],
-        key=lambda x: x[1],
-        reverse=True
-    )
-    vincitore = finali[0]
-    for nome, saldo, ruolo in finali:
-        righe.append(f" - {nome} ({ruolo}): {fmt_euro(saldo)}")
-    righe.append(f"Vincitore: {vincitore[0]} con {fmt_euro(vincitore[1])}")
-    righe.append("======================================\n")
-    with open(HALL_OF_FAME_FILE, "a") as f:
-        f.write("\n".join(righe))
+    hof = halloffame.HallOfFame(HALL_OF_FAME_DB)
+    try:
+        hof.importa_testo(HALL_OF_FAME_FILE)  # Solo la prima volta
+        hof.registra(motivo, giocatori_totali, banco_bankroll)
+    finally:
+        hof.chiudi()
 
 def chiudi_partita(motivo, giocatori_totali, banco_bankroll, save_on_exit=False):
     scrivi_hof(motivo, giocatori_totali, banco_bankroll)
@@ -269,32 +1127,114 @@ def chiudi_partita(motivo, giocatori_totali, banco_bankroll, save_on_exit=False)
         except: pass
     elimina_salvataggio()
     print("\n🏁 Partita terminata.")
-    print(f"📜 Hall of Fame aggiornata: {HALL_OF_FAME_FILE.name}")
+    print(f"📜 Hall of Fame aggiornata: {HALL_OF_FAME_DB.name} (python3 halloffame.py classifica)")
     sys.exit(0)
 
 # ===============================
 # CONTROLLI AZIONI (DOUBLE / SPLIT)
 # ===============================
 
-def check_double(g, i):
+def check_double(g, i, regole=REGOLE_STANDARD):
     if len(g.mani[i]) != 2:
         return False, "Puoi raddoppiare solo con esattamente 2 carte."
+    if len(g.mani) > 1 and not regole.raddoppio_dopo_split:
+        return False, "Raddoppio dopo split non consentito."
     if g.saldo < g.puntate[i]:
         return False, "Saldo insufficiente per raddoppiare."
     return True, ""
 
-def check_split(g, i):
+def check_split(g, i, regole=REGOLE_STANDARD):
     mano = g.mani[i]
     if len(mano) != 2:
         return False, "Puoi dividere solo con esattamente 2 carte."
-    if mano[0][:-1] != mano[1][:-1]:
+    if RANGO_CARTA[mano[0]] != RANGO_CARTA[mano[1]]:
         return False, "Le due carte devono avere lo stesso valore."
     if g.saldo < g.puntate[i]:
         return False, "Saldo insufficiente per dividere."
-    if len(g.mani) >= MAX_SPLIT:
+    if len(g.mani) >= regole.max_split:
         return False, "Raggiunto limite massimo di split."
+    if len(g.mani) > 1 and E_ASSO[mano[0]] and not regole.risplit_assi:
+        return False, "Gli Assi si dividono una sola volta."
     return True, ""
 
+# ===============================
+# RENDERING DIFFERENZIALE
+# ===============================
+
+class RendererTerminale:
+    # Il tavolo occupa le prime righe dello schermo; sotto, una regione di
+    # scorrimento (DECSTBM) per i messaggi di gioco. Si tiene l'ultimo frame e
+    # si riscrivono solo le righe cambiate con il posizionamento del cursore,
+    # in un'unica write. Se il frame non sta nello schermo o il terminale
+    # cambia dimensione si ridisegna tutto.
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.precedente = None  # Righe a schermo; None = ridisegno completo
+        self.dimensioni = None
+        self.regione = False
+        self.frame = 0
+        self.byte_totali = 0
+        self.ultimo_byte = 0
+        self.ultimo_ms = 0.0
+        self.ms_totali = 0.0
+    def invalida(self):
+        self.precedente = None
+    def entra(self, righe, rows):
+        # Lascia almeno 2 righe ai messaggi (più quella delle statistiche)
+        return len(righe) + MOSTRA_STATISTICHE_RENDER < rows - 2
+    def disegna(self, righe, cols, rows):
+        t0 = time.perf_counter()
+        sta = self.entra(righe, rows)
+        if MOSTRA_STATISTICHE_RENDER:
+            righe = righe + [f"render: {self.ultimo_byte} byte, {self.ultimo_ms:.2f} ms (frame {self.frame})"]
+        if (cols, rows) != self.dimensioni or not sta:
+            self.precedente = None
+        parti = []
+        prec = self.precedente
+        if prec is None:
+            parti.append("\x1b[r\x1b[2J\x1b[H")
+            prec = []
+            if not sta:
+                # Frame più alto dello schermo: stampa semplice, scorre come i messaggi
+                parti.append("\n".join(righe) + "\n")
+                self.regione = False
+        if sta:
+            for i, riga in enumerate(righe):
+                if i >= len(prec) or prec[i] != riga:
+                    parti.append(f"\x1b[{i+1};1H{riga}\x1b[K")
+            for i in range(len(righe), len(prec)):
+                parti.append(f"\x1b[{i+1};1H\x1b[K")
+            if len(righe) != len(prec) or not self.regione:
+                parti.append(f"\x1b[{len(righe)+1};{rows}r")
+                self.regione = True
+            parti.append(f"\x1b[{rows};1H")  # Cursore in fondo alla regione dei messaggi
+        testo = "".join(parti)
+        stream = self.stream or sys.stdout
+        stream.write(testo)
+        stream.flush()
+        if not self.frame:
+            atexit.register(self.chiudi)
+        self.precedente = righe if sta else None
+        self.dimensioni = (cols, rows)
+        self.frame += 1
+        self.ultimo_byte = len(testo.encode("utf-8"))
+        self.byte_totali += self.ultimo_byte
+        self.ultimo_ms = (time.perf_counter() - t0) * 1000
+        self.ms_totali += self.ultimo_ms
+    def chiudi(self):
+        # Restituisce tutto lo schermo allo scorrimento normale
+        if self.regione:
+            stream = self.stream or sys.stdout
+            stream.write(f"\x1b[r\x1b[{self.dimensioni[1]};1H\n")
+            stream.flush()
+            self.regione = False
+        self.precedente = None
+    def statistiche(self):
+        return {"frame": self.frame, "byte_totali": self.byte_totali, "ultimo_byte": self.ultimo_byte,
+                "ultimo_ms": self.ultimo_ms, "ms_medi": self.ms_totali / self.frame if self.frame else 0.0}
+
+renderer = RendererTerminale()
+
 # ===============================
 # GRAFICA TAVOLO
 # ===============================
@@ -304,129 +1244,120 @@ def tavolo_grande_abbastanza():
     return cols >= 100 and rows >= 30, cols, rows
 
 def render_hand_block_with_meta(mano, puntata=None, assicurazione=0, show_total=True, coperta=False):
-    cards = mostra_carte_ascii(mano, coperta=coperta)
-    width = block_width(cards)
     meta_lines = []
     if puntata is not None:
-        meta_lines.append(center_text_line(f"Puntata: {puntata}€", width))
+        meta_lines.append(f"Puntata: {puntata}€")
     if assicurazione > 0:
-        meta_lines.append(center_text_line(f"Assicurazione: {assicurazione}€", width))
+        meta_lines.append(f"Assicurazione: {assicurazione}€")
     if show_total:
-        tot = calcola_punteggio(mano)
-        meta_lines.append(center_text_line(f"Totale: {tot}", width))
-    meta = "\n".join(meta_lines)
-    return cards + "\n" + meta if meta else cards
-
-def combine_blocks_horizontally(blocks, spacing=6):
-    split_blocks = [b.split("\n") for b in blocks]
-    height = max(len(b) for b in split_blocks)
-    for b in split_blocks:
-        while len(b) < height: b.append("")
-    widths = [max(len(line) for line in b) for b in split_blocks]
-    padded_blocks = []
-    for b, w in zip(split_blocks, widths):
-        padded_blocks.append([line + " " * (w - len(line)) for line in b])
-    merged_lines = []
-    for r in range(height):
-        row = (" " * spacing).join(pb[r] for pb in padded_blocks)
-        merged_lines.append(row.rstrip())
-    combined = "\n".join(merged_lines)
-    total_w = max(len(ln) for ln in merged_lines) if merged_lines else 0
-    return combined, total_w
-
-def mostra_giocatore_blocchi(giocatore, cols):
+        meta_lines.append(f"Totale: {calcola_punteggio(mano)}")
+    return blocco_carte(mano, coperta).con_righe_centrate(meta_lines)
+
+def righe_giocatore(giocatore, cols):
     header = f"{giocatore.nome} ({'CPU ' + giocatore.difficolta if giocatore.cpu else 'Tu'}) [{fmt_euro(giocatore.saldo)}]"
-    print(center_text_line(header, cols))
-    hand_blocks = []
-    for i, m in enumerate(giocatore.mani):
-        hand_blocks.append(render_hand_block_with_meta(m, giocatore.puntate[i], giocatore.assicurazioni[i], show_total=True))
+    righe = [riga_centrata(header, cols)]
+    hand_blocks = [render_hand_block_with_meta(m, giocatore.puntate[i], giocatore.assicurazioni[i], show_total=True)
+                   for i, m in enumerate(giocatore.mani)]
     if len(hand_blocks) == 1:
-        print_centered_block(hand_blocks[0], cols)
-        return
-    combined, width = combine_blocks_horizontally(hand_blocks, spacing=6)
-    if width + 4 <= cols:
-        print_centered_block(combined, cols)
-    else:
-        for hb in hand_blocks:
-            print_centered_block(hb, cols)
-            print()
-
-def mostra_tavolo_centrato(giocatori, banco, banco_bankroll, mostra_carta_coperta=True, pausa=True):
-    ok, cols, rows = tavolo_grande_abbastanza()
-    if not ok:
-        return False
-    clear_screen()
+        return righe + hand_blocks[0].centrato(cols)
+    combined = affianca(hand_blocks, spaziatura=6)
+    if combined.larghezza + 4 <= cols:
+        return righe + combined.centrato(cols)
+    for hb in hand_blocks:
+        righe += hb.centrato(cols) + [""]
+    return righe
+
+def righe_tavolo(giocatori, banco, banco_bankroll, mostra_carta_coperta, cols):
+    # Un solo passaggio dall'alto in basso: banco, CPU, poi il giocatore umano
     fascia = "=" * min(100, cols)
-    print(fascia)
     titolo = "🃏 TAVOLO DA BLACKJACK 🃏"
-    print(center_text_line(titolo, cols))
-    print(fascia)
+    righe = [fascia, riga_centrata(titolo, cols), fascia, ""]
 
-    print()
     banco_header = f"Banco [💰 {fmt_euro(banco_bankroll)}]"
-    print(center_text_line(banco_header, cols))
-    print_centered_block(render_hand_block_with_meta(banco, show_total=not mostra_carta_coperta, coperta=mostra_carta_coperta), cols)
-    print()
+    righe.append(riga_centrata(banco_header, cols))
+    righe += render_hand_block_with_meta(banco, show_total=not mostra_carta_coperta,
+                                         coperta=mostra_carta_coperta).centrato(cols)
+    righe.append("")
 
     umano = next(g for g in giocatori if not g.cpu)
-    cpu = [g for g in giocatori if g.cpu]
-    cpu_sx = cpu[:2]
-    cpu_dx = cpu[2:]
-
-    for g in cpu_sx:
-        mostra_giocatore_blocchi(g, cols)
-        print()
-    for g in cpu_dx:
-        mostra_giocatore_blocchi(g, cols)
-        print()
+    for g in giocatori:
+        if g.cpu:
+            righe += righe_giocatore(g, cols)
+            righe.append("")
 
-    mostra_giocatore_blocchi(umano, cols)
+    righe += righe_giocatore(umano, cols)
+    righe += ["", fascia]
+    return righe
 
-    print("\n" + fascia + "\n")
+def mostra_tavolo_centrato(giocatori, banco, banco_bankroll, mostra_carta_coperta=True, pausa=True,
+                           solo_in_place=False):
+    # solo_in_place: disegna solo se il tavolo sta nello schermo e si aggiorna al suo posto
+    if not VERBOSO:
+        return False
+    ok, cols, rows = tavolo_grande_abbastanza()
+    if not ok:
+        renderer.chiudi()
+        return False
+    righe = righe_tavolo(giocatori, banco, banco_bankroll, mostra_carta_coperta, cols)
+    if solo_in_place and not renderer.entra(righe, rows):
+        return False
+    renderer.disegna(righe, cols, rows)
     if pausa:
-        input("Premi Invio per continuare...")
+        pausa_invio()
     return True
 
 # ===============================
 # ANIMAZIONI (senza mostrare la 2ª carta del banco)
 # ===============================
 
-def anim_distribuzione_mano_iniziale(mazzo, giocatori, banco, salva_cb):
+def anim_distribuzione_mano_iniziale(mazzo, giocatori, banco, salva_cb, banco_bankroll=None):
+    # Con la vista tavolo attiva le carte compaiono al loro posto (ridisegnando
+    # solo le righe cambiate); altrimenti ogni mano viene stampata di seguito.
+    def mostra(carte=None):
+        if not VERBOSO:
+            return
+        if banco_bankroll is not None and mostra_tavolo_centrato(
+                giocatori, banco, banco_bankroll, mostra_carta_coperta=len(banco) > 1, pausa=False,
+                solo_in_place=True):
+            return
+        if carte is not None:
+            out_carte(carte)
     # Primo giro a tutti
     for g in giocatori:
-        print(f"→ Distribuisco a {g.nome}...")
+        out(f"→ Distribuisco a {g.nome}...")
         g.mani[0].append(mazzo.pesca())
-        salva_cb()
-        print(mostra_carte_ascii(g.mani[0]))
-        time.sleep(0.45)
+        salva_cb("carta", g)
+        mostra(g.mani[0])
+        attendi(0.45)
     # Prima carta al banco (visibile)
-    print("→ Distribuisco al Banco...")
+    out("→ Distribuisco al Banco...")
     banco.append(mazzo.pesca())
-    salva_cb()
-    print(mostra_carte_ascii([banco[0]]))
-    time.sleep(0.55)
+    salva_cb("banco")
+    mostra([banco[0]])
+    attendi(0.55)
     # Secondo giro a tutti
     for g in giocatori:
-        print(f"→ Distribuisco a {g.nome}...")
+        out(f"→ Distribuisco a {g.nome}...")
         g.mani[0].append(mazzo.pesca())
-        salva_cb()
-        print(mostra_carte_ascii(g.mani[0]))
-        time.sleep(0.45)
+        salva_cb("carta", g)
+        mostra(g.mani[0])
+        attendi(0.45)
     # Seconda carta al banco (NON viene mostrata!)
-    print("→ Distribuisco al Banco (coperta)...")
+    out("→ Distribuisco al Banco (coperta)...")
     banco.append(mazzo.pesca())
-    salva_cb()
-    time.sleep(0.6)
+    salva_cb("banco")
+    mostra()
+    attendi(0.6)
 
 # ===============================
 # LOGICA DI GIOCO
 # ===============================
 
 def fase_assicurazione(giocatori, banco, salva_cb, banco_bankroll_ref):
-    if not banco[0].startswith('A'):
+    if not E_ASSO[banco[0]]:
         return False
-    print("\n🛡️ Il banco mostra un Asso! Fase assicurazione.")
-    has_bj = calcola_punteggio(banco) == 21
+    out("\n🛡️ Il banco mostra un Asso! Fase assicurazione.")
+    has_bj = banco.punteggio == 21
     for g in giocatori:
         for i in range(len(g.mani)):
             if g.puntate[i] <= 0:
@@ -440,23 +1371,25 @@ def fase_assicurazione(giocatori, banco, salva_cb, banco_bankroll_ref):
                 if g.decide_assicurazione() and g.saldo >= ass_max:
                     g.assicurazioni[i] = ass_max
                     g.saldo -= ass_max
-                    print(f"{g.nome} si assicura per {ass_max}€")
+                    out(f"{g.nome} si assicura per {ass_max}€")
             else:
                 while True:
                     try:
-                        inp = input(f"{g.nome} (mano {i+1}), assicurazione (max {ass_max}€)? (0-{ass_max}): ") or "0"
+                        inp = chiedi(g, f"{g.nome} (mano {i+1}), assicurazione (max {ass_max}€)? (0-{ass_max}): ",
+                                     tipo="assicurazione", predefinito="0", mano=i, massimo=ass_max,
+                                     carta_banco=banco[0]) or "0"
                         ass = int(inp)
                         if 0 <= ass <= ass_max:
                             g.assicurazioni[i] = ass
                             g.saldo -= ass
                             break
-                        print("Valore non valido.")
+                        out("Valore non valido.")
                     except ValueError:
-                        print("Inserisci un numero valido.")
-            salva_cb()
+                        out("Inserisci un numero valido.")
+            salva_cb("assicurazione", g)
     # Se banco ha BJ, risolvi assicurazioni subito
     if has_bj:
-        print("\n📢 Il banco ha Blackjack! Risoluzione assicurazioni.")
+        out("\n📢 Il banco ha Blackjack! Risoluzione assicurazioni.")
         for g in giocatori:
             for i in range(len(g.mani)):
                 ass = g.assicurazioni[i]
@@ -466,158 +1399,170 @@ def fase_assicurazione(giocatori, banco, salva_cb, banco_bankroll_ref):
                         g.saldo += vincita + ass  # 2:1 + rimborso
                         g.stats["assicurazioni_vinte"] += 1
                         banco_bankroll_ref[0] -= vincita
-                        print(f"{g.nome} vince assicurazione: +{vincita}€")
+                        out(f"{g.nome} vince assicurazione: +{vincita}€")
                     else:
                         banco_bankroll_ref[0] += ass
-        salva_cb()
+            salva_cb("assicurazione", g)
     return has_bj
 
 def turno_giocatore(mazzo, g, i, salva_cb, banco_prima_carta):
     mano = g.mani[i]
-    if len(mano) == 2 and calcola_punteggio(mano) == 21:
-        print(f"\n{g.nome} ha Blackjack naturale!")
+    regole = mazzo.regole
+    if mano.blackjack:
+        out(f"\n{g.nome} ha Blackjack naturale!")
         g.stats["blackjacks"] += 1
-        salva_cb()
+        salva_cb("blackjack", g)
         return
 
     while True:
-        print(f"\n{g.nome} — Mano {i+1} ({'CPU ' + g.difficolta if g.cpu else 'Giocatore'})")
-        print(mostra_carte_ascii(mano))
-        tot = calcola_punteggio(mano)
-        print(f"Totale: {tot}")
+        out(f"\n{g.nome} — Mano {i+1} ({'CPU ' + g.difficolta if g.cpu else 'Giocatore'})")
+        out_carte(mano)
+        tot = mano.punteggio
+        out(f"Totale: {tot}")
 
         if tot > 21:
-            print("💥 Sballato!")
+            out("💥 Sballato!")
             g.stats["sballi"] += 1
-            salva_cb()
+            salva_cb("sballo", g)
             return
 
-        can_dbl, why_dbl = check_double(g, i)
-        can_spl, why_spl = check_split(g, i)
-        can_surr = len(mano) == 2
+        can_dbl, why_dbl = check_double(g, i, regole)
+        can_spl, why_spl = check_split(g, i, regole)
+        can_surr = regole.resa_consentita(g, i)
 
         if g.cpu:
-            time.sleep(0.6)
-            valore = mano[0][:-1]
-            if can_surr and g.decide_surrender(tot):
-                print(f"{g.nome} si arrende.")
+            attendi(0.6)
+            valore = RANGO_CARTA[mano[0]]
+            if can_surr and g.decide_surrender(tot, banco_prima_carta, mano, regole=regole):
+                out(f"{g.nome} si arrende.")
+                ritmo.azione(i, "resa")
                 g.stats["surrenders"] += 1
                 g.saldo += g.puntate[i] // 2
                 g.puntate[i] = -g.puntate[i] // 2  # Marca come surrender (perdita metà)
-                salva_cb()
+                salva_cb("resa", g)
                 return
-            elif can_spl and g.decide_split(valore):
+            elif can_spl and g.decide_split(valore, banco_prima_carta, regole=regole):
                 c2 = mano.pop()
-                g.mani.append([c2])
+                g.mani.append(Mano((c2,)))
                 g.puntate.append(g.puntate[i])
                 g.assicurazioni.append(0)
                 g.saldo -= g.puntate[i]
                 mano.append(mazzo.pesca())
                 g.mani[-1].append(mazzo.pesca())
-                print(f"{g.nome} divide!")
+                out(f"{g.nome} divide!")
+                ritmo.azione(i, "divide")
                 g.stats["splits"] += 1
-                salva_cb()
-                # Ricorsivo, ma con limite MAX_SPLIT
+                salva_cb("split", g)
+                # Ricorsivo, ma con limite regole.max_split
                 return  # Uscirà e richiamerà per tutte le mani
-            elif can_dbl and g.decide_double(tot):
+            elif can_dbl and g.decide_double(tot, banco_prima_carta, mano, regole=regole):
                 g.saldo -= g.puntate[i]
                 g.puntate[i] *= 2
                 mano.append(mazzo.pesca())
-                print(f"{g.nome} raddoppia!")
+                out(f"{g.nome} raddoppia!")
+                ritmo.azione(i, "raddoppia")
                 g.stats["doubles"] += 1
-                salva_cb()
+                salva_cb("raddoppio", g)
                 return
-            elif g.decide_pesca(tot):
-                print(f"{g.nome} pesca.")
+            elif g.decide_pesca(tot, banco_prima_carta, mano, regole=regole):
+                out(f"{g.nome} pesca.")
+                ritmo.azione(i, "pesca")
                 mano.append(mazzo.pesca())
-                salva_cb()
+                salva_cb("carta", g)
                 continue
             else:
-                print(f"{g.nome} sta.")
+                out(f"{g.nome} sta.")
+                ritmo.azione(i, "sta")
                 return
         else:
             opzioni = ["[C]arta", "[S]tai"]
             if can_dbl: opzioni.append("[R]addoppia")
             if can_spl: opzioni.append("[D]ividi")
             if can_surr: opzioni.append("[U]rrenditi")
-            sc = input(f"{', '.join(opzioni)} > ").lower().strip()
+            sc = chiedi(g, f"{', '.join(opzioni)} > ", tipo="azione", predefinito="s", mano=i,
+                        opzioni=[o[1].lower() for o in opzioni], carta_banco=banco_prima_carta).lower().strip()
 
             if sc == "c":
                 mano.append(mazzo.pesca())
-                salva_cb()
+                salva_cb("carta", g)
             elif sc == "s":
                 return
             elif sc == "r" and can_dbl:
                 g.saldo -= g.puntate[i]
                 g.puntate[i] *= 2
                 mano.append(mazzo.pesca())
-                print("Raddoppiato!")
+                out("Raddoppiato!")
                 g.stats["doubles"] += 1
-                salva_cb()
+                salva_cb("raddoppio", g)
                 return
             elif sc == "d" and can_spl:
                 c2 = mano.pop()
-                g.mani.append([c2])
+                g.mani.append(Mano((c2,)))
                 g.puntate.append(g.puntate[i])
                 g.assicurazioni.append(0)
                 g.saldo -= g.puntate[i]
                 mano.append(mazzo.pesca())
                 g.mani[-1].append(mazzo.pesca())
-                print("✂️ Mano divisa!")
+                out("✂️ Mano divisa!")
                 g.stats["splits"] += 1
-                salva_cb()
+                salva_cb("split", g)
                 return  # Uscirà e richiamerà per tutte le mani
             elif sc == "u" and can_surr:
-                print("Ti arrendi.")
+                out("Ti arrendi.")
                 g.stats["surrenders"] += 1
                 g.saldo += g.puntate[i] // 2
                 g.puntate[i] = -g.puntate[i] // 2  # Marca come surrender
-                salva_cb()
+                salva_cb("resa", g)
                 return
             else:
-                print("Scelta non valida." if sc not in ["c","s","r","d","u"] else f"⛔ Non puoi: {why_dbl or why_spl}")
+                out("Scelta non valida." if sc not in ["c","s","r","d","u"] else f"⛔ Non puoi: {why_dbl if sc == 'r' else why_spl if sc == 'd' else 'resa non consentita.'}")
 
 def turno_banco(mazzo, banco, salva_cb):
-    if len(banco) == 2 and calcola_punteggio(banco) == 21:
+    if banco.blackjack:
         return 21
-    while calcola_punteggio(banco) < 17:
+    deve_pescare = mazzo.regole.banco_pesca
+    while deve_pescare(banco):
         banco.append(mazzo.pesca())
-        salva_cb()
-        print("\nBanco pesca...")
-        print(mostra_carte_ascii(banco))
-        time.sleep(0.65)
-    return calcola_punteggio(banco)
-
-def fase_puntate(giocatori, salva_cb):
-    print("\n💰 Fase di puntata:")
+        salva_cb("banco")
+        out("\nBanco pesca...")
+        out_carte(banco)
+        attendi(0.65)
+    return banco.punteggio
+
+def fase_puntate(giocatori, salva_cb, mazzo=None):
+    out("\n💰 Fase di puntata:")
     for g in giocatori:
         g.reset()
     for g in giocatori:
         if g.saldo <= 0:
             continue
         if g.cpu:
-            scelte = [x for x in [10, 20, 50] if x <= g.saldo]
-            if not scelte:
+            puntata = g.decide_puntata(mazzo)
+            if puntata <= 0:
                 continue
-            g.puntate[0] = random.choice(scelte)
+            g.puntate[0] = min(puntata, g.saldo)
         else:
             while True:
                 try:
-                    inp = input(f"Puntata per {g.nome} (saldo {fmt_euro(g.saldo)}, min 1): ") or "10"
+                    inp = chiedi(g, f"Puntata per {g.nome} (saldo {fmt_euro(g.saldo)}, min 1): ",
+                                 tipo="puntata", predefinito=str(min(10, g.saldo)), massimo=g.saldo) or "10"
                     puntata = int(inp)
                     if puntata < 1 or puntata > g.saldo:
-                        print("Puntata non valida.")
+                        out("Puntata non valida.")
                         continue
                     g.puntate[0] = puntata
                     break
                 except ValueError:
-                    print("Inserisci un numero valido.")
+                    out("Inserisci un numero valido.")
         g.saldo -= g.puntate[0]
-        salva_cb()
-        print(f"{g.nome} punta {g.puntate[0]}€")
+        salva_cb("puntata", g)
+        out(f"{g.nome} punta {g.puntate[0]}€")
 
-def applica_risultati_e_bankroll(giocatori, banco_totale, banco_bankroll, salva_cb, banco_has_bj):
+def applica_risultati_e_bankroll(giocatori, banco_totale, banco_bankroll, salva_cb, banco_has_bj,
+                                 regole=REGOLE_STANDARD):
+    pagamento_bj = regole.pagamento_blackjack
     for g in giocatori:
+        vincite = g.vincite = [0] * len(g.mani)
         for i, mano in enumerate(g.mani):
             puntata = g.puntate[i]
             if puntata == 0:
@@ -627,14 +1572,17 @@ def applica_risultati_e_bankroll(giocatori, banco_totale, banco_bankroll, salva_
                 banco_bankroll -= puntata  # Banco vince metà (negativo diventa positivo)
                 g.stats["sconfitte"] += 1
                 g.stats["guadagno"] += puntata
+                vincite[i] = puntata
+                salva_cb("risultato", g)
                 continue
             ass = g.assicurazioni[i]
             if ass > 0 and banco_has_bj:
                 # Già gestito in fase_assicurazione
+                vincite[i] = -puntata
                 continue
-            pg = calcola_punteggio(mano)
+            pg = mano.punteggio
             g.stats["mani"] += 1
-            is_bj = pg == 21 and len(mano) == 2
+            is_bj = mano.blackjack
             if is_bj:
                 g.stats["blackjacks"] += 1
 
@@ -642,19 +1590,22 @@ def applica_risultati_e_bankroll(giocatori, banco_totale, banco_bankroll, salva_
                 g.stats["sconfitte"] += 1
                 g.stats["guadagno"] -= puntata
                 banco_bankroll += puntata
+                vincite[i] = -puntata
                 msg = f"{g.nome} sballa. (-{puntata}€)"
             elif banco_has_bj:
                 g.stats["sconfitte"] += 1
                 g.stats["guadagno"] -= puntata
                 banco_bankroll += puntata
+                vincite[i] = -puntata
                 msg = f"{g.nome} perde contro BJ banco. (-{puntata}€)"
             elif banco_totale > 21 or pg > banco_totale:
-                multiplier = 1.5 if is_bj else 1
+                multiplier = pagamento_bj if is_bj else 1
                 vincita = int(puntata * multiplier)
                 g.saldo += puntata + vincita
                 g.stats["vittorie"] += 1
                 g.stats["guadagno"] += vincita
                 banco_bankroll -= vincita
+                vincite[i] = vincita
                 msg = f"{g.nome} VINCE{' BJ' if is_bj else ''}! (+{vincita}€)"
             elif pg == banco_totale:
                 g.saldo += puntata
@@ -664,10 +1615,11 @@ def applica_risultati_e_bankroll(giocatori, banco_totale, banco_bankroll, salva_
                 g.stats["sconfitte"] += 1
                 g.stats["guadagno"] -= puntata
                 banco_bankroll += puntata
+                vincite[i] = -puntata
                 msg = f"{g.nome} perde. (-{puntata}€)"
 
-            print(f"{Fore.GREEN if 'VINCE' in msg else Fore.YELLOW if 'PAREGGIA' in msg else Fore.RED}{msg}{Style.RESET_ALL}")
-            salva_cb()
+            out(f"{Fore.GREEN if 'VINCE' in msg else Fore.YELLOW if 'PAREGGIA' in msg else Fore.RED}{msg}{Style.RESET_ALL}")
+            salva_cb("risultato", g)
     return banco_bankroll
 
 def rimuovi_cpu_senza_soldi(giocatori_totali):
@@ -697,48 +1649,76 @@ def mostra_statistiche(giocatori_totali):
         print()
 
 def gioca_mano(mazzo, giocatori, salva_cb, giocatori_totali, banco_bankroll_ref):
+    if VERBOSO:
+        ritmo.nuova_mano()
     # 1) PUNTATE
-    fase_puntate(giocatori, salva_cb)
+    fase_puntate(giocatori, salva_cb, mazzo)
+    registratore = _registratore.get()
+    if registratore is not None:
+        registratore.inizio_mano(giocatori)
 
     # 2) DISTRIBUZIONE
-    banco = []
-    print("\n🎬 Distribuzione carte...")
-    anim_distribuzione_mano_iniziale(mazzo, giocatori, banco, salva_cb)
+    banco = Mano()
+    out("\n🎬 Distribuzione carte...")
+    anim_distribuzione_mano_iniziale(mazzo, giocatori, banco, salva_cb, banco_bankroll_ref[0])
 
     # 3) CHECK BJ BANCO e ASSICURAZIONE
     banco_has_bj = fase_assicurazione(giocatori, banco, salva_cb, banco_bankroll_ref)
     if banco_has_bj:
         # Risolvi immediatamente se banco ha BJ
-        print("\n--- Risoluzione immediata (Banco BJ) ---")
+        out("\n--- Risoluzione immediata (Banco BJ) ---")
         mostra_tavolo_centrato(giocatori, banco, banco_bankroll_ref[0], mostra_carta_coperta=False, pausa=False)
-        banco_bankroll_ref[0] = applica_risultati_e_bankroll(giocatori, 21, banco_bankroll_ref[0], salva_cb, True)
-        return
+        banco_bankroll_ref[0] = applica_risultati_e_bankroll(giocatori, 21, banco_bankroll_ref[0], salva_cb, True,
+                                                              mazzo.regole)
+        if registratore is not None:
+            registratore.fine_mano(giocatori, banco, 21, True)
+        return banco
 
     # 4) TAVOLO INIZIALE
     mostrato = mostra_tavolo_centrato(giocatori, banco, banco_bankroll_ref[0], mostra_carta_coperta=True, pausa=True)
     if not mostrato:
-        print(f"\n(Modalità compatta: banco {fmt_euro(banco_bankroll_ref[0])})")
+        out(f"\n(Modalità compatta: banco {fmt_euro(banco_bankroll_ref[0])})")
+
+    if VERBOSO and MOSTRA_PROBABILITA_BANCO and any(not g.cpu for g in giocatori):
+        esito = probabilita_banco(mazzo, banco)
+        dettaglio = " | ".join(f"{e}: {p:.0%}" for e, p in zip(probabilita.ESITI, esito) if p)
+        out(f"📈 Banco con {NOMI_CARTE[banco[0]]}: {dettaglio}")
 
     # 5) TURNI GIOCATORI
     for g in giocatori:
-        # Turno per ogni mano (gestisce split internamente)
+        # Fuori dalla velocità realistica il turno di una CPU diventa una riga di riepilogo
+        raggruppa = VERBOSO and g.cpu and ritmo.raggruppa()
+        if raggruppa:
+            ritmo.inizia_cpu()
+        # Turno per ogni mano. Uno split chiude il turno dopo aver dato la seconda
+        # carta a entrambe le mani: la mano i (ora con la sua nuova carta) si gioca
+        # di nuovo dall'inizio, e può raddoppiare, dividere ancora o pescare; la
+        # nuova mano in coda arriva al suo turno più avanti.
         i = 0
         while i < len(g.mani):
+            n_mani = len(g.mani)
             turno_giocatore(mazzo, g, i, salva_cb, banco[0])
-            i += 1
+            if len(g.mani) == n_mani:
+                i += 1
+        if raggruppa:
+            out(ritmo.fine_cpu(g))
 
     # 6) BANCO
-    print("\n--- Turno del Banco ---")
-    print("Rivelazione carta coperta...")
-    print(mostra_carte_ascii(banco))
+    out("\n--- Turno del Banco ---")
+    out("Rivelazione carta coperta...")
+    out_carte(banco)
     pb = turno_banco(mazzo, banco, salva_cb)
 
     # 7) TAVOLO FINALE
     mostra_tavolo_centrato(giocatori, banco, banco_bankroll_ref[0], mostra_carta_coperta=False, pausa=True)
-    print(f"Banco ({pb})")
+    out(f"Banco ({pb})")
 
     # 8) RISULTATI + bankroll banco
-    banco_bankroll_ref[0] = applica_risultati_e_bankroll(giocatori, pb, banco_bankroll_ref[0], salva_cb, False)
+    banco_bankroll_ref[0] = applica_risultati_e_bankroll(giocatori, pb, banco_bankroll_ref[0], salva_cb, False,
+                                                          mazzo.regole)
+    if registratore is not None:
+        registratore.fine_mano(giocatori, banco, pb, False)
+    return banco
 
 # ===============================
 # MAIN LOOP
@@ -765,8 +1745,10 @@ def main():
                     g.get("assicurazioni",[0])
                 )
             )
-        mazzo.mazzo = stato.get("mazzo", crea_mazzo())
+        if "mazzo" in stato:
+            mazzo.mazzo = array('B', stato["mazzo"])
         mazzo.usate = stato.get("usate", 0)
+        mazzo.ricalcola_conteggi()
         banco_bankroll = stato.get("banco_bankroll", BANCO_START_BANKROLL)
         print(f"✅ Stato precedente caricato. Banco attuale: {fmt_euro(banco_bankroll)}")
     else:
@@ -775,15 +1757,23 @@ def main():
         usati = set()
         for i in range(MAX_CPU_GLOBALI):
             disponibili = [n for n in NOMI_REALI if n not in usati] or NOMI_REALI[:]
-            nome_cpu = random.choice(disponibili)
+            nome_cpu = rng.choice(disponibili)
             usati.add(nome_cpu)
-            diff = random.choice(DIFFICOLTA_CPU)
+            diff = rng.choice(DIFFICOLTA_CPU)
             giocatori_totali.append(Giocatore(nome_cpu, saldo=START_SALDO, cpu=True, difficolta=diff))
         banco_bankroll = BANCO_START_BANKROLL
         salva_stato(giocatori_totali, mazzo, banco_bankroll)
 
-    def salva_cb():
-        salva_stato(giocatori_totali, mazzo, banco_bankroll)
+    scelta = input("Velocità: [R]ealistica, [V]eloce, [I]stantanea (Invio = realistica) > ").strip().lower()
+    imposta_velocita({"v": "veloce", "i": "istantanea"}.get(scelta[:1], "realistica"))
+    print("(Premi Invio durante le animazioni per saltare al tuo turno)")
+
+    if MODALITA_SALVATAGGIO == "giornale":
+        salvataggio = GiornaleSalvataggio(lambda: (giocatori_totali, mazzo, banco_bankroll))
+    else:
+        salvataggio = SalvataggioAsincrono(lambda: snapshot(giocatori_totali, mazzo, banco_bankroll))
+        imposta_prima_del_prompt(salvataggio.al_prompt)
+    salva_cb = salvataggio.segna_modificato
 
     # loop partite
     while True:
@@ -791,16 +1781,18 @@ def main():
         giocatori_totali, rimossi = rimuovi_cpu_senza_soldi(giocatori_totali)
         if rimossi:
             print(f"\n♻️ CPU eliminate per saldo 0: {rimossi}")
+            salvataggio.flush(completo=True)
 
         # Se tutti (umano + CPU) a 0 → fine vera (HOF)
         if tutti_giocatori_senza_soldi(giocatori_totali):
             print("\n💀 Tutti i giocatori sono a 0€. Vince il banco.")
+            salvataggio.chiudi(salva=False)
             chiudi_partita("Tutti i giocatori a 0€", giocatori_totali, banco_bankroll)
 
         umano = next(g for g in giocatori_totali if not g.cpu)
         cpu_candidati = [g for g in giocatori_totali if g.cpu and g.saldo > 0]
-        n_cpu = random.randint(0, min(4, len(cpu_candidati)))
-        cpu_in_tavolo = random.sample(cpu_candidati, k=n_cpu)
+        n_cpu = rng.randint(0, min(4, len(cpu_candidati)))
+        cpu_in_tavolo = rng.sample(cpu_candidati, k=n_cpu)
         giocatori = [umano] + cpu_in_tavolo[:MAX_GIOCATORI_TAVOLO-1]
 
         print(f"\n🎲 Nuova mano! Partecipanti: {', '.join(g.nome for g in giocatori)}")
@@ -809,7 +1801,7 @@ def main():
         banco_bankroll_ref = [banco_bankroll]
         gioca_mano(mazzo, giocatori, salva_cb, giocatori_totali, banco_bankroll_ref)
         banco_bankroll = banco_bankroll_ref[0]
-        salva_stato(giocatori_totali, mazzo, banco_bankroll)
+        salvataggio.flush()
 
         # Riepilogo saldi dopo la mano
         print("\n===== RIEPILOGO SALDI DOPO LA MANO =====")
@@ -823,10 +1815,12 @@ def main():
         # Finali veri (HOF)
         if banco_bankroll <= 0:
             print("\n🏦 Il banco è a 0€! Il gioco termina.")
+            salvataggio.chiudi(salva=False)
             chiudi_partita("Banco a 0€", giocatori_totali, banco_bankroll)
 
         if umano.saldo <= 0:
             print("\n💀 Hai finito i soldi!")
+            salvataggio.chiudi(salva=False)
             chiudi_partita("Giocatore a 0€", giocatori_totali, banco_bankroll)
 
         # Mostra statistiche
@@ -835,8 +1829,8 @@ def main():
         # Uscita manuale → SALVA e basta (niente HOF)
         cont = input("\nVuoi continuare? (s/n) ").lower().strip()
         if cont != "s":
+            salvataggio.chiudi()
             print("\n💾 Partita salvata. Puoi riprendere più tardi.")
-            salva_stato(giocatori_totali, mazzo, banco_bankroll)
             sys.exit(0)
 
 if __name__ == "__main__":
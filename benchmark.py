@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Benchmark dei percorsi critici di BlackJack.py.
+# La suite (esegui_suite) misura punteggio, mazzo, rendering, cifratura,
+# salvataggio e mani headless a più scale e produce un dizionario
+# nome -> microsecondi per operazione, salvabile come baseline e confrontabile
+# con una baseline precedente: --baseline esce con codice 1 se un caso peggiora
+# oltre la tolleranza.
+import argparse, io, json, os, platform, sys, tempfile, time, timeit
+from pathlib import Path
+import BlackJack as bj
+import simulazione
+import vettoriale
+
+BASELINE_FILE = Path(__file__).parent / "benchmark_baseline.json"
+VERSIONE_RISULTATI = 1
+TOLLERANZA = 0.25  # Peggioramento massimo accettato rispetto alla baseline (+25%)
+SCALE_GIOCATORI = (1, 5, 21)
+SCALE_MAZZI = (1, 2, 6, 8)
+
+def _xor_per_byte(data, k):
+    # Implementazione originale di encrypt_data/decrypt_data, come riferimento
+    return bytes([b ^ k[i % len(k)] for i, b in enumerate(data)])
+
+def cronometra(fn, ripetizioni=1):
+    t0 = time.perf_counter()
+    for _ in range(ripetizioni):
+        fn()
+    return (time.perf_counter() - t0) / ripetizioni
+
+def bench_cifratura(dimensioni=(1_000, 100_000, 10_000_000)):
+    k = bj.SAVE_KEY.encode("utf-8")
+    risultati = []
+    for n in dimensioni:
+        data = os.urandom(n)
+        assert bj.xor_chiave(data, k) == _xor_per_byte(data, k)
+        rip = max(1, 1_000_000 // n)
+        t_vecchio = cronometra(lambda: _xor_per_byte(data, k), rip)
+        t_nuovo = cronometra(lambda: bj.xor_chiave(data, k), rip)
+        risultati.append({
+            "byte": n,
+            "per_byte_mb_s": n / t_vecchio / 1e6,
+            "xor_chiave_mb_s": n / t_nuovo / 1e6,
+            "speedup": t_vecchio / t_nuovo,
+        })
+    return risultati
+
+def stampa_cifratura(risultati):
+    print("🔐 Cifratura XOR (MB/s)")
+    for r in risultati:
+        print(f" - {r['byte']:>10,} byte: per-byte {r['per_byte_mb_s']:8.1f} | "
+              f"xor_chiave {r['xor_chiave_mb_s']:8.1f} | x{r['speedup']:.0f}")
+
+def stato_tavolo_pieno(n_giocatori=21):
+    giocatori = [bj.Giocatore("Giocatore")] + [
+        bj.Giocatore(f"CPU{i}", cpu=True, difficolta=bj.DIFFICOLTA_CPU[i % len(bj.DIFFICOLTA_CPU)])
+        for i in range(n_giocatori - 1)
+    ]
+    return bj.snapshot(giocatori, bj.Mazzo(), bj.BANCO_START_BANKROLL)
+
+def bench_formati(ripetizioni=200):
+    stato = stato_tavolo_pieno()
+    json_enc = bj.encrypt_data(json.dumps(bj.stato_to_json(stato))).encode("ascii")
+    binario = bj.codifica_binario(stato)
+    carica_json = lambda: bj.stato_da_json(json.loads(bj.decrypt_data(json_enc.decode("ascii"))))
+    assert carica_json() | {"seq": 0} == bj.SalvataggioBinario(binario).stato()
+    return {
+        "json_byte": len(json_enc),
+        "binario_byte": len(binario),
+        "json_carica_ms": cronometra(carica_json, ripetizioni) * 1000,
+        "binario_carica_ms": cronometra(lambda: bj.SalvataggioBinario(binario).stato(), ripetizioni) * 1000,
+        "binario_solo_giocatori_ms": cronometra(lambda: bj.SalvataggioBinario(binario).giocatori(), ripetizioni) * 1000,
+    }
+
+def stampa_formati(r):
+    print("💾 Salvataggio 21 giocatori, 8 mazzi")
+    print(f" - JSON+XOR+base64: {r['json_byte']:>6} byte, carica {r['json_carica_ms']:.3f} ms")
+    print(f" - Binario v{bj.VERSIONE_BINARIO}:      {r['binario_byte']:>6} byte, carica {r['binario_carica_ms']:.3f} ms"
+          f" (solo giocatori {r['binario_solo_giocatori_ms']:.3f} ms)")
+
+# ===============================
+# SUITE CON BASELINE
+# ===============================
+
+def misura(fn, minimo=0.2, ripetizioni=3):
+    # Microsecondi per chiamata: miglior tempo su `ripetizioni` giri da almeno `minimo` secondi
+    timer = timeit.Timer(fn)
+    n, t = timer.autorange()
+    n = max(1, int(n * minimo / max(t, 1e-9)))
+    return min(timer.repeat(ripetizioni, n)) / n * 1e6
+
+def giocatori_con_split(n_giocatori, mazzo, mani=4, carte=3):
+    # Tavolo "pesante": ogni giocatore ha diviso fino a `mani` mani da `carte` carte
+    giocatori = [bj.Giocatore("Giocatore")] + simulazione.crea_tavolo_cpu(n_giocatori - 1, saldo=bj.START_SALDO)
+    for g in giocatori:
+        g.mani = [bj.Mano(mazzo.pesca() for _ in range(carte)) for _ in range(mani)]
+        g.puntate = [10] * mani
+        g.assicurazioni = [0] * mani
+    return giocatori
+
+def bench_punteggio(r, minimo):
+    bj.imposta_seed(1)
+    mazzo = bj.Mazzo()
+    for n in (2, 3, 6, 11):
+        carte = [mazzo.pesca() for _ in range(n)]
+        mano = bj.Mano(carte)
+        r[f"calcola_punteggio/lista_{n}_carte"] = misura(lambda: bj.calcola_punteggio(carte), minimo)
+        r[f"calcola_punteggio/mano_{n}_carte"] = misura(lambda: bj.calcola_punteggio(mano), minimo)
+        r[f"mano/costruzione_{n}_carte"] = misura(lambda: bj.Mano(carte), minimo)
+
+def bench_mazzo(r, minimo):
+    for d in SCALE_MAZZI:
+        regole = bj.Regole(num_mazzi=d)
+        r[f"crea_mazzo/{d}_mazzi"] = misura(lambda: bj.crea_mazzo(num_mazzi=d), minimo)
+        mazzo = bj.Mazzo(regole=regole)
+        # Pescate per un sabot intero, rimischi compresi, diviso per carta
+        n = 52 * d
+        r[f"mazzo_pesca/{d}_mazzi"] = misura(lambda: [mazzo.pesca() for _ in range(n)], minimo) / n
+
+def bench_rendering(r, minimo):
+    bj.imposta_seed(1)
+    mazzo = bj.Mazzo()
+    for n in (2, 5, 10):
+        mano = bj.Mano(mazzo.pesca() for _ in range(n))
+        r[f"mostra_carte_ascii/{n}_carte"] = misura(lambda: bj.mostra_carte_ascii(mano), minimo)
+    banco = bj.Mano((mazzo.pesca(), mazzo.pesca()))
+    for n in SCALE_GIOCATORI:
+        giocatori = giocatori_con_split(n, mazzo)
+        cols, rows = 160, 1000
+        renderer = bj.RendererTerminale(io.StringIO())
+        # Costruzione del frame e disegno misurati a parte: il disegno differenziale
+        # scrive solo le righe cambiate, la costruzione costa uguale nei due casi
+        r[f"righe_tavolo/{n}_giocatori"] = misura(
+            lambda: bj.righe_tavolo(giocatori, banco, 10_000, True, cols), minimo)
+        # Due frame che differiscono solo nell'intestazione del banco, come durante una mano
+        frames = [bj.righe_tavolo(giocatori, banco, saldo, True, cols) for saldo in (10_000, 9_990)]
+        def frame_completo():
+            renderer.invalida()
+            renderer.disegna(frames[0], cols, rows)
+            renderer.stream.seek(0)
+            renderer.stream.truncate()
+        def frame_differenziale():
+            frames.reverse()
+            renderer.disegna(frames[0], cols, rows)
+            renderer.stream.seek(0)
+            renderer.stream.truncate()
+        r[f"disegna/completo_{n}_giocatori"] = misura(frame_completo, minimo)
+        r[f"disegna/differenziale_{n}_giocatori"] = misura(frame_differenziale, minimo)
+        renderer.regione = False  # Niente sequenza di chiusura su stdout all'uscita
+
+def bench_persistenza(r, minimo):
+    bj.imposta_seed(1)
+    originali = bj.SALVA_FILE, bj.GIORNALE_FILE, bj.FORMATO_SALVATAGGIO
+    with tempfile.TemporaryDirectory() as cartella:
+        bj.SALVA_FILE = Path(cartella) / "bench_save.dat"
+        bj.GIORNALE_FILE = Path(cartella) / "bench_save.log"
+        try:
+            for n in SCALE_GIOCATORI:
+                mazzo = bj.Mazzo()
+                giocatori = giocatori_con_split(n, mazzo)
+                testo = json.dumps(bj.stato_to_json(bj.snapshot(giocatori, mazzo, bj.BANCO_START_BANKROLL)))
+                cifrato = bj.encrypt_data(testo)
+                r[f"encrypt_data/{n}_giocatori"] = misura(lambda: bj.encrypt_data(testo), minimo)
+                r[f"decrypt_data/{n}_giocatori"] = misura(lambda: bj.decrypt_data(cifrato), minimo)
+                for formato in ("binario", "json"):
+                    bj.FORMATO_SALVATAGGIO = formato
+                    r[f"salva_stato/{formato}_{n}_giocatori"] = misura(
+                        lambda: bj.salva_stato(giocatori, mazzo, bj.BANCO_START_BANKROLL), minimo)
+                    r[f"carica_stato/{formato}_{n}_giocatori"] = misura(bj.carica_stato, minimo)
+        finally:
+            bj.SALVA_FILE, bj.GIORNALE_FILE, bj.FORMATO_SALVATAGGIO = originali
+
+def bench_mani(r, minimo):
+    for n in SCALE_GIOCATORI:
+        for d in (1, 8):
+            regole = bj.Regole(num_mazzi=d)
+            giocatori = simulazione.crea_tavolo_cpu(n)
+            mazzo = bj.Mazzo(regole=regole)
+            bj.imposta_seed(1)
+            r[f"gioca_mano/{n}_giocatori_{d}_mazzi"] = misura(
+                lambda: simulazione.simula(1, giocatori=giocatori, mazzo=mazzo), minimo)
+
+def bench_vettoriale(r, minimo):
+    if vettoriale.np is None:
+        return  # NumPy non installato: gruppo saltato
+    tabella = vettoriale.tabella_politica("base")
+    composizione = bj.REGOLE_STANDARD.composizione_iniziale
+    for n in (1_000, 100_000):
+        generatore = vettoriale.np.random.default_rng(1)
+        # Microsecondi per round
+        r[f"vettoriale/{n}_round"] = misura(
+            lambda: vettoriale.gioca_round(vettoriale.Sabot(n, composizione, generatore), n, tabella), minimo) / n
+
+SUITE = {
+    "punteggio": bench_punteggio,
+    "mazzo": bench_mazzo,
+    "rendering": bench_rendering,
+    "persistenza": bench_persistenza,
+    "mani": bench_mani,
+    "vettoriale": bench_vettoriale,
+}
+
+def esegui_suite(gruppi=None, minimo=0.2):
+    risultati = {}
+    verboso = bj.VERBOSO
+    bj.imposta_verboso(False)  # Niente messaggi di rimischio o di gioco durante le misure
+    try:
+        for nome, fn in SUITE.items():
+            if gruppi is None or nome in gruppi:
+                fn(risultati, minimo)
+    finally:
+        bj.imposta_verboso(verboso)
+    return {
+        "versione": VERSIONE_RISULTATI,
+        "python": platform.python_version(),
+        "piattaforma": platform.platform(),
+        "unita": "us",
+        "risultati": risultati,
+    }
+
+def confronta(attuale, baseline, tolleranza=TOLLERANZA):
+    # Rapporto attuale/baseline per ogni caso presente in entrambi
+    confronto = {}
+    for nome, us in attuale["risultati"].items():
+        base = baseline["risultati"].get(nome)
+        if base:
+            rapporto = us / base
+            confronto[nome] = {"baseline_us": base, "us": us, "rapporto": rapporto,
+                               "regressione": rapporto > 1 + tolleranza}
+    return confronto
+
+def stampa_suite(suite, confronto=None):
+    print(f"⏱️  Suite (µs per operazione, Python {suite['python']})")
+    for nome, us in suite["risultati"].items():
+        riga = f" - {nome:<52} {us:12.3f}"
+        if confronto and nome in confronto:
+            c = confronto[nome]
+            riga += f"  x{c['rapporto']:.2f}{'  ⚠️ REGRESSIONE' if c['regressione'] else ''}"
+        print(riga)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark di BlackJack.py")
+    parser.add_argument("--gruppi", nargs="+", choices=list(SUITE), help="solo questi gruppi della suite")
+    parser.add_argument("--minimo", type=float, default=0.2, help="secondi minimi per misura")
+    parser.add_argument("--json", action="store_true", help="risultati della suite in JSON su stdout")
+    parser.add_argument("--salva-baseline", type=Path, nargs="?", const=BASELINE_FILE, default=None)
+    parser.add_argument("--baseline", type=Path, nargs="?", const=BASELINE_FILE, default=None,
+                        help="confronta con una baseline; codice 1 se un caso peggiora oltre la tolleranza")
+    parser.add_argument("--tolleranza", type=float, default=TOLLERANZA)
+    parser.add_argument("--solo-suite", action="store_true", help="salta i confronti con le vecchie implementazioni")
+    args = parser.parse_args(argv)
+
+    suite = esegui_suite(args.gruppi, args.minimo)
+    confronto = None
+    if args.baseline:
+        confronto = confronta(suite, json.loads(args.baseline.read_text()), args.tolleranza)
+    if args.salva_baseline:
+        args.salva_baseline.write_text(json.dumps(suite, indent=2))
+
+    if args.json:
+        print(json.dumps(suite | ({"confronto": confronto} if confronto is not None else {}), indent=2))
+    else:
+        if not args.solo_suite:
+            stampa_cifratura(bench_cifratura())
+            stampa_formati(bench_formati())
+        stampa_suite(suite, confronto)
+        if args.salva_baseline:
+            print(f"💾 Baseline salvata in {args.salva_baseline}")
+    if confronto and any(c["regressione"] for c in confronto.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Generatore di carico per server.py: apre molte connessioni TCP in locale,
+# ognuna gioca un numero fisso di mani con una politica semplice, e misura la
+# latenza vista dal client (dalla risposta al messaggio successivo del server).
+import argparse, asyncio, json, time
+from server import PORTA_TCP, codifica, percentili
+
+TIMEOUT = 30.0
+
+def scegli(prompt):
+    richiesta = prompt["richiesta"]
+    if richiesta == "puntata":
+        return "10"
+    if richiesta == "assicurazione":
+        return "0"
+    return "c" if prompt.get("punteggio", 21) < 17 else "s"
+
+async def giocatore_simulato(host, porta, nome, n_mani, latenze):
+    reader, writer = await asyncio.open_connection(host, porta)
+    writer.write(codifica({"tipo": "entra", "nome": nome}) + b"\n")
+    mani = 0
+    t_invio = None
+    try:
+        while mani < n_mani:
+            riga = await asyncio.wait_for(reader.readline(), TIMEOUT)
+            if not riga:
+                break
+            msg = json.loads(riga)
+            tipo = msg["tipo"]
+            if t_invio is not None and tipo in ("prompt", "fine_mano"):
+                latenze.append(time.perf_counter() - t_invio)
+                t_invio = None
+            if tipo == "prompt":
+                writer.write(codifica({"tipo": "risposta", "valore": scegli(msg)}) + b"\n")
+                t_invio = time.perf_counter()
+            elif tipo == "fine_mano":
+                mani += 1
+                if msg["saldo"] <= 0:
+                    break
+        writer.write(codifica({"tipo": "esci"}) + b"\n")
+        await writer.drain()
+    finally:
+        writer.close()
+    return mani
+
+async def statistiche_server(host, porta):
+    reader, writer = await asyncio.open_connection(host, porta)
+    writer.write(codifica({"tipo": "statistiche"}) + b"\n")
+    msg = json.loads(await reader.readline())
+    writer.close()
+    return msg
+
+async def carico(host, porta, n_connessioni, n_mani):
+    latenze = []
+    t0 = time.perf_counter()
+    esiti = await asyncio.gather(
+        *(giocatore_simulato(host, porta, f"Bot{i}", n_mani, latenze) for i in range(n_connessioni)),
+        return_exceptions=True)
+    secondi = time.perf_counter() - t0
+    errori = [e for e in esiti if isinstance(e, BaseException)]
+    mani = sum(e for e in esiti if not isinstance(e, BaseException))
+    return {
+        "connessioni": n_connessioni,
+        "errori": len(errori),
+        "mani_giocatore": mani,
+        "secondi": secondi,
+        "azioni": len(latenze),
+        "azioni_al_secondo": len(latenze) / secondi if secondi > 0 else float("inf"),
+        **percentili(latenze),
+        "server": await statistiche_server(host, porta),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generatore di carico per server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=PORTA_TCP)
+    parser.add_argument("--connessioni", type=int, default=1000)
+    parser.add_argument("--mani", type=int, default=10, help="mani per connessione")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    r = asyncio.run(carico(args.host, args.porta, args.connessioni, args.mani))
+    if args.json:
+        print(json.dumps(r, indent=2))
+        return
+    s = r["server"]
+    print(f"🔌 {r['connessioni']} connessioni ({r['errori']} errori), {r['mani_giocatore']:,} mani-giocatore "
+          f"in {r['secondi']:.2f}s")
+    print(f"⚡ Client: {r['azioni']:,} azioni ({r['azioni_al_secondo']:,.0f}/s), "
+          f"p50 {r['p50_ms']:.2f} ms | p95 {r['p95_ms']:.2f} ms | p99 {r['p99_ms']:.2f} ms")
+    if s.get("azioni"):
+        print(f"🖥️  Server: {s['tavoli']} tavoli, {s['mani']:,} mani, "
+              f"p50 {s['p50_ms']:.2f} ms | p95 {s['p95_ms']:.2f} ms | p99 {s['p99_ms']:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Hall of Fame su SQLite: una riga per partita chiusa (data, motivo, banco
+# finale, vincitore) e una per giocatore con il saldo finale. Gli indici coprono
+# le domande frequenti (classifica di sempre, migliore CPU per difficoltà,
+# partite per motivo, storico di un giocatore), che restano query a indice
+# anche con centinaia di migliaia di partite registrate.
+# Il vecchio blackjack_hof.txt viene importato una volta sola (vedi importa_testo).
+import argparse, json, re, sqlite3
+from datetime import datetime
+from pathlib import Path
+
+DB_FILE = Path(__file__).parent / "blackjack_hof.db"
+TESTO_FILE = Path(__file__).parent / "blackjack_hof.txt"
+FORMATO_DATA = "%Y-%m-%d %H:%M:%S"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS partite (
+    id INTEGER PRIMARY KEY,
+    chiusa TEXT NOT NULL,
+    motivo TEXT NOT NULL,
+    banco_finale INTEGER NOT NULL,
+    vincitore TEXT
+);
+CREATE TABLE IF NOT EXISTS risultati (
+    partita INTEGER NOT NULL REFERENCES partite(id),
+    posizione INTEGER NOT NULL,
+    nome TEXT NOT NULL,
+    cpu INTEGER NOT NULL,
+    difficolta TEXT,
+    saldo INTEGER NOT NULL,
+    PRIMARY KEY (partita, posizione)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS importazioni (
+    percorso TEXT PRIMARY KEY,
+    partite INTEGER NOT NULL,
+    quando TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS risultati_saldo ON risultati(saldo DESC);
+CREATE INDEX IF NOT EXISTS risultati_difficolta ON risultati(difficolta, saldo DESC);
+CREATE INDEX IF NOT EXISTS risultati_nome ON risultati(nome, partita DESC);
+CREATE INDEX IF NOT EXISTS partite_motivo ON partite(motivo, chiusa DESC);
+"""
+
+_COLONNE_RISULTATO = "r.nome, r.cpu, r.difficolta, r.saldo, p.id, p.chiusa, p.motivo"
+
+def _risultato(riga):
+    nome, cpu, difficolta, saldo, partita, chiusa, motivo = riga
+    return {"nome": nome, "cpu": bool(cpu), "difficolta": difficolta, "saldo": saldo,
+            "partita": partita, "chiusa": chiusa, "motivo": motivo}
+
+def _partita(riga):
+    partita, chiusa, motivo, banco_finale, vincitore = riga
+    return {"partita": partita, "chiusa": chiusa, "motivo": motivo,
+            "banco_finale": banco_finale, "vincitore": vincitore}
+
+class HallOfFame:
+    def __init__(self, percorso=DB_FILE):
+        self.percorso = Path(percorso)
+        self.db = sqlite3.connect(self.percorso)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+
+    def chiudi(self):
+        self.db.close()
+
+    def registra(self, motivo, giocatori, banco_bankroll, chiusa=None):
+        # giocatori: oggetti con nome, saldo, cpu, difficolta (es. Giocatore)
+        finali = sorted(((g.nome, g.saldo, g.cpu, g.difficolta if g.cpu else None) for g in giocatori),
+                        key=lambda x: x[1], reverse=True)
+        with self.db:
+            return self._inserisci(chiusa or datetime.now().strftime(FORMATO_DATA), motivo, banco_bankroll, finali)
+
+    def _inserisci(self, chiusa, motivo, banco_finale, finali):
+        # finali: (nome, saldo, cpu, difficolta) in ordine di classifica. Il
+        # commit spetta al chiamante: l'importazione è un'unica transazione.
+        partita = self.db.execute(
+            "INSERT INTO partite (chiusa, motivo, banco_finale, vincitore) VALUES (?, ?, ?, ?)",
+            (chiusa, motivo, banco_finale, finali[0][0] if finali else None)).lastrowid
+        self.db.executemany(
+            "INSERT INTO risultati (partita, posizione, nome, cpu, difficolta, saldo) VALUES (?, ?, ?, ?, ?, ?)",
+            ((partita, i, nome, int(cpu), diff, saldo) for i, (nome, saldo, cpu, diff) in enumerate(finali)))
+        return partita
+
+    # -------------------------------
+    # Query
+    # -------------------------------
+
+    def classifica(self, n=10, cpu=None):
+        # Migliori saldi finali di sempre; cpu=True/False filtra CPU o umani
+        filtro = "" if cpu is None else "WHERE r.cpu = ?"
+        righe = self.db.execute(
+            f"SELECT {_COLONNE_RISULTATO} FROM risultati r JOIN partite p ON p.id = r.partita "
+            f"{filtro} ORDER BY r.saldo DESC LIMIT ?", (() if cpu is None else (int(cpu),)) + (n,))
+        return [_risultato(r) for r in righe]
+
+    def difficolta(self):
+        # Salti sull'indice (un MIN per valore) invece di un DISTINCT su tutte le righe
+        return [d for (d,) in self.db.execute(
+            "WITH RECURSIVE d(x) AS ("
+            " SELECT MIN(difficolta) FROM risultati"
+            " UNION ALL SELECT (SELECT MIN(difficolta) FROM risultati WHERE difficolta > x) FROM d WHERE x IS NOT NULL"
+            ") SELECT x FROM d WHERE x IS NOT NULL")]
+
+    def migliori_per_difficolta(self):
+        # Una ricerca a indice per difficoltà, non una scansione della tabella
+        migliori = {}
+        for diff in self.difficolta():
+            riga = self.db.execute(
+                f"SELECT {_COLONNE_RISULTATO} FROM risultati r JOIN partite p ON p.id = r.partita "
+                "WHERE r.difficolta = ? ORDER BY r.saldo DESC LIMIT 1", (diff,)).fetchone()
+            migliori[diff] = _risultato(riga)
+        return migliori
+
+    def partite_per_motivo(self, motivo, n=20):
+        righe = self.db.execute(
+            "SELECT id, chiusa, motivo, banco_finale, vincitore FROM partite "
+            "WHERE motivo = ? ORDER BY chiusa DESC LIMIT ?", (motivo, n))
+        return [_partita(r) for r in righe]
+
+    def conta_per_motivo(self):
+        return dict(self.db.execute("SELECT motivo, COUNT(*) FROM partite GROUP BY motivo ORDER BY 2 DESC"))
+
+    def storico(self, nome, n=50):
+        # Partite di un giocatore, dalla più recente
+        righe = self.db.execute(
+            f"SELECT {_COLONNE_RISULTATO} FROM risultati r JOIN partite p ON p.id = r.partita "
+            "WHERE r.nome = ? ORDER BY r.partita DESC LIMIT ?", (nome, n))
+        return [_risultato(r) for r in righe]
+
+    def partite(self):
+        return self.db.execute("SELECT COUNT(*) FROM partite").fetchone()[0]
+
+    # -------------------------------
+    # Importazione del vecchio file di testo
+    # -------------------------------
+
+    def importa_testo(self, percorso=TESTO_FILE, forza=False):
+        # Restituisce le partite importate; un file già importato viene saltato
+        percorso = Path(percorso)
+        chiave = str(percorso.resolve())
+        if not percorso.exists():
+            return 0
+        if not forza and self.db.execute("SELECT 1 FROM importazioni WHERE percorso = ?", (chiave,)).fetchone():
+            return 0
+        n = 0
+        with self.db:
+            for chiusa, motivo, banco_finale, finali in leggi_testo(percorso.read_text(encoding="utf-8")):
+                self._inserisci(chiusa, motivo, banco_finale, finali)
+                n += 1
+            self.db.execute("INSERT OR REPLACE INTO importazioni VALUES (?, ?, ?)",
+                            (chiave, n, datetime.now().strftime(FORMATO_DATA)))
+        return n
+
+_RIGA_GIOCATORE = re.compile(r"^ - (.*) \((Giocatore|CPU [^)]+)\): (-?[\d.]+)€$")
+
+def _euro(testo):
+    # Inverso di fmt_euro: "1.234€" -> 1234
+    return int(testo.strip().rstrip("€").replace(".", ""))
+
+def leggi_testo(testo):
+    # Blocchi scritti dal vecchio scrivi_hof: (chiusa, motivo, banco_finale, finali)
+    voci = []
+    for riga in testo.splitlines():
+        if riga.startswith("Partita chiusa il "):
+            chiusa = datetime.strptime(riga[len("Partita chiusa il "):].strip(), FORMATO_DATA)
+            voci.append([chiusa.strftime(FORMATO_DATA), "", 0, []])
+        elif not voci:
+            continue
+        elif riga.startswith("Motivo: "):
+            voci[-1][1] = riga[len("Motivo: "):].strip()
+        elif riga.startswith("Bankroll banco finale: "):
+            voci[-1][2] = _euro(riga[len("Bankroll banco finale: "):])
+        elif m := _RIGA_GIOCATORE.match(riga.rstrip()):
+            nome, ruolo, saldo = m.groups()
+            cpu = ruolo != "Giocatore"
+            voci[-1][3].append((nome, _euro(saldo), cpu, ruolo[4:] if cpu else None))
+    return voci
+
+# ===============================
+# CLI
+# ===============================
+
+def _euro_testo(n):
+    return f"{n:,}".replace(",", ".") + "€"
+
+def _stampa_risultati(titolo, risultati):
+    print(titolo)
+    for i, r in enumerate(risultati, 1):
+        ruolo = f"CPU {r['difficolta']}" if r["cpu"] else "Giocatore"
+        print(f"{i:>3}. {r['nome']} ({ruolo}): {_euro_testo(r['saldo'])} — {r['chiusa']}, {r['motivo']}")
+
+def stampa(args, dati):
+    if args.comando == "classifica":
+        _stampa_risultati("🏆 Classifica di sempre", dati)
+    elif args.comando == "difficolta":
+        _stampa_risultati("🤖 Miglior CPU per difficoltà", dati.values())
+    elif args.comando == "giocatore":
+        _stampa_risultati(f"📜 Storico di {args.nome}", dati)
+    elif args.comando == "motivo" and args.motivo is None:
+        for motivo, n in dati.items():
+            print(f" - {motivo}: {n:,} partite")
+    elif args.comando == "motivo":
+        print(f"🏁 Partite chiuse per \"{args.motivo}\"")
+        for p in dati:
+            print(f" - #{p['partita']} {p['chiusa']}: banco {_euro_testo(p['banco_finale'])}, vincitore {p['vincitore']}")
+    else:
+        print(f"📥 Partite importate da {args.file}: {dati['importate']}")
+
+def main(argv=None):
+    comune = argparse.ArgumentParser(add_help=False)
+    comune.add_argument("--db", type=Path, default=DB_FILE)
+    comune.add_argument("--json", action="store_true")
+    parser = argparse.ArgumentParser(description="Hall of Fame del Blackjack")
+    comandi = parser.add_subparsers(dest="comando", required=True)
+    p = comandi.add_parser("classifica", parents=[comune], help="migliori saldi finali di sempre")
+    p.add_argument("-n", type=int, default=10)
+    chi = p.add_mutually_exclusive_group()
+    chi.add_argument("--cpu", dest="cpu", action="store_const", const=True, default=None)
+    chi.add_argument("--umani", dest="cpu", action="store_const", const=False)
+    comandi.add_parser("difficolta", parents=[comune], help="miglior CPU per difficoltà")
+    p = comandi.add_parser("motivo", parents=[comune], help="partite chiuse per un motivo (senza motivo: conteggi)")
+    p.add_argument("motivo", nargs="?")
+    p.add_argument("-n", type=int, default=20)
+    p = comandi.add_parser("giocatore", parents=[comune], help="storico di un giocatore")
+    p.add_argument("nome")
+    p.add_argument("-n", type=int, default=50)
+    p = comandi.add_parser("importa", parents=[comune], help="importa un vecchio blackjack_hof.txt")
+    p.add_argument("file", type=Path, nargs="?", default=TESTO_FILE)
+    p.add_argument("--forza", action="store_true", help="importa anche se già importato")
+    args = parser.parse_args(argv)
+
+    hof = HallOfFame(args.db)
+    try:
+        if args.comando == "classifica":
+            dati = hof.classifica(args.n, args.cpu)
+        elif args.comando == "difficolta":
+            dati = hof.migliori_per_difficolta()
+        elif args.comando == "motivo":
+            dati = hof.conta_per_motivo() if args.motivo is None else hof.partite_per_motivo(args.motivo, args.n)
+        elif args.comando == "giocatore":
+            dati = hof.storico(args.nome, args.n)
+        else:
+            dati = {"importate": hof.importa_testo(args.file, args.forza)}
+    finally:
+        hof.chiudi()
+    if args.json:
+        print(json.dumps(dati, ensure_ascii=False, indent=2))
+    else:
+        stampa(args, dati)
+
+if __name__ == "__main__":
+    main()
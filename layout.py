@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Impaginazione del tavolo per il terminale. La larghezza a schermo di una riga
+# ignora i codici ANSI (colori) e conta 2 colonne per emoji e caratteri larghi
+# (East Asian Width W/F), 0 per i caratteri combinanti. Ogni Blocco calcola le
+# larghezze delle sue righe una volta sola e le porta con sé: centrare e
+# affiancare blocchi non rimisura mai le stringhe.
+import re, unicodedata
+from functools import lru_cache
+
+_ANSI = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+def _larghezza_carattere(ch):
+    if unicodedata.combining(ch) or unicodedata.category(ch) in ("Mn", "Me", "Cf"):
+        return 0  # Accenti combinanti, selettori di variante (es. U+FE0F), zero-width joiner
+    return 2 if unicodedata.east_asian_width(ch) in ("W", "F") else 1
+
+@lru_cache(maxsize=4096)
+def larghezza(testo):
+    # Le righe si ripetono da un frame all'altro, quindi la misura è in cache
+    if "\x1b" in testo:
+        testo = _ANSI.sub("", testo)
+    if testo.isascii():
+        return len(testo)
+    return sum(map(_larghezza_carattere, testo))
+
+class Blocco:
+    __slots__ = ("righe", "larghezze", "larghezza")
+
+    def __init__(self, righe, larghezze=None):
+        self.righe = tuple(righe)
+        self.larghezze = tuple(larghezze) if larghezze is not None else tuple(map(larghezza, self.righe))
+        self.larghezza = max(self.larghezze, default=0)
+
+    @classmethod
+    def uniforme(cls, righe, w):
+        # Righe tutte larghe w (es. una fila di carte): nessuna misura
+        righe = tuple(righe)
+        return cls(righe, (w,) * len(righe))
+
+    def centrato(self, cols):
+        pad = " " * max(0, (cols - self.larghezza) // 2)
+        return [pad + r for r in self.righe]
+
+    def con_righe_centrate(self, testi):
+        # Aggiunge sotto il blocco righe di testo centrate sulla sua larghezza
+        righe, larghezze = list(self.righe), list(self.larghezze)
+        for t in testi:
+            w = larghezza(t)
+            pad = max(0, (self.larghezza - w) // 2)
+            righe.append(" " * pad + t)
+            larghezze.append(pad + w)
+        return Blocco(righe, larghezze)
+
+def riga_centrata(testo, cols):
+    return " " * max(0, (cols - larghezza(testo)) // 2) + testo
+
+def affianca(blocchi, spaziatura=6):
+    # Unisce i blocchi riga per riga, allineati in alto; ogni riga viene
+    # riempita fino alla larghezza del suo blocco (tranne l'ultimo)
+    altezza = max(len(b.righe) for b in blocchi)
+    sep = " " * spaziatura
+    ultimo = len(blocchi) - 1
+    righe, larghezze = [], []
+    for r in range(altezza):
+        parti = []
+        w = 0
+        for i, b in enumerate(blocchi):
+            if r < len(b.righe):
+                riga, wr = b.righe[r], b.larghezze[r]
+            else:
+                riga, wr = "", 0
+            if i < ultimo:
+                parti.append(riga + " " * (b.larghezza - wr))
+                w += b.larghezza + spaziatura
+            else:
+                parti.append(riga)
+                w += wr
+        righe.append(sep.join(parti))
+        larghezze.append(w)
+    return Blocco(righe, larghezze)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Distribuzione esatta dei totali finali del banco (17..21, sballo, blackjack)
+# data la carta scoperta e la composizione delle carte non viste. Il banco
+# pesca finché ha meno di 17 e sta su tutti i 17 (o pesca sul 17 soft con h17).
+# La ricorsione è sui conteggi per valore; i risultati sono memorizzati in una
+# cache LRU indicizzata da (scoperta, composizione, senza_blackjack, h17).
+import threading
+from collections import OrderedDict
+
+# Valori per conteggio: indice 0 = Asso, 1..8 = 2..9, 9 = 10/J/Q/K
+VALORI = range(1, 11)
+ESITI = ("17", "18", "19", "20", "21", "sballo", "blackjack")
+SBALLO = 5
+BLACKJACK = 6
+MAX_VOCI_CACHE = 4096
+
+def composizione_sabot(num_mazzi):
+    return tuple(16 * num_mazzi if v == 10 else 4 * num_mazzi for v in VALORI)
+
+def _esplora(scoperta, conteggi, senza_blackjack, h17=False):
+    conteggi = list(conteggi)
+    memo = {}
+
+    def gioca(duro, asso, n_carte):
+        chiave = tuple(conteggi)
+        esito = memo.get(chiave)
+        if esito is not None:
+            return esito
+        soft = asso and duro <= 11
+        tot = duro + 10 if soft else duro
+        if tot > 17 or (tot == 17 and not (h17 and soft)):
+            esito = [0.0] * 7
+            if tot > 21:
+                esito[SBALLO] = 1.0
+            elif tot == 21 and n_carte == 2:
+                esito[BLACKJACK] = 1.0
+            else:
+                esito[tot - 17] = 1.0
+            memo[chiave] = esito
+            return esito
+        esito = [0.0] * 7
+        n = sum(conteggi)
+        # Carta coperta condizionata all'assenza di blackjack (il banco ha già sbirciato)
+        escludi = None
+        if n_carte == 1 and senza_blackjack:
+            escludi = 10 if scoperta == 1 else 1 if scoperta == 10 else None
+            if escludi is not None:
+                n -= conteggi[escludi - 1]
+        if n <= 0:
+            # Sabot esaurito (non capita in gioco: si rimischia prima): il banco resta
+            # sotto 17 e viene contato come 17, cioè batte solo le mani sotto 17
+            esito[0] = 1.0
+            memo[chiave] = esito
+            return esito
+        for v in VALORI:
+            c = conteggi[v - 1]
+            if not c or v == escludi:
+                continue
+            p = c / n
+            conteggi[v - 1] -= 1
+            sotto = gioca(duro + v, asso or v == 1, n_carte + 1)
+            conteggi[v - 1] += 1
+            for k in range(7):
+                if sotto[k]:
+                    esito[k] += p * sotto[k]
+        memo[chiave] = esito
+        return esito
+
+    return tuple(gioca(scoperta, scoperta == 1, 1))
+
+class MotoreBanco:
+    # Condiviso dai tavoli di tavoli.py, anche da più thread: la cache è protetta
+    # da un lock, il calcolo di una voce mancante avviene fuori dal lock.
+    def __init__(self, max_voci=MAX_VOCI_CACHE):
+        self.max_voci = max_voci
+        self._cache = OrderedDict()
+        self._blocco = threading.Lock()
+        self.hit = 0
+        self.miss = 0
+
+    def distribuzione(self, scoperta, conteggi, senza_blackjack=False, h17=False):
+        # scoperta: valore 1..10 (1 = Asso); conteggi: carte non viste per valore
+        chiave = (scoperta, tuple(conteggi), senza_blackjack, h17)
+        with self._blocco:
+            esito = self._cache.get(chiave)
+            if esito is not None:
+                self._cache.move_to_end(chiave)
+                self.hit += 1
+                return esito
+            self.miss += 1
+        esito = _esplora(scoperta, chiave[1], senza_blackjack, h17)
+        with self._blocco:
+            self._cache[chiave] = esito
+            if len(self._cache) > self.max_voci:
+                self._cache.popitem(last=False)
+        return esito
+
+    def svuota(self):
+        with self._blocco:
+            self._cache.clear()
+
+motore = MotoreBanco()
+
+def distribuzione_banco(scoperta, conteggi, senza_blackjack=False, h17=False):
+    return motore.distribuzione(scoperta, conteggi, senza_blackjack, h17)
+
+def come_dizionario(esito):
+    return dict(zip(ESITI, esito))
+
+if __name__ == "__main__":
+    import time
+    import BlackJack as bj
+    sabot = composizione_sabot(bj.NUM_MAZZI)
+    print("scoperta " + "".join(f"{e:>10}" for e in ESITI))
+    for v in (2, 3, 4, 5, 6, 7, 8, 9, 10, 1):
+        conteggi = list(sabot)
+        conteggi[v - 1] -= 1
+        t0 = time.perf_counter()
+        esito = distribuzione_banco(v, conteggi)
+        ms = (time.perf_counter() - t0) * 1000
+        print(f"{'A' if v == 1 else v:>8} " + "".join(f"{p:>10.4f}" for p in esito) + f"   {ms:.1f} ms")
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Server di gioco locale: espone i tavoli di tavoli.py a più client con un
+# protocollo JSON a righe su TCP (e, opzionale, su WebSocket). Lo stato è solo
+# sul server: il client manda risposte testuali ai prompt, il motore le valida
+# come farebbe col terminale.
+#
+# Client -> server:  {"tipo": "entra", "nome": "Anna"}
+#                    {"tipo": "risposta", "valore": "c"}
+#                    {"tipo": "statistiche"} | {"tipo": "esci"}
+# Server -> client:  {"tipo": "seduto", "tavolo": "T1", "saldo": 500}
+#                    {"tipo": "prompt", "richiesta": "puntata"|"assicurazione"|"azione", "testo": ...}
+#                    {"tipo": "evento", "azione": "carta", "giocatore": "Anna", "saldo": 490,
+#                     "mani": [["K♠", "7♦"]], "puntate": [10]}
+#                    {"tipo": "fine_mano", "azione": "fine_mano", "banco": [...], "punteggio": 19, "saldo": 510}
+#                    {"tipo": "statistiche", ...} | {"tipo": "errore", "messaggio": ...}
+import argparse, asyncio, base64, hashlib, json, struct, time
+import BlackJack as bj
+import tavoli
+import simulazione
+import strumentazione
+
+PORTA_TCP = 8765
+PORTA_WS = 8766
+MAX_FRAME_WS = 1 << 20
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+def percentili(valori, quali=(50, 95, 99)):
+    if not valori:
+        return {f"p{q}_ms": None for q in quali}
+    ordinati = sorted(valori)
+    return {f"p{q}_ms": ordinati[min(len(ordinati) - 1, len(ordinati) * q // 100)] * 1000 for q in quali}
+
+def codifica(msg):
+    return json.dumps(msg, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+# ===============================
+# TRASPORTI
+# ===============================
+
+class ConnessioneTCP:
+    # Un messaggio JSON per riga
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+    async def ricevi(self):
+        riga = await self.reader.readline()
+        return json.loads(riga) if riga.strip() else None
+    def invia(self, msg):
+        if not self.writer.is_closing():
+            self.writer.write(codifica(msg) + b"\n")
+    async def svuota(self):
+        await self.writer.drain()
+    def chiudi(self):
+        self.writer.close()
+
+class ConnessioneWS(ConnessioneTCP):
+    # WebSocket minimale (RFC 6455): un messaggio JSON per frame di testo,
+    # niente frammentazione né estensioni.
+    async def handshake(self):
+        chiave = None
+        while True:
+            riga = (await self.reader.readline()).decode("latin-1").strip()
+            if not riga:
+                break
+            nome, _, valore = riga.partition(":")
+            if nome.strip().lower() == "sec-websocket-key":
+                chiave = valore.strip()
+        if chiave is None:
+            raise ValueError("Richiesta WebSocket senza Sec-WebSocket-Key.")
+        accetta = base64.b64encode(hashlib.sha1((chiave + _WS_GUID).encode()).digest()).decode()
+        self.writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                           f"Connection: Upgrade\r\nSec-WebSocket-Accept: {accetta}\r\n\r\n").encode())
+    async def ricevi(self):
+        while True:
+            b1, b2 = await self.reader.readexactly(2)
+            opcode, n = b1 & 0x0F, b2 & 0x7F
+            if n == 126:
+                n = struct.unpack(">H", await self.reader.readexactly(2))[0]
+            elif n == 127:
+                n = struct.unpack(">Q", await self.reader.readexactly(8))[0]
+            if n > MAX_FRAME_WS or not b1 & 0x80:
+                raise ValueError("Frame WebSocket non supportato.")
+            maschera = await self.reader.readexactly(4) if b2 & 0x80 else b""
+            dati = await self.reader.readexactly(n)
+            if maschera:
+                dati = bj.xor_chiave(dati, maschera)
+            if opcode == 0x1:
+                return json.loads(dati)
+            if opcode == 0x8:
+                return None
+            if opcode == 0x9:
+                self._frame(0xA, dati)
+    def _frame(self, opcode, dati):
+        n = len(dati)
+        if n < 126:
+            testa = struct.pack(">BB", 0x80 | opcode, n)
+        elif n < 1 << 16:
+            testa = struct.pack(">BBH", 0x80 | opcode, 126, n)
+        else:
+            testa = struct.pack(">BBQ", 0x80 | opcode, 127, n)
+        self.writer.write(testa + dati)
+    def invia(self, msg):
+        if not self.writer.is_closing():
+            self._frame(0x1, codifica(msg))
+
+# ===============================
+# SESSIONI E METRICHE
+# ===============================
+
+class Metriche:
+    # Latenza per azione: dalla risposta di un client al messaggio successivo
+    # del suo tavolo (prossimo prompt a chiunque sia seduto o fine mano), cioè
+    # il tempo speso dal server, senza il tempo di decisione degli altri umani.
+    # I percentili sono sugli ultimi strumentazione.CAMPIONI tempi: memoria e
+    # costo delle statistiche restano fissi anche dopo giorni di server acceso.
+    def __init__(self):
+        self.connessioni = 0
+        self.attive = 0
+        self.azioni = 0
+        self.latenze = strumentazione.Metrica()
+        self._in_corso = {}  # Tavolo -> istante dell'ultima risposta
+    def inizia_azione(self, tavolo):
+        self._in_corso[tavolo] = time.perf_counter()
+    def chiudi_azione(self, tavolo):
+        t0 = self._in_corso.pop(tavolo, None)
+        if t0 is not None:
+            self.azioni += 1
+            self.latenze.osserva(time.perf_counter() - t0)
+    def riepilogo(self, gestore):
+        latenze = self.latenze.riepilogo()
+        return {
+            "connessioni": self.connessioni,
+            "attive": self.attive,
+            "tavoli": len(gestore.tavoli),
+            "mani": sum(t.mani_giocate for t in gestore.tavoli),
+            "azioni": self.azioni,
+            **{k: latenze[k] if self.azioni else None for k in ("p50_ms", "p95_ms", "p99_ms")},
+        }
+
+class SessioneRete(tavoli.SessioneCoda):
+    def __init__(self, connessione, giocatore, tavolo, metriche):
+        super().__init__()
+        self.connessione = connessione
+        self.giocatore = giocatore
+        self.tavolo = tavolo
+        self.metriche = metriche
+    async def chiedi(self, g, testo, contesto):
+        contesto = dict(contesto)
+        if "mano" in contesto:
+            mano = g.mani[contesto["mano"]]
+            contesto["carte"] = bj.nomi_carte(mano)
+            contesto["punteggio"] = mano.punteggio
+        if "carta_banco" in contesto:
+            contesto["carta_banco"] = bj.NOMI_CARTE[contesto["carta_banco"]]
+        return await super().chiedi(g, testo, contesto)
+    async def inoltra_prompt(self):
+        while True:
+            richiesta = await self.richieste.get()
+            richiesta["richiesta"] = richiesta.pop("tipo")
+            self.metriche.chiudi_azione(self.tavolo)
+            self.connessione.invia({"tipo": "prompt", **richiesta})
+            try:
+                await self.connessione.svuota()
+            except ConnectionError:
+                return  # La chiusura la gestisce ServerBlackjack.gestisci
+    def rispondi(self, risposta):
+        if self._attesa is not None:
+            self.metriche.inizia_azione(self.tavolo)
+        super().rispondi(risposta)
+    def notifica(self, tavolo, evento):
+        if evento["azione"] == "fine_mano":
+            self.metriche.chiudi_azione(tavolo)
+            self.connessione.invia({"tipo": "fine_mano", **evento, "saldo": self.giocatore.saldo})
+        else:
+            self.connessione.invia({"tipo": "evento", **evento})
+
+# ===============================
+# SERVER
+# ===============================
+
+class ServerBlackjack:
+    def __init__(self, regole=None, pausa=0.0):
+        self.gestore = tavoli.GestoreTavoli(regole)
+        self.metriche = Metriche()
+        self.pausa = pausa
+        self._partite = {}  # Tavolo -> task di gioco
+
+    def _assegna_tavolo(self):
+        # Riempie i tavoli esistenti prima di aprirne uno nuovo
+        return self.gestore.tavolo_libero() or self.gestore.nuovo_tavolo(pausa=self.pausa)
+
+    def _avvia(self, tavolo):
+        # Il task di un tavolo termina quando non ha più giocatori con saldo
+        task = self._partite.get(tavolo)
+        if task is None or task.done():
+            self._partite[tavolo] = asyncio.create_task(tavolo.gioca())
+
+    async def gestisci(self, conn):
+        self.metriche.connessioni += 1
+        self.metriche.attive += 1
+        tavolo = sessione = inoltro = None
+        try:
+            while (msg := await conn.ricevi()) is not None:
+                tipo = msg.get("tipo")
+                if tipo == "entra" and sessione is None:
+                    g = bj.Giocatore(str(msg.get("nome") or "Giocatore")[:32], saldo=bj.START_SALDO)
+                    tavolo = self._assegna_tavolo()
+                    sessione = SessioneRete(conn, g, tavolo, self.metriche)
+                    tavolo.siedi(g, sessione)
+                    conn.invia({"tipo": "seduto", "tavolo": tavolo.nome, "saldo": g.saldo})
+                    inoltro = asyncio.create_task(sessione.inoltra_prompt())
+                    self._avvia(tavolo)
+                elif tipo == "risposta" and sessione is not None:
+                    sessione.rispondi(str(msg.get("valore", "")))
+                elif tipo == "statistiche":
+                    conn.invia({"tipo": "statistiche", **self.metriche.riepilogo(self.gestore)})
+                elif tipo == "esci":
+                    break
+                else:
+                    conn.invia({"tipo": "errore", "messaggio": f"Messaggio non valido: {tipo}"})
+        except (ValueError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.metriche.attive -= 1
+            if sessione is not None:
+                sessione.chiudi()
+                tavolo.alzati(sessione.giocatore)
+            if inoltro is not None:
+                inoltro.cancel()
+            conn.chiudi()
+
+    async def _tcp(self, reader, writer):
+        await self.gestisci(ConnessioneTCP(reader, writer))
+
+    async def _ws(self, reader, writer):
+        conn = ConnessioneWS(reader, writer)
+        try:
+            await conn.handshake()
+        except (ValueError, ConnectionError, asyncio.IncompleteReadError):
+            conn.chiudi()
+            return
+        await self.gestisci(conn)
+
+    async def servi(self, host="127.0.0.1", porta=PORTA_TCP, porta_ws=None):
+        bj.imposta_verboso(False)
+        server = [await asyncio.start_server(self._tcp, host, porta, backlog=4096)]
+        if porta_ws:
+            server.append(await asyncio.start_server(self._ws, host, porta_ws, backlog=4096))
+        print(f"🃏 Server Blackjack su {host}:{porta}" + (f" (WebSocket {porta_ws})" if porta_ws else ""))
+        await asyncio.gather(*(s.serve_forever() for s in server))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Server di gioco Blackjack (JSON a righe su TCP/WebSocket)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=PORTA_TCP)
+    parser.add_argument("--ws", type=int, nargs="?", const=PORTA_WS, default=None,
+                        help=f"abilita il trasporto WebSocket (porta, default {PORTA_WS})")
+    parser.add_argument("--pausa", type=float, default=0.0, help="secondi tra una mano e l'altra")
+    parser.add_argument("--metriche", type=int, nargs="?", const=strumentazione.PORTA_METRICHE, default=None,
+                        help="tempi per fase su http://127.0.0.1:PORTA/metrics (Prometheus) e /metrics.json")
+    simulazione.aggiungi_argomenti_regole(parser)
+    args = parser.parse_args(argv)
+    if args.metriche:
+        strumentazione.attiva()
+        strumentazione.servi(args.metriche)
+    server = ServerBlackjack(simulazione.regole_da_argomenti(args), args.pausa)
+    try:
+        asyncio.run(server.servi(args.host, args.porta, args.ws))
+    except KeyboardInterrupt:
+        print(json.dumps(server.metriche.riepilogo(server.gestore)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Simulazione headless: gioca mani complete con le stesse regole di
+# BlackJack.py (gioca_mano e fasi collegate) senza output, pause o salvataggi.
+import argparse, json, os, time
+from concurrent.futures import ProcessPoolExecutor
+import BlackJack as bj
+import storico as storico_mani
+import strumentazione
+
+# Saldo "infinito" per le simulazioni lunghe: nessuna CPU va mai a 0€
+SALDO_SIMULAZIONE = 10 ** 12
+
+def crea_tavolo_cpu(n_giocatori=bj.MAX_GIOCATORI_TAVOLO, difficolta=None, saldo=SALDO_SIMULAZIONE):
+    giocatori = []
+    for i in range(n_giocatori):
+        diff = difficolta or bj.DIFFICOLTA_CPU[i % len(bj.DIFFICOLTA_CPU)]
+        giocatori.append(bj.Giocatore(f"CPU{i+1}", saldo=saldo, cpu=True, difficolta=diff))
+    return giocatori
+
+def _nessun_salvataggio(azione=None, g=None):
+    pass
+
+def simula(n_mani, n_giocatori=bj.MAX_GIOCATORI_TAVOLO, difficolta=None, seed=None,
+           giocatori=None, mazzo=None, regole=None, storico=None):
+    # storico: cartella in cui registrare ogni mano (vedi storico.py)
+    if seed is not None:
+        bj.imposta_seed(seed)
+    giocatori = giocatori if giocatori is not None else crea_tavolo_cpu(n_giocatori, difficolta)
+    mazzo = mazzo or bj.Mazzo(regole=regole)
+    saldi_iniziali = [g.saldo for g in giocatori]
+    banco_bankroll_ref = [bj.BANCO_START_BANKROLL]
+
+    verboso = bj.VERBOSO
+    bj.imposta_verboso(False)
+    registratore = storico_mani.RegistratoreMani(storico) if storico else None
+    if registratore is not None:
+        bj.imposta_registratore(registratore)
+    t0 = time.perf_counter()
+    try:
+        for _ in range(n_mani):
+            bj.gioca_mano(mazzo, giocatori, _nessun_salvataggio, giocatori, banco_bankroll_ref)
+    finally:
+        bj.imposta_verboso(verboso)
+        if registratore is not None:
+            bj.imposta_registratore(None)
+            registratore.chiudi()
+    secondi = time.perf_counter() - t0
+
+    return {
+        "mani": n_mani,
+        "secondi": secondi,
+        "mani_al_secondo": n_mani / secondi if secondi > 0 else float("inf"),
+        "banco_delta": banco_bankroll_ref[0] - bj.BANCO_START_BANKROLL,
+        "giocatori": [
+            {
+                "nome": g.nome,
+                "difficolta": g.difficolta,
+                "delta": g.saldo - s0,
+                "ev_per_mano": (g.saldo - s0) / n_mani if n_mani else 0.0,
+                "stats": dict(g.stats),
+            }
+            for g, s0 in zip(giocatori, saldi_iniziali)
+        ],
+    }
+
+# -------------------------------
+# Simulazione parallela
+# -------------------------------
+# Ogni worker è un processo con il proprio rng (seed derivato da seed + indice)
+# e il proprio Mazzo. I risultati vengono uniti nell'ordine dei worker: stesso
+# seed e stesso numero di worker danno esattamente gli stessi numeri.
+
+def seed_worker(seed, indice):
+    return f"{seed}:{indice}"
+
+def _lavoratore(args):
+    n_mani, n_giocatori, difficolta, seed, regole, storico = args
+    return simula(n_mani, n_giocatori, difficolta, seed, regole=regole, storico=storico)
+
+def unisci_risultati(parziali):
+    mani = sum(r["mani"] for r in parziali)
+    giocatori = []
+    for posti in zip(*(r["giocatori"] for r in parziali)):
+        stats = {}
+        for p in posti:
+            for k, v in p["stats"].items():
+                stats[k] = stats.get(k, 0) + v
+        delta = sum(p["delta"] for p in posti)
+        giocatori.append({
+            "nome": posti[0]["nome"],
+            "difficolta": posti[0]["difficolta"],
+            "delta": delta,
+            "ev_per_mano": delta / mani if mani else 0.0,
+            "stats": stats,
+        })
+    return {
+        "mani": mani,
+        "banco_delta": sum(r["banco_delta"] for r in parziali),
+        "giocatori": giocatori,
+    }
+
+def simula_parallelo(n_mani, n_worker=None, n_giocatori=bj.MAX_GIOCATORI_TAVOLO, difficolta=None, seed=0,
+                     regole=None, storico=None):
+    # Con storico ogni worker registra in una sua sottocartella (storico.cartelle_storico)
+    n_worker = n_worker or os.cpu_count() or 1
+    quota, resto = divmod(n_mani, n_worker)
+    lavori = [(quota + (1 if i < resto else 0), n_giocatori, difficolta, seed_worker(seed, i), regole,
+               os.path.join(storico, f"worker{i:03d}") if storico else None)
+              for i in range(n_worker)]
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_worker) as pool:
+        parziali = list(pool.map(_lavoratore, lavori))
+    secondi = time.perf_counter() - t0
+    risultato = unisci_risultati(parziali)
+    risultato["secondi"] = secondi
+    risultato["mani_al_secondo"] = n_mani / secondi if secondi > 0 else float("inf")
+    risultato["worker"] = n_worker
+    return risultato
+
+def riepilogo_per_difficolta(risultato):
+    per_diff = {}
+    for r in risultato["giocatori"]:
+        acc = per_diff.setdefault(r["difficolta"], {"posti": 0, "delta": 0})
+        acc["posti"] += 1
+        acc["delta"] += r["delta"]
+    for acc in per_diff.values():
+        acc["ev_per_mano"] = acc["delta"] / (acc["posti"] * risultato["mani"]) if risultato["mani"] else 0.0
+    return per_diff
+
+def stampa_risultato(risultato):
+    print(f"🎲 Mani simulate: {risultato['mani']:,}".replace(",", "."))
+    print(f"⏱️  Tempo: {risultato['secondi']:.2f}s ({risultato['mani_al_secondo']:,.0f} mani/s)")
+    print(f"💵 Delta banco: {bj.fmt_euro(risultato['banco_delta'])}")
+    for diff, acc in sorted(riepilogo_per_difficolta(risultato).items()):
+        print(f" - CPU {diff} ({acc['posti']} posti): EV {acc['ev_per_mano']:+.4f}€/mano")
+
+# -------------------------------
+# Regole da riga di comando (usate anche da valutatore.py)
+# -------------------------------
+
+def aggiungi_argomenti_regole(parser):
+    g = parser.add_argument_group("regole del tavolo")
+    g.add_argument("--mazzi", type=int, default=bj.NUM_MAZZI)
+    g.add_argument("--penetrazione", type=float, default=bj.CUT_PERCENT,
+                   help="frazione del sabot giocata prima di rimischiare")
+    g.add_argument("--max-split", type=int, default=bj.MAX_SPLIT, help="mani massime dopo gli split")
+    g.add_argument("--h17", action="store_true", help="il banco pesca sul 17 soft")
+    g.add_argument("--pagamento-bj", choices=("3:2", "6:5"), default="3:2")
+    g.add_argument("--no-das", action="store_true", help="niente raddoppio dopo split")
+    g.add_argument("--no-risplit-assi", action="store_true", help="gli Assi si dividono una sola volta")
+    g.add_argument("--resa", choices=bj.RESA_VARIANTI, default="qualsiasi")
+
+def regole_da_argomenti(args):
+    return bj.Regole(num_mazzi=args.mazzi, penetrazione=args.penetrazione, max_split=args.max_split,
+                     banco_h17=args.h17, pagamento_blackjack=1.2 if args.pagamento_bj == "6:5" else 1.5,
+                     raddoppio_dopo_split=not args.no_das, risplit_assi=not args.no_risplit_assi,
+                     resa=args.resa)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulazione headless del Blackjack")
+    parser.add_argument("--mani", type=int, default=100_000, help="numero di mani da giocare")
+    parser.add_argument("--giocatori", type=int, default=bj.MAX_GIOCATORI_TAVOLO, help="posti CPU al tavolo")
+    parser.add_argument("--difficolta", choices=bj.DIFFICOLTA_CPU, default=None,
+                        help="difficoltà di tutte le CPU (default: a rotazione)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--worker", type=int, default=1,
+                        help="processi paralleli (0 = tutti i core); il seed è derivato per worker")
+    parser.add_argument("--storico", default=None, metavar="CARTELLA",
+                        help="registra ogni mano in file colonnari (vedi storico.py)")
+    parser.add_argument("--profilo", choices=("testo", "json", "prometheus"), nargs="?", const="testo",
+                        default=None, help="tempi per fase di gioco (vedi strumentazione.py), solo con --worker 1")
+    aggiungi_argomenti_regole(parser)
+    args = parser.parse_args(argv)
+    if args.profilo and args.worker != 1:
+        parser.error("--profilo misura solo il processo corrente: usa --worker 1")
+    if args.profilo:
+        strumentazione.attiva()
+    regole = regole_da_argomenti(args)
+    print(f"📜 Regole: {regole.descrizione()}")
+    if args.worker == 1:
+        stampa_risultato(simula(args.mani, args.giocatori, args.difficolta, args.seed, regole=regole,
+                                storico=args.storico))
+    else:
+        seed = args.seed if args.seed is not None else 0
+        stampa_risultato(simula_parallelo(args.mani, args.worker or None, args.giocatori, args.difficolta, seed,
+                                          regole, args.storico))
+    if args.profilo == "testo":
+        strumentazione.stampa_riepilogo()
+    elif args.profilo == "json":
+        print(json.dumps(strumentazione.esporta_json(), indent=2))
+    elif args.profilo == "prometheus":
+        print(strumentazione.esporta_prometheus(), end="")
+
+if __name__ == "__main__":
+    main()
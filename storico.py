@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Storico delle mani per le analisi. Ogni mano giocata viene scritta in file
+# colonnari: per ogni colonna un file binario per chunk (array nativi,
+# little-endian sulle macchine comuni, vedi schema.json), riempiti a blocchi da
+# buffer array.array. Due tabelle:
+#  - mani:  una riga per mano al tavolo (banco: totale, Blackjack, carte)
+#  - posti: una riga per mano di ogni giocatore (dopo uno split più righe per
+#           posto): puntata, assicurazione, vincita netta, totale, flag, carte
+# Le carte sono una colonna piatta di byte (0..51) con l'offset di fine per riga
+# (carte_fine, relativo al chunk). I lettori mappano i file in memoria
+# (scansiona) e non caricano mai uno storico intero in RAM.
+import argparse, json, mmap, sys
+from array import array
+from pathlib import Path
+import BlackJack as bj
+
+VERSIONE_STORICO = 1
+RIGHE_PER_BLOCCO = 1 << 16  # Righe nei buffer prima di scrivere su disco
+RIGHE_PER_CHUNK = 1 << 22  # Righe per file prima di aprire un nuovo chunk
+
+# flag della tabella posti
+RADDOPPIO = 1
+SPLIT = 2
+RESA = 4
+BLACKJACK = 8
+SBALLO = 16
+ASSICURATA = 32
+
+# profilo: indice in DIFFICOLTA_CPU per le CPU, oppure
+UMANO = 255
+PERSONALIZZATA = 254  # CPU con una difficoltà fuori da DIFFICOLTA_CPU
+_PROFILI = {d: i for i, d in enumerate(bj.DIFFICOLTA_CPU)}
+
+COLONNE = {
+    "mani": {"mano": "Q", "posti": "B", "banco_totale": "B", "banco_bj": "B", "carte_fine": "I", "carte": "B"},
+    "posti": {"mano": "Q", "posto": "B", "indice": "B", "profilo": "B", "puntata": "q", "assicurazione": "q",
+              "vincita": "q", "totale": "B", "flag": "B", "carte_fine": "I", "carte": "B"},
+}
+
+class _Tabella:
+    def __init__(self, cartella, nome, righe_per_blocco, righe_per_chunk):
+        self.cartella = cartella / nome
+        self.cartella.mkdir(parents=True, exist_ok=True)
+        self.colonne = COLONNE[nome]
+        self.buffer = {c: array(t) for c, t in self.colonne.items()}
+        self.righe_per_blocco = righe_per_blocco
+        self.righe_per_chunk = righe_per_chunk
+        self.chunk = 0
+        self.righe_chunk = 0  # Righe già scritte nel chunk corrente
+        self.carte_chunk = 0  # Carte nel chunk corrente (base di carte_fine)
+        self.righe = 0  # Righe nei buffer
+        self._carte = self.buffer["carte"]
+        self._fine = self.buffer["carte_fine"]
+
+    def percorso(self, colonna, chunk):
+        return self.cartella / f"{colonna}.{chunk:06d}.bin"
+
+    def aggiungi_carte(self, carte):
+        # Ultima colonna di ogni riga: chiude la riga
+        self._carte.extend(carte)
+        self.carte_chunk += len(carte)
+        self._fine.append(self.carte_chunk)
+        self.righe += 1
+        if self.righe >= self.righe_per_blocco:
+            self.scrivi()
+
+    def scrivi(self):
+        if not self.righe:
+            return
+        for colonna, buf in self.buffer.items():
+            with open(self.percorso(colonna, self.chunk), "ab") as f:
+                buf.tofile(f)
+            del buf[:]
+        self.righe_chunk += self.righe
+        self.righe = 0
+        if self.righe_chunk >= self.righe_per_chunk:
+            self.chunk += 1
+            self.righe_chunk = self.carte_chunk = 0
+
+class RegistratoreMani:
+    # Da collegare con BlackJack.imposta_registratore: gioca_mano chiama
+    # inizio_mano dopo le puntate e fine_mano dopo i pagamenti. Non è
+    # thread-safe: un registratore per processo (o per tavolo).
+    def __init__(self, cartella, righe_per_blocco=RIGHE_PER_BLOCCO, righe_per_chunk=RIGHE_PER_CHUNK):
+        self.cartella = Path(cartella)
+        self.cartella.mkdir(parents=True, exist_ok=True)
+        if any(self.cartella.iterdir()):
+            raise ValueError(f"La cartella dello storico {self.cartella} non è vuota.")
+        self.mani = _Tabella(self.cartella, "mani", righe_per_blocco, righe_per_chunk)
+        self.posti = _Tabella(self.cartella, "posti", righe_per_blocco, righe_per_chunk)
+        self.n_mani = 0
+        self._puntate = []
+        # append dei buffer risolti una volta: i buffer vengono svuotati, mai sostituiti
+        self._righe_posti = tuple(self.posti.buffer[c].append for c in (
+            "mano", "posto", "indice", "profilo", "puntata", "assicurazione", "vincita", "totale", "flag"))
+        (self.cartella / "schema.json").write_text(json.dumps({
+            "versione": VERSIONE_STORICO,
+            "byteorder": sys.byteorder,
+            "tabelle": COLONNE,
+            "flag": {"raddoppio": RADDOPPIO, "split": SPLIT, "resa": RESA, "blackjack": BLACKJACK,
+                     "sballo": SBALLO, "assicurata": ASSICURATA},
+            "profili": bj.DIFFICOLTA_CPU,
+            "carte": bj.NOMI_CARTE,
+        }, ensure_ascii=False, indent=2))
+
+    def inizio_mano(self, giocatori):
+        # Puntata iniziale di ogni posto: una mano con il doppio è stata raddoppiata
+        self._puntate = [g.puntate[0] for g in giocatori]
+
+    def fine_mano(self, giocatori, banco, banco_totale, banco_bj):
+        n = self.n_mani
+        b = self.mani.buffer
+        b["mano"].append(n)
+        b["posti"].append(len(giocatori))
+        b["banco_totale"].append(min(banco_totale, 255))
+        b["banco_bj"].append(banco_bj)
+        self.mani.aggiungi_carte(banco)
+        aggiungi_carte = self.posti.aggiungi_carte
+        (a_mano, a_posto, a_indice, a_profilo, a_puntata, a_assicurazione,
+         a_vincita, a_totale, a_flag) = self._righe_posti
+        for posto, (g, iniziale) in enumerate(zip(giocatori, self._puntate)):
+            if iniziale <= 0:
+                continue  # Posto senza puntata in questa mano
+            profilo = _PROFILI.get(g.difficolta, PERSONALIZZATA) if g.cpu else UMANO
+            split = SPLIT if len(g.mani) > 1 else 0
+            for i, mano in enumerate(g.mani):
+                puntata = g.puntate[i]
+                tot = mano.punteggio
+                flag = split
+                if puntata < 0:
+                    flag |= RESA
+                elif puntata == 2 * iniziale:
+                    flag |= RADDOPPIO
+                if mano.blackjack:
+                    flag |= BLACKJACK
+                if tot > 21:
+                    flag |= SBALLO
+                if g.assicurazioni[i]:
+                    flag |= ASSICURATA
+                a_mano(n)
+                a_posto(posto)
+                a_indice(i)
+                a_profilo(profilo)
+                a_puntata(puntata)
+                a_assicurazione(g.assicurazioni[i])
+                a_vincita(g.vincite[i])
+                a_totale(min(tot, 255))
+                a_flag(flag)
+                aggiungi_carte(mano)
+        self.n_mani += 1
+
+    def scrivi(self):
+        self.mani.scrivi()
+        self.posti.scrivi()
+
+    def chiudi(self):
+        self.scrivi()
+
+# ===============================
+# LETTURA
+# ===============================
+
+def cartelle_storico(cartella):
+    # Uno storico o una cartella di storici (es. uno per worker della simulazione)
+    cartella = Path(cartella)
+    if (cartella / "schema.json").exists():
+        return [cartella]
+    return sorted(p.parent for p in cartella.glob("*/schema.json"))
+
+def _mappa(percorso, tipo):
+    with open(percorso, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return memoryview(b"").cast(tipo)
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast(tipo)
+
+def scansiona(cartella, tabella, colonne):
+    # Un dizionario colonna -> memoryview per ogni chunk, mappato dal disco
+    for base in cartelle_storico(cartella):
+        schema = json.loads((base / "schema.json").read_text())
+        if schema["byteorder"] != sys.byteorder:
+            raise ValueError(f"Storico {base} scritto con byteorder {schema['byteorder']}.")
+        tipi = schema["tabelle"][tabella]
+        chunk = 0
+        while (base / tabella / f"{colonne[0]}.{chunk:06d}.bin").exists():
+            yield {c: _mappa(base / tabella / f"{c}.{chunk:06d}.bin", tipi[c]) for c in colonne}
+            chunk += 1
+
+def carte_riga(blocco, riga):
+    # Carte della riga `riga` di un blocco con le colonne carte e carte_fine
+    inizio = blocco["carte_fine"][riga - 1] if riga else 0
+    return blocco["carte"][inizio:blocco["carte_fine"][riga]].tolist()
+
+def riepilogo(cartella):
+    # Esempio di analisi in streaming: un chunk alla volta, memoria costante
+    per_profilo = {}
+    mani = 0
+    for blocco in scansiona(cartella, "mani", ["mano"]):
+        mani += len(blocco["mano"])
+    for blocco in scansiona(cartella, "posti", ["profilo", "puntata", "vincita", "flag"]):
+        for profilo, puntata, vincita, flag in zip(blocco["profilo"], blocco["puntata"],
+                                                    blocco["vincita"], blocco["flag"]):
+            acc = per_profilo.get(profilo)
+            if acc is None:
+                acc = per_profilo[profilo] = {"mani": 0, "puntato": 0, "vincita": 0, "raddoppi": 0,
+                                              "split": 0, "rese": 0, "blackjack": 0, "sballi": 0}
+            acc["mani"] += 1
+            acc["puntato"] += abs(puntata)
+            acc["vincita"] += vincita
+            acc["raddoppi"] += bool(flag & RADDOPPIO)
+            acc["split"] += bool(flag & SPLIT)
+            acc["rese"] += bool(flag & RESA)
+            acc["blackjack"] += bool(flag & BLACKJACK)
+            acc["sballi"] += bool(flag & SBALLO)
+    nomi = {UMANO: "umano", PERSONALIZZATA: "personalizzata", **dict(enumerate(bj.DIFFICOLTA_CPU))}
+    return {"mani": mani, "profili": {nomi.get(p, str(p)): acc for p, acc in sorted(per_profilo.items())}}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Riepilogo di uno storico delle mani")
+    parser.add_argument("cartella", type=Path)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    r = riepilogo(args.cartella)
+    if args.json:
+        print(json.dumps(r, indent=2))
+        return
+    print(f"📼 Mani registrate: {r['mani']:,}".replace(",", "."))
+    for nome, acc in r["profili"].items():
+        resa = acc["vincita"] / acc["puntato"] if acc["puntato"] else 0.0
+        print(f" - {nome}: {acc['mani']:,} mani, resa {resa:+.2%} sul puntato, "
+              f"raddoppi {acc['raddoppi']:,}, split {acc['split']:,}, blackjack {acc['blackjack']:,}")
+
+if __name__ == "__main__":
+    main()
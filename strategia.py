@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Strategia base calcolata per le regole del tavolo (Regole in BlackJack.py):
+#  - banco sta su tutti i 17 o pesca sul 17 soft (h17); sbircia il Blackjack solo con
+#    l'Asso scoperto (fase_assicurazione); con un 10 scoperto il suo Blackjack vale 21
+#  - Blackjack pagato 3:2 o 6:5, anche un 21 con 2 carte dopo uno split
+#  - raddoppio su 2 carte, dopo split solo con das; resa "qualsiasi" (anche dopo split),
+#    "iniziale" o "nessuna"
+#  - split fino a max_split mani, risplit degli Assi solo con risplit_assi
+# La distribuzione finale del banco è esatta sulla composizione del sabot (NUM_MAZZI meno
+# la carta scoperta, vedi probabilita.py); le pescate del giocatore usano le probabilità
+# della stessa composizione.
+# Le tabelle vengono calcolate una volta e salvate su disco.
+import json
+from functools import lru_cache
+from pathlib import Path
+import probabilita
+
+VERSIONE_TABELLE = 2
+STRATEGIA_FILE = Path(__file__).parent / "blackjack_strategia.json"
+
+# Valori di pescata: 1 = Asso, 10 = tutte le figure e il 10
+VALORI_PESCA = range(1, 11)
+# Indice della carta scoperta nelle tabelle: 2..10 -> 0..8, Asso -> 9
+ETICHETTE_SCOPERTA = ["2", "3", "4", "5", "6", "7", "8", "9", "10", "A"]
+
+def indice_scoperta(valore):
+    return 9 if valore == 1 else valore - 2
+
+def _valore_da_indice(idx):
+    return 1 if idx == 9 else idx + 2
+
+def _totale(duro, asso):
+    return duro + 10 if asso and duro <= 11 else duro
+
+composizione_sabot = probabilita.composizione_sabot
+
+def distribuzione_banco(scoperta, conteggi, h17=False):
+    # Totali finali del banco indicizzati 17..21, 22 = sballo. Con l'Asso scoperto
+    # il Blackjack è già stato risolto (niente carta coperta da 10); con il 10
+    # scoperto non si sbircia e il Blackjack del banco vale come 21.
+    esito = probabilita.distribuzione_banco(scoperta, conteggi, senza_blackjack=scoperta == 1, h17=h17)
+    dist = [0.0] * 23
+    for t in range(17, 22):
+        dist[t] = esito[t - 17]
+    dist[21] += esito[probabilita.BLACKJACK]
+    dist[22] = esito[probabilita.SBALLO]
+    return dist
+
+class _Analisi:
+    def __init__(self, scoperta, conteggi, max_split, h17=False, pagamento_bj=1.5,
+                 das=True, resa="qualsiasi", risplit_assi=True):
+        self.scoperta = scoperta
+        self.max_split = max_split
+        self.pagamento_bj = pagamento_bj
+        self.das = das
+        self.resa = resa
+        self.risplit_assi = risplit_assi
+        rimasti = list(conteggi)
+        rimasti[scoperta - 1] -= 1
+        n = sum(rimasti)
+        self.p = [c / n for c in rimasti]
+        self.banco = distribuzione_banco(scoperta, rimasti, h17)
+        self.stai = lru_cache(maxsize=None)(self._stai)
+        self.migliore = lru_cache(maxsize=None)(self._migliore)
+
+    def _stai(self, tot):
+        if tot > 21:
+            return -1.0
+        d = self.banco
+        vince = d[22] + sum(d[t] for t in range(17, 22) if t < tot)
+        perde = sum(d[t] for t in range(17, 22) if t > tot)
+        return vince - perde
+
+    def pesca(self, duro, asso):
+        ev = 0.0
+        for v in VALORI_PESCA:
+            d2, a2 = duro + v, asso or v == 1
+            ev += self.p[v - 1] * (-1.0 if d2 > 21 else self.migliore(d2, a2))
+        return ev
+
+    def _migliore(self, duro, asso):
+        # Mano con 3+ carte: solo carta o stai
+        return max(self.stai(_totale(duro, asso)), self.pesca(duro, asso))
+
+    def raddoppia(self, duro, asso):
+        return 2.0 * sum(self.p[v - 1] * self.stai(_totale(duro + v, asso or v == 1)) for v in VALORI_PESCA)
+
+    def opzioni_due_carte(self, duro, asso, dopo_split=False):
+        opz = {
+            "S": self.stai(_totale(duro, asso)),
+            "H": self.pesca(duro, asso),
+        }
+        if self.das or not dopo_split:
+            opz["D"] = self.raddoppia(duro, asso)
+        if self.resa == "qualsiasi" or (self.resa == "iniziale" and not dopo_split):
+            opz["R"] = -0.5
+        return opz
+
+    def blackjack(self):
+        # 21 con due carte: pagato come Blackjack salvo pareggio con un 21 del banco
+        return self.pagamento_bj * (1.0 - self.banco[21])
+
+    def mano_dopo_split(self, v1, v2):
+        duro, asso = v1 + v2, v1 == 1 or v2 == 1
+        if _totale(duro, asso) == 21:
+            return self.blackjack()
+        return max(self.opzioni_due_carte(duro, asso, dopo_split=True).values())
+
+    def split(self, v):
+        # EV di ciascuna mano nata da uno split con `mani` mani in gioco; un nuovo
+        # split della stessa coppia è trattato come due mani indipendenti.
+        @lru_cache(maxsize=None)
+        def mano(mani):
+            ev = 0.0
+            for c in VALORI_PESCA:
+                gioca = self.mano_dopo_split(v, c)
+                if c == v and mani < self.max_split and (v != 1 or self.risplit_assi):
+                    gioca = max(gioca, 2.0 * mano(mani + 1))
+                ev += self.p[c - 1] * gioca
+            return ev
+        return 2.0 * mano(2)
+
+def calcola_tabelle(num_mazzi, max_split, **regole):
+    # regole: h17, pagamento_bj, das, resa, risplit_assi (vedi _Analisi)
+    conteggi = composizione_sabot(num_mazzi)
+    # pesca[soft][totale][scoperta] e due_carte[soft][totale][scoperta], totale 0..21
+    pesca = [[[False] * 10 for _ in range(22)] for _ in range(2)]
+    due_carte = [[["S"] * 10 for _ in range(22)] for _ in range(2)]
+    split = [[False] * 10 for _ in range(11)]  # split[valore][scoperta], valore 1..10
+    for idx in range(10):
+        a = _Analisi(_valore_da_indice(idx), conteggi, max_split, **regole)
+        for duro in range(2, 22):
+            for asso in (False, True):
+                if asso and duro > 11:
+                    continue
+                tot = _totale(duro, asso)
+                soft = 1 if asso and duro <= 11 else 0
+                pesca[soft][tot][idx] = a.pesca(duro, asso) > a.stai(tot)
+                opz = a.opzioni_due_carte(duro, asso)
+                due_carte[soft][tot][idx] = max(opz, key=opz.get)
+        for v in VALORI_PESCA:
+            duro, asso = 2 * v, v == 1
+            non_split = max(a.opzioni_due_carte(duro, asso).values())
+            split[v][idx] = a.split(v) > non_split
+    return {"pesca": pesca, "due_carte": due_carte, "split": split}
+
+def chiave_regole(num_mazzi, max_split, **regole):
+    extra = "".join(f";{k}={regole[k]}" for k in sorted(regole))
+    return f"v{VERSIONE_TABELLE};mazzi={num_mazzi};split={max_split}{extra}"
+
+def carica_tabelle(num_mazzi, max_split, percorso=STRATEGIA_FILE, **regole):
+    chiave = chiave_regole(num_mazzi, max_split, **regole)
+    cache = {}
+    try:
+        cache = json.loads(percorso.read_text())
+        if chiave in cache:
+            return cache[chiave]
+    except (OSError, ValueError):
+        pass
+    tabelle = calcola_tabelle(num_mazzi, max_split, **regole)
+    cache[chiave] = tabelle
+    try:
+        percorso.write_text(json.dumps(cache))
+    except OSError:
+        pass
+    return tabelle
+
+def stampa_tabelle(tabelle):
+    intest = "      " + "".join(f"{u:>4}" for u in ETICHETTE_SCOPERTA)
+    print("Mani dure (2 carte)")
+    print(intest)
+    for tot in range(5, 21):
+        print(f"H{tot:<5}" + "".join(f"{a:>4}" for a in tabelle["due_carte"][0][tot]))
+    print("Mani soft (2 carte)")
+    print(intest)
+    for tot in range(13, 21):
+        print(f"S{tot:<5}" + "".join(f"{a:>4}" for a in tabelle["due_carte"][1][tot]))
+    print("Coppie (P = dividi)")
+    print(intest)
+    for v in VALORI_PESCA:
+        nome = "A" if v == 1 else str(v)
+        print(f"P{nome:<5}" + "".join(f"{'P' if s else '-':>4}" for s in tabelle["split"][v]))
+
+if __name__ == "__main__":
+    import BlackJack as bj
+    stampa_tabelle(bj.tabelle_strategia_base())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Strumentazione delle fasi di gioco, attivabile a runtime. attiva() sostituisce
+# nel modulo BlackJack le funzioni misurate (fasi di gioca_mano, salvataggio,
+# caricamento, rendering) con versioni cronometrate; disattiva() rimette le
+# originali. Da spenta il costo è zero: il motore chiama le funzioni originali.
+# Per ogni fase: chiamate, tempo cumulato, massimo, percentili sugli ultimi
+# CAMPIONI tempi e byte scritti. Esportazione in JSON o testo Prometheus,
+# anche da un endpoint HTTP locale (servi).
+import json, threading, time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import BlackJack as bj
+
+CAMPIONI = 4096  # Tempi recenti per fase tenuti per i percentili
+QUANTILI = (0.5, 0.95, 0.99)
+PORTA_METRICHE = 9464
+
+class Metrica:
+    __slots__ = ("chiamate", "totale", "massimo", "byte", "_campioni", "_i", "_lock")
+
+    def __init__(self):
+        self._lock = threading.Lock()  # I tavoli di tavoli.py girano anche in thread
+        self.azzera()
+
+    def azzera(self):
+        self.chiamate = 0
+        self.totale = 0.0
+        self.massimo = 0.0
+        self.byte = 0
+        self._campioni = array("d")
+        self._i = 0
+
+    def osserva(self, secondi, byte=0):
+        with self._lock:
+            self.chiamate += 1
+            self.totale += secondi
+            self.byte += byte
+            if secondi > self.massimo:
+                self.massimo = secondi
+            if len(self._campioni) < CAMPIONI:
+                self._campioni.append(secondi)
+            else:
+                self._campioni[self._i] = secondi
+                self._i = (self._i + 1) % CAMPIONI
+
+    def quantili(self):
+        with self._lock:
+            ordinati = sorted(self._campioni)
+        if not ordinati:
+            return {q: 0.0 for q in QUANTILI}
+        return {q: ordinati[min(len(ordinati) - 1, int(len(ordinati) * q))] for q in QUANTILI}
+
+    def riepilogo(self):
+        q = self.quantili()
+        return {
+            "chiamate": self.chiamate,
+            "totale_s": self.totale,
+            "medio_ms": self.totale / self.chiamate * 1000 if self.chiamate else 0.0,
+            **{f"p{round(k * 100)}_ms": v * 1000 for k, v in q.items()},
+            "max_ms": self.massimo * 1000,
+            "byte": self.byte,
+        }
+
+metriche = {}
+_originali = {}  # (oggetto, attributo) -> funzione originale
+
+def _byte_risultato(args, risultato):
+    return risultato or 0
+
+def _byte_renderer(args, risultato):
+    return args[0].ultimo_byte
+
+# fase -> (oggetto, attributo, byte scritti o None)
+PUNTI = {
+    "mano": (bj, "gioca_mano", None),
+    "puntate": (bj, "fase_puntate", None),
+    "distribuzione": (bj, "anim_distribuzione_mano_iniziale", None),
+    "assicurazione": (bj, "fase_assicurazione", None),
+    "turno_giocatore": (bj, "turno_giocatore", None),
+    "banco": (bj, "turno_banco", None),
+    "pagamenti": (bj, "applica_risultati_e_bankroll", None),
+    "salva_stato": (bj, "salva_stato", None),
+    "snapshot": (bj, "scrivi_snapshot", None),
+    "scrittura_file": (bj, "scrivi_atomico", _byte_risultato),
+    "giornale": (bj.GiornaleSalvataggio, "_scrivi", _byte_risultato),
+    "carica_stato": (bj, "carica_stato", None),
+    "righe_tavolo": (bj, "righe_tavolo", None),
+    "render": (bj.RendererTerminale, "disegna", _byte_renderer),
+}
+
+def _cronometra(fn, metrica, byte):
+    perf_counter = time.perf_counter
+    if byte is None:
+        def misurata(*args, **kwargs):
+            t0 = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metrica.osserva(perf_counter() - t0)
+    else:
+        def misurata(*args, **kwargs):
+            t0 = perf_counter()
+            risultato = fn(*args, **kwargs)
+            metrica.osserva(perf_counter() - t0, byte(args, risultato))
+            return risultato
+    misurata.__wrapped__ = fn
+    misurata.__name__ = fn.__name__
+    return misurata
+
+def attiva(fasi=None):
+    for fase, (oggetto, attributo, byte) in PUNTI.items():
+        if (fasi is not None and fase not in fasi) or (oggetto, attributo) in _originali:
+            continue
+        fn = getattr(oggetto, attributo)
+        _originali[(oggetto, attributo)] = fn
+        setattr(oggetto, attributo, _cronometra(fn, metriche.setdefault(fase, Metrica()), byte))
+
+def disattiva():
+    for (oggetto, attributo), fn in _originali.items():
+        setattr(oggetto, attributo, fn)
+    _originali.clear()
+
+def attiva_ora():
+    return bool(_originali)
+
+def azzera():
+    for m in metriche.values():
+        with m._lock:
+            m.azzera()
+
+# ===============================
+# ESPORTAZIONE
+# ===============================
+
+def esporta_json():
+    return {"attiva": attiva_ora(), "metriche": {f: m.riepilogo() for f, m in metriche.items()}}
+
+def esporta_prometheus():
+    righe = ["# HELP blackjack_fase_secondi Durata delle fasi di gioco e di I/O.",
+             "# TYPE blackjack_fase_secondi summary"]
+    for fase, m in metriche.items():
+        for q, v in m.quantili().items():
+            righe.append(f'blackjack_fase_secondi{{fase="{fase}",quantile="{q}"}} {v:.9f}')
+        righe.append(f'blackjack_fase_secondi_sum{{fase="{fase}"}} {m.totale:.9f}')
+        righe.append(f'blackjack_fase_secondi_count{{fase="{fase}"}} {m.chiamate}')
+    righe += ["# HELP blackjack_byte_scritti_total Byte scritti su file o terminale.",
+              "# TYPE blackjack_byte_scritti_total counter"]
+    for fase, (_, _, byte) in PUNTI.items():
+        if byte is not None and fase in metriche:
+            righe.append(f'blackjack_byte_scritti_total{{fase="{fase}"}} {metriche[fase].byte}')
+    return "\n".join(righe) + "\n"
+
+def stampa_riepilogo():
+    print("⏱️  Fasi (ms)              chiamate      totale     medio       p50       p95       p99       max")
+    for fase, r in sorted(esporta_json()["metriche"].items(), key=lambda x: -x[1]["totale_s"]):
+        byte = f"  {r['byte']:,} byte" if r["byte"] else ""
+        print(f" - {fase:<20} {r['chiamate']:>10,} {r['totale_s'] * 1000:>11.1f} {r['medio_ms']:>9.4f} "
+              f"{r['p50_ms']:>9.4f} {r['p95_ms']:>9.4f} {r['p99_ms']:>9.4f} {r['max_ms']:>9.3f}{byte}")
+
+class _Richiesta(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            corpo, tipo = esporta_prometheus().encode(), "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path == "/metrics.json":
+            corpo, tipo = json.dumps(esporta_json()).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+    def log_message(self, *args):
+        pass
+
+def servi(porta=PORTA_METRICHE, host="127.0.0.1"):
+    # Endpoint locale in un thread daemon: /metrics (Prometheus) e /metrics.json
+    server = ThreadingHTTPServer((host, porta), _Richiesta)
+    threading.Thread(target=server.serve_forever, name="metriche", daemon=True).start()
+    return server
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Gestore multi-tavolo asyncio: molti tavoli indipendenti nello stesso processo,
+# ognuno con il proprio Mazzo, bankroll del banco e posti. I tavoli di sole CPU
+# giocano le mani direttamente nel loop, una mano alla volta; un tavolo con
+# giocatori umani gioca in un suo thread e le decisioni umane diventano prompt
+# awaitable sul loop, così l'attesa di un umano non ferma gli altri tavoli.
+# Ogni tavolo ha il suo generatore casuale (sabot e decisioni delle CPU sedute)
+# e il suo contesto (chiedi e registratore di BlackJack): con lo stesso seed un
+# tavolo rigioca le stesse mani, qualunque cosa facciano gli altri.
+import argparse, asyncio, contextvars, random, time
+from concurrent.futures import ThreadPoolExecutor
+import BlackJack as bj
+import simulazione
+
+# ===============================
+# SESSIONI UMANE
+# ===============================
+
+class SessioneUmana:
+    # Collega un giocatore umano al suo client. chiedi() riceve il contesto di
+    # BlackJack.chiedi e restituisce la risposta testuale; notifica() riceve gli
+    # eventi del tavolo (vedi evento()), sempre sul loop.
+    async def chiedi(self, g, testo, contesto):
+        raise NotImplementedError
+    def notifica(self, tavolo, evento):
+        pass
+
+class SessioneCoda(SessioneUmana):
+    # Prompt e risposte tramite coda: il client legge `richieste` e risponde con
+    # rispondi(). Dopo chiudi() ogni decisione prende la risposta predefinita.
+    def __init__(self):
+        self.richieste = asyncio.Queue()
+        self.chiusa = False
+        self._attesa = None
+        self._predefinito = ""
+    async def chiedi(self, g, testo, contesto):
+        self._predefinito = contesto.get("predefinito", "")
+        if self.chiusa:
+            return self._predefinito
+        self._attesa = asyncio.get_running_loop().create_future()
+        await self.richieste.put({"testo": testo, **contesto})
+        try:
+            return await self._attesa
+        finally:
+            self._attesa = None
+    def rispondi(self, risposta):
+        if self._attesa is not None and not self._attesa.done():
+            self._attesa.set_result(risposta)
+    def chiudi(self):
+        self.chiusa = True
+        self.rispondi(self._predefinito)
+
+class SessioneTerminale(SessioneUmana):
+    # Giocatore umano sul terminale del processo: input() gira in un thread
+    # del loop, gli altri tavoli continuano a giocare mentre si decide.
+    def __init__(self, giocatore):
+        self.giocatore = giocatore
+    async def chiedi(self, g, testo, contesto):
+        if "mano" in contesto:
+            mano = g.mani[contesto["mano"]]
+            print(f"\n🃏 {g.nome} — mano {contesto['mano']+1}: {' '.join(bj.nomi_carte(mano))} "
+                  f"({mano.punteggio}) | banco: {bj.NOMI_CARTE[contesto['carta_banco']]}")
+        return await asyncio.to_thread(input, testo)
+    def notifica(self, tavolo, evento):
+        if evento["azione"] == "fine_mano":
+            print(f"🏦 Banco: {' '.join(evento['banco'])} ({evento['punteggio']}) | "
+                  f"{self.giocatore.nome}: {bj.fmt_euro(self.giocatore.saldo)}")
+
+# ===============================
+# TAVOLO
+# ===============================
+
+def evento(azione, g=None):
+    # Istantanea presa quando l'azione avviene: dal thread del tavolo l'evento
+    # arriva al loop più tardi, quando il giocatore può essere già cambiato.
+    # Azioni: quelle di salva_cb più "fine_mano" (con le carte del banco).
+    if g is None:
+        return {"azione": azione}
+    return {"azione": azione, "giocatore": g.nome, "saldo": g.saldo,
+            "mani": [bj.nomi_carte(m) for m in g.mani], "puntate": list(g.puntate)}
+
+def cpu_casuali(n, saldo=bj.START_SALDO, generatore=None):
+    generatore = generatore or bj.rng
+    nomi = generatore.sample(bj.NOMI_REALI, k=min(n, len(bj.NOMI_REALI)))
+    return [bj.Giocatore(nomi[i % len(nomi)], saldo=saldo, cpu=True,
+                         difficolta=generatore.choice(bj.DIFFICOLTA_CPU)) for i in range(n)]
+
+class Tavolo:
+    def __init__(self, nome, regole=None, seed=None, banco_bankroll=bj.BANCO_START_BANKROLL, pausa=0.0,
+                 registratore=None):
+        self.nome = nome
+        self.generatore = random.Random(seed)
+        self.mazzo = bj.Mazzo(self.generatore, regole)
+        self.banco_bankroll_ref = [banco_bankroll]
+        self.giocatori = []
+        self.sessioni = {}  # Giocatore umano -> SessioneUmana
+        self.ascoltatori = []  # fn(tavolo, evento), chiamate sul loop
+        self.pausa = pausa  # Secondi tra una mano e l'altra
+        self.mani_giocate = 0
+        self.ultimo_banco = None
+        self._loop = None
+        self._esecutore = None  # Thread del tavolo, solo con giocatori umani
+        self._contesto = contextvars.copy_context()  # Le mani girano sempre qui dentro
+        self._contesto.run(bj.imposta_registratore, registratore)
+
+    def posti_liberi(self):
+        return bj.MAX_GIOCATORI_TAVOLO - len(self.giocatori)
+    def siedi(self, g, sessione=None):
+        # I cambi di posto valgono dalla mano successiva
+        if not self.posti_liberi():
+            raise ValueError(f"Tavolo {self.nome} al completo.")
+        if not g.cpu and sessione is None:
+            raise ValueError("Un giocatore umano deve avere una sessione.")
+        self.giocatori.append(g)
+        g.generatore = self.generatore
+        if sessione is not None:
+            self.sessioni[g] = sessione
+    def alzati(self, g):
+        self.giocatori.remove(g)
+        self.sessioni.pop(g, None)
+        g.generatore = None
+    def attivo(self):
+        return self.banco_bankroll_ref[0] > 0 and any(g.saldo > 0 for g in self.giocatori)
+
+    def _emetti(self, ev):
+        for fn in self.ascoltatori:
+            fn(self, ev)
+        for sessione in self.sessioni.values():
+            sessione.notifica(self, ev)
+    def _salva_cb(self, azione, g=None):
+        if self.ascoltatori or self.sessioni:
+            self._emetti(evento(azione, g))
+    def _salva_cb_thread(self, azione, g=None):
+        self._loop.call_soon_threadsafe(self._emetti, evento(azione, g))
+    def _chiedi_bloccante(self, g, testo, **contesto):
+        # Gira nel thread del tavolo: attende il prompt awaitable della sessione sul loop
+        sessione = self.sessioni.get(g)
+        if sessione is None:
+            return contesto.get("predefinito", "")
+        return asyncio.run_coroutine_threadsafe(sessione.chiedi(g, testo, contesto), self._loop).result()
+    def _gioca_in_thread(self, posti):
+        bj.imposta_chiedi(self._chiedi_bloccante)
+        return bj.gioca_mano(self.mazzo, posti, self._salva_cb_thread, posti, self.banco_bankroll_ref)
+
+    async def gioca_mano(self):
+        self._loop = asyncio.get_running_loop()
+        posti = list(self.giocatori)
+        if any(g in self.sessioni for g in posti):
+            if self._esecutore is None:
+                self._esecutore = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"tavolo-{self.nome}")
+            banco = await self._loop.run_in_executor(self._esecutore, self._contesto.run,
+                                                     self._gioca_in_thread, posti)
+        else:
+            banco = self._contesto.run(bj.gioca_mano, self.mazzo, posti, self._salva_cb, posti,
+                                       self.banco_bankroll_ref)
+        self.mani_giocate += 1
+        self.ultimo_banco = banco
+        if self.ascoltatori or self.sessioni:
+            self._emetti({"azione": "fine_mano", "banco": bj.nomi_carte(banco), "punteggio": banco.punteggio})
+        # Le CPU senza soldi lasciano il posto, gli umani restano seduti
+        for g in [g for g in self.giocatori if g.cpu and g.saldo <= 0]:
+            self.alzati(g)
+        return banco
+
+    async def gioca(self, n_mani=None):
+        try:
+            while (n_mani is None or self.mani_giocate < n_mani) and self.attivo():
+                await self.gioca_mano()
+                await asyncio.sleep(self.pausa)  # Anche con pausa 0 cede il loop agli altri tavoli
+        finally:
+            if self._esecutore is not None:
+                self._esecutore.shutdown(wait=False)
+                self._esecutore = None
+
+# ===============================
+# GESTORE
+# ===============================
+
+class GestoreTavoli:
+    def __init__(self, regole=None):
+        self.regole = regole
+        self.tavoli = []
+    def nuovo_tavolo(self, nome=None, **opzioni):
+        opzioni.setdefault("regole", self.regole)
+        t = Tavolo(nome or f"T{len(self.tavoli)+1}", **opzioni)
+        self.tavoli.append(t)
+        return t
+    def tavolo_libero(self):
+        return next((t for t in self.tavoli if t.posti_liberi()), None)
+    async def esegui(self, n_mani=None):
+        # I tavoli girano headless: le informazioni per gli umani passano dalle sessioni
+        verboso = bj.VERBOSO
+        bj.imposta_verboso(False)
+        try:
+            await asyncio.gather(*(t.gioca(n_mani) for t in self.tavoli))
+        finally:
+            bj.imposta_verboso(verboso)
+
+def stampa_riepilogo(gestore, secondi):
+    mani = sum(t.mani_giocate for t in gestore.tavoli)
+    print(f"🏁 {len(gestore.tavoli)} tavoli, {mani:,} mani in {secondi:.2f}s "
+          f"({mani / secondi if secondi > 0 else float('inf'):,.0f} mani/s)")
+    for t in gestore.tavoli[:20]:
+        print(f" - {t.nome}: {t.mani_giocate} mani, banco {bj.fmt_euro(t.banco_bankroll_ref[0])}, "
+              f"{len(t.giocatori)} posti")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Molti tavoli di Blackjack nello stesso processo")
+    parser.add_argument("--tavoli", type=int, default=20)
+    parser.add_argument("--mani", type=int, default=200, help="mani per tavolo")
+    parser.add_argument("--cpu", type=int, default=bj.MAX_GIOCATORI_TAVOLO - 1, help="CPU per tavolo")
+    parser.add_argument("--umano", action="store_true", help="siediti al primo tavolo")
+    parser.add_argument("--seed", type=int, default=None)
+    simulazione.aggiungi_argomenti_regole(parser)
+    args = parser.parse_args(argv)
+    if args.seed is not None:
+        bj.imposta_seed(args.seed)
+
+    gestore = GestoreTavoli(simulazione.regole_da_argomenti(args))
+    for i in range(args.tavoli):
+        t = gestore.nuovo_tavolo(seed=None if args.seed is None else f"{args.seed}:{i}")
+        if i == 0 and args.umano:
+            umano = bj.Giocatore(input("Inserisci il tuo nome: ") or "Giocatore")
+            t.siedi(umano, SessioneTerminale(umano))
+        for g in cpu_casuali(min(args.cpu, t.posti_liberi())):
+            t.siedi(g)
+
+    t0 = time.perf_counter()
+    asyncio.run(gestore.esegui(args.mani))
+    stampa_riepilogo(gestore, time.perf_counter() - t0)
+
+if __name__ == "__main__":
+    main()
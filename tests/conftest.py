@@ -0,0 +1,18 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import BlackJack as bj
+
+
+@pytest.fixture
+def partita_headless(tmp_path, monkeypatch):
+    # Salvataggio e giornale in una cartella temporanea, niente output, seed fisso
+    monkeypatch.setattr(bj, "SALVA_FILE", tmp_path / "blackjack_save.dat")
+    monkeypatch.setattr(bj, "GIORNALE_FILE", tmp_path / "blackjack_save.log")
+    monkeypatch.setattr(bj, "VERBOSO", False)
+    bj.imposta_seed(7)
+    return tmp_path
@@ -0,0 +1,139 @@
+import base64
+import json
+from array import array
+
+import pytest
+
+import BlackJack as bj
+
+
+def giocatori_cpu(n=3):
+    return [bj.Giocatore(f"CPU{i}", cpu=True, difficolta=("aggressiva", "base", "cauta")[i % 3]) for i in range(n)]
+
+def ricarica():
+    # Come main(): stato salvato -> oggetti vivi
+    stato = bj.carica_stato()
+    giocatori = [bj.Giocatore(g["nome"], g["saldo"], g["cpu"], g["difficolta"], g["stats"],
+                              g["mani"], g["puntate"], g["assicurazioni"]) for g in stato["giocatori"]]
+    mazzo = bj.Mazzo()
+    mazzo.mazzo = array("B", stato["mazzo"])
+    mazzo.usate = stato["usate"]
+    mazzo.ricalcola_conteggi()
+    return giocatori, mazzo, stato["banco_bankroll"]
+
+def gioca(giocatori, mazzo, banco, mani, ogni_mani=bj.SNAPSHOT_OGNI_MANI):
+    # Restituisce il giornale ancora aperto: chi chiama decide se chiuderlo o "crashare"
+    ref = [banco]
+    giornale = bj.GiornaleSalvataggio(lambda: (giocatori, mazzo, ref[0]), ogni_mani=ogni_mani)
+    for _ in range(mani):
+        bj.gioca_mano(mazzo, giocatori, giornale.segna_modificato, giocatori, ref)
+        giornale.flush()
+        for g in giocatori:
+            g.saldo = max(g.saldo, 100)  # Nessuno esce dal tavolo
+    return giornale, ref[0]
+
+def crash(giornale):
+    if giornale._f:
+        giornale._f.close()
+
+def assert_stato_salvato(giocatori, mazzo, banco):
+    salvato = bj.applica_giornale(bj.leggi_snapshot())
+    assert bj.stesso_stato(salvato, bj.snapshot(giocatori, mazzo, banco))
+
+
+def test_giornale_rigioca_attraverso_il_rimischio(partita_headless):
+    giocatori, mazzo = giocatori_cpu(), bj.Mazzo()
+    giornale, banco = gioca(giocatori, mazzo, bj.BANCO_START_BANKROLL, 60, ogni_mani=10**6)
+    crash(giornale)
+    assert mazzo.mescolate >= 1
+    assert any(rec["a"] == "mescola" for rec in bj.leggi_giornale())
+    assert_stato_salvato(giocatori, mazzo, banco)
+
+def test_giornale_dopo_snapshot_fallito(partita_headless, monkeypatch):
+    giocatori, mazzo = giocatori_cpu(), bj.Mazzo()
+    giornale, banco = gioca(giocatori, mazzo, bj.BANCO_START_BANKROLL, 30, ogni_mani=7)
+    giornale.chiudi()
+    assert bj.leggi_snapshot()["seq"] > 0
+
+    # Seconda sessione: il primo snapshot fallisce, il giornale su disco continua
+    giocatori, mazzo, banco = ricarica()
+    def disco_pieno(stato):
+        raise OSError("disco pieno")
+    monkeypatch.setattr(bj, "scrivi_snapshot", disco_pieno)
+    giornale, banco = gioca(giocatori, mazzo, banco, 5)
+    crash(giornale)
+    assert_stato_salvato(giocatori, mazzo, banco)
+
+def test_giornale_illeggibile_dopo_snapshot_fallito(partita_headless, monkeypatch):
+    giocatori, mazzo = giocatori_cpu(), bj.Mazzo()
+    giornale, banco = gioca(giocatori, mazzo, bj.BANCO_START_BANKROLL, 10, ogni_mani=7)
+    crash(giornale)
+    with open(bj.GIORNALE_FILE, "a") as f:
+        f.write("riga troncata\n")
+    snapshot_su_disco = bj.leggi_snapshot()
+
+    giocatori, mazzo, banco = ricarica()
+    monkeypatch.setattr(bj, "scrivi_snapshot", lambda stato: 1 / 0)
+    giornale, banco = gioca(giocatori, mazzo, banco, 3)
+    crash(giornale)
+    # Giornale svuotato e niente record nuovi: si ricarica l'ultimo snapshot, coerente
+    assert bj.GIORNALE_FILE.stat().st_size == 0
+    assert bj.stesso_stato(bj.applica_giornale(bj.leggi_snapshot()), snapshot_su_disco)
+
+def test_binario_andata_e_ritorno(partita_headless):
+    giocatori, mazzo = giocatori_cpu(5), bj.Mazzo()
+    giornale, banco = gioca(giocatori, mazzo, bj.BANCO_START_BANKROLL, 3, ogni_mani=1)
+    giornale.chiudi()
+    raw = bj.SALVA_FILE.read_bytes()
+    assert raw.startswith(bj.MAGIC_BINARIO)
+    letto = bj.SalvataggioBinario(raw)
+    assert letto.giocatore(3)["nome"] == "CPU3"
+    assert bj.stesso_stato(letto.stato(), bj.snapshot(giocatori, mazzo, banco))
+
+@pytest.mark.parametrize("formato", ["binario", "json"])
+def test_salva_e_carica(partita_headless, monkeypatch, formato):
+    monkeypatch.setattr(bj, "FORMATO_SALVATAGGIO", formato)
+    giocatori, mazzo = giocatori_cpu(), bj.Mazzo()
+    bj.salva_stato(giocatori, mazzo, 1234)
+    assert bj.stesso_stato(bj.carica_stato(), bj.snapshot(giocatori, mazzo, 1234))
+
+def test_carica_salvataggio_formato_originale(partita_headless):
+    # Salvataggio della prima versione: JSON con carte "A♠", XOR byte per byte, base64
+    stats = dict.fromkeys(bj.STATS_CHIAVI, 0) | {"mani": 4, "vittorie": 2, "guadagno": 35}
+    originale = {
+        "giocatori": [
+            {"nome": "Anna", "saldo": 535, "cpu": False, "difficolta": "equilibrata", "stats": stats,
+             "mani": [["A♠", "K♦"]], "puntate": [10], "assicurazioni": [0]},
+            {"nome": "Luca", "saldo": 480, "cpu": True, "difficolta": "cauta", "stats": stats,
+             "mani": [["8♥", "3♣"], ["8♣", "10♠"]], "puntate": [20, 20], "assicurazioni": [0, 0]},
+        ],
+        "mazzo": ["2♠", "Q♥", "7♦", "A♣"],
+        "usate": 12,
+        "banco_bankroll": 9465,
+    }
+    dati = json.dumps(originale).encode("utf-8")
+    k = bj.SAVE_KEY.encode("utf-8")
+    bj.SALVA_FILE.write_text(base64.b64encode(bytes(b ^ k[i % len(k)] for i, b in enumerate(dati))).decode("ascii"))
+
+    stato = bj.carica_stato()
+    assert [g["nome"] for g in stato["giocatori"]] == ["Anna", "Luca"]
+    assert stato["giocatori"][1]["mani"] == [bj.carte_da_nomi(["8♥", "3♣"]), bj.carte_da_nomi(["8♣", "10♠"])]
+    assert stato["giocatori"][0]["stats"]["guadagno"] == 35
+    assert bytes(stato["mazzo"]) == bytes(bj.carte_da_nomi(originale["mazzo"]))
+    assert (stato["usate"], stato["banco_bankroll"]) == (12, 9465)
+
+def test_asincrono_scarta_il_giornale_di_una_sessione_precedente(partita_headless):
+    giocatori, mazzo = giocatori_cpu(), bj.Mazzo()
+    giornale, banco = gioca(giocatori, mazzo, bj.BANCO_START_BANKROLL, 10, ogni_mani=7)
+    crash(giornale)
+    assert bj.GIORNALE_FILE.stat().st_size > 0
+
+    giocatori, mazzo, banco = ricarica()
+    ref = [banco]
+    salvataggio = bj.SalvataggioAsincrono(lambda: bj.snapshot(giocatori, mazzo, ref[0]))
+    for _ in range(3):
+        bj.gioca_mano(mazzo, giocatori, salvataggio.segna_modificato, giocatori, ref)
+        salvataggio.flush()
+    salvataggio.chiudi()
+    assert not bj.GIORNALE_FILE.exists()
+    assert bj.stesso_stato(bj.carica_stato(), bj.snapshot(giocatori, mazzo, ref[0]))
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+import BlackJack as bj
+import probabilita
+import strategia
+
+# Probabilità di sballo del banco per carta scoperta con mazzi infiniti (tabelle
+# pubblicate, Blackjack del banco non escluso). Con 8 mazzi lo scarto è sotto 0,002.
+SBALLO_S17 = {2: 0.3536, 3: 0.3739, 4: 0.3945, 5: 0.4164, 6: 0.4232,
+              7: 0.2623, 8: 0.2447, 9: 0.2284, 10: 0.2121, 1: 0.1153}
+SBALLO_H17 = {**SBALLO_S17, 2: 0.3567, 3: 0.3767, 4: 0.3971, 5: 0.4177, 6: 0.4395, 1: 0.1389}
+
+# Celle della strategia base pubblicata per 8 mazzi, DAS, resa tardiva:
+# (tabella, soft, totale o valore della coppia, carta scoperta) -> S17, H17
+CELLE = [
+    (("due_carte", 0, 11, 1), "H", "D"),
+    (("due_carte", 1, 18, 2), "S", "D"),
+    (("due_carte", 1, 19, 6), "S", "D"),
+    (("due_carte", 0, 15, 1), "H", "R"),
+    (("due_carte", 0, 17, 1), "S", "R"),
+    (("due_carte", 0, 16, 9), "R", "R"),
+    (("due_carte", 0, 9, 3), "D", "D"),
+    (("due_carte", 0, 9, 2), "H", "H"),
+    (("due_carte", 0, 10, 9), "D", "D"),
+    (("pesca", 0, 12, 2), True, True),
+    (("pesca", 0, 12, 4), False, False),
+    (("pesca", 0, 13, 2), False, False),
+    (("pesca", 0, 16, 7), True, True),
+    (("pesca", 1, 18, 9), True, True),
+    (("split", None, 8, 9), True, True),
+    (("split", None, 9, 7), False, False),
+    (("split", None, 9, 8), True, True),
+    (("split", None, 1, 6), True, True),
+    (("split", None, 5, 6), False, False),
+    (("split", None, 10, 6), False, False),
+    (("split", None, 4, 5), True, True),
+    (("split", None, 4, 4), False, False),
+    (("split", None, 7, 8), False, False),
+]
+
+def regole_strategia(h17):
+    return {"h17": h17, "pagamento_bj": 1.5, "das": True, "resa": "qualsiasi", "risplit_assi": True}
+
+def cella(tabelle, tabella, soft, valore, scoperta):
+    if tabella == "split":
+        return tabelle["split"][valore][strategia.indice_scoperta(scoperta)]
+    return tabelle[tabella][soft][valore][strategia.indice_scoperta(scoperta)]
+
+@pytest.mark.parametrize("h17, attese", [(False, SBALLO_S17), (True, SBALLO_H17)])
+def test_sballo_del_banco(h17, attese):
+    conteggi = probabilita.composizione_sabot(8)
+    for scoperta, attesa in attese.items():
+        rimasti = list(conteggi)
+        rimasti[scoperta - 1] -= 1
+        esito = probabilita.distribuzione_banco(scoperta, rimasti, h17=h17)
+        assert esito[probabilita.SBALLO] == pytest.approx(attesa, abs=0.002), scoperta
+        assert sum(esito) == pytest.approx(1.0)
+
+@pytest.mark.parametrize("h17", [False, True])
+def test_celle_della_strategia_base(tmp_path, h17):
+    tabelle = strategia.carica_tabelle(8, 4, percorso=tmp_path / "strategia.json", **regole_strategia(h17))
+    for posizione, s17, h17_attesa in CELLE:
+        assert cella(tabelle, *posizione) == (h17_attesa if h17 else s17), posizione
+
+def test_cache_su_disco_restituisce_la_stessa_tabella(tmp_path, monkeypatch):
+    percorso = tmp_path / "strategia.json"
+    prima = strategia.carica_tabelle(8, 4, percorso=percorso, **regole_strategia(True))
+    assert strategia.chiave_regole(8, 4, **regole_strategia(True)) in json.loads(percorso.read_text())
+
+    def non_ricalcolare(*args, **kwargs):
+        raise AssertionError("tabelle ricalcolate nonostante la cache")
+    monkeypatch.setattr(strategia, "calcola_tabelle", non_ricalcolare)
+    assert strategia.carica_tabelle(8, 4, percorso=percorso, **regole_strategia(True)) == prima
+
+def test_cache_in_memoria_delle_tabelle_e_del_banco(tmp_path, monkeypatch):
+    carica = strategia.carica_tabelle
+    monkeypatch.setattr(bj, "_tabelle_base", {})
+    monkeypatch.setattr(bj.strategia, "carica_tabelle",
+                        lambda *a, **k: carica(*a, percorso=tmp_path / "strategia.json", **k))
+    regole = bj.Regole(banco_h17=True)
+    tabelle = bj.tabelle_strategia_base(regole)
+    assert bj.tabelle_strategia_base(bj.Regole(banco_h17=True)) is tabelle
+    assert bj.tabelle_strategia_base(bj.Regole()) is not tabelle
+
+    motore = probabilita.MotoreBanco()
+    conteggi = probabilita.composizione_sabot(2)
+    esito = motore.distribuzione(6, conteggi, h17=True)
+    assert motore.distribuzione(6, list(conteggi), h17=True) is esito
+    assert (motore.hit, motore.miss) == (1, 1)
@@ -0,0 +1,66 @@
+import asyncio
+
+import BlackJack as bj
+import tavoli
+
+
+def cpu_fisse():
+    # "equilibrata" usa il generatore anche per l'assicurazione, oltre che per le puntate
+    return [bj.Giocatore(f"CPU{i}", cpu=True, difficolta=d)
+            for i, d in enumerate(("equilibrata", "cauta", "aggressiva", "equilibrata"))]
+
+def registra(tavolo):
+    eventi = []
+    tavolo.ascoltatori.append(lambda t, ev: eventi.append(ev))
+    return eventi
+
+def test_stesso_seed_stesse_mani_anche_con_altri_tavoli(monkeypatch):
+    monkeypatch.setattr(bj, "VERBOSO", False)
+    solo = tavoli.GestoreTavoli()
+    t = solo.nuovo_tavolo(seed="7:0")
+    for g in cpu_fisse():
+        t.siedi(g)
+    atteso = registra(t)
+    asyncio.run(solo.esegui(40))
+
+    # Stesso tavolo in mezzo ad altri, con un umano in un thread e l'rng del modulo mescolato
+    affollato = tavoli.GestoreTavoli()
+    umano = bj.Giocatore("Anna")
+    sessione = tavoli.SessioneCoda()
+    sessione.chiudi()  # Risposte predefinite
+    altro = affollato.nuovo_tavolo(seed="x")
+    altro.siedi(umano, sessione)
+    for g in cpu_fisse()[:3]:
+        altro.siedi(g)
+    t = affollato.nuovo_tavolo(seed="7:0")
+    for g in cpu_fisse():
+        t.siedi(g)
+    for g in tavoli.cpu_casuali(4):
+        affollato.nuovo_tavolo(seed="y").siedi(g)
+    eventi = registra(t)
+    bj.imposta_seed(12345)
+    asyncio.run(affollato.esegui(40))
+
+    assert eventi == atteso
+    assert altro.mani_giocate == 40
+
+def test_registratore_per_tavolo(monkeypatch):
+    monkeypatch.setattr(bj, "VERBOSO", False)
+
+    class Conta:
+        def __init__(self):
+            self.mani = 0
+        def inizio_mano(self, giocatori):
+            self.mani += 1
+        def fine_mano(self, giocatori, banco, totale, banco_bj):
+            pass
+
+    gestore = tavoli.GestoreTavoli()
+    conteggi = [Conta(), Conta()]
+    for i, registratore in enumerate(conteggi):
+        t = gestore.nuovo_tavolo(seed=i, registratore=registratore)
+        for g in cpu_fisse()[:i + 1]:
+            t.siedi(g)
+    asyncio.run(gestore.esegui(15))
+    assert [c.mani for c in conteggi] == [15, 15]
+    assert bj._registratore.get() is None
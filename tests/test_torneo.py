@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+import BlackJack as bj
+import torneo
+
+
+class Verifica:
+    # Classifica sotto esame più lo stesso stato tenuto "a mano", ordinato da capo a ogni controllo
+    def __init__(self, seed, n=200):
+        self.caso = random.Random(seed)
+        self.entrata = {}
+        self.vivi = [self.nuovo(self.caso.randint(0, 1000)) for _ in range(n)]
+        self.classifica = torneo.Classifica(self.vivi)
+
+    def nuovo(self, saldo):
+        g = bj.Giocatore(f"V{len(self.entrata)}", saldo=saldo, cpu=True)
+        self.entrata[g] = len(self.entrata)
+        return g
+
+    def dimensione(self):
+        return len(self.classifica.indice._albero) - 1
+
+    def bordo(self):
+        # Saldo sul limite dell'albero finché resta piccolo: ogni volta può raddoppiarlo
+        if self.dimensione() > 1 << 20:
+            return self.caso.randint(0, 1000)
+        return self.dimensione() + self.caso.randint(-1, 1)
+
+    def posizione_attesa(self, g):
+        return 1 + sum(max(h.saldo, 0) > max(g.saldo, 0) for h in self.vivi)
+
+    def controlla(self):
+        atteso = sorted(self.vivi, key=lambda g: (-max(g.saldo, 0), self.entrata[g]))
+        k = min(len(atteso), 25)
+        c = self.classifica
+        assert len(c) == len(atteso) == c.indice.totale
+        assert c.migliori(k) == atteso[:k]
+        assert c.peggiori(k) == atteso[::-1][:k]
+        saldi = [max(g.saldo, 0) for g in atteso]
+        for g in atteso:
+            assert c.posizione(g) == 1 + sum(s > max(g.saldo, 0) for s in saldi)
+        for soglia in (0, self.caso.randint(0, max(saldi, default=0)), max(saldi, default=0) + 1):
+            assert c.indice.fino_a(soglia) == sum(s <= soglia for s in saldi)
+
+
+def test_indice_cresce_a_ogni_raddoppio():
+    # Saldo pari alla dimensione attuale dell'albero: deve crescere, alternando sposta (aggiorna) e aggiungi
+    v = Verifica(seed=0)
+    for i, bit in enumerate(range(12, 20)):
+        assert v.dimensione() == 1 << bit
+        if i % 2:
+            g = v.nuovo(1 << bit)
+            v.vivi.append(g)
+            v.classifica.aggiungi(g)
+        else:
+            g = v.caso.choice(v.vivi)
+            g.saldo = 1 << bit
+            v.classifica.aggiorna(g)
+        v.controlla()
+
+@pytest.mark.parametrize("seed", range(4))
+def test_classifica_contro_ordinamento_completo(seed):
+    v = Verifica(seed)
+    caso, c = v.caso, v.classifica
+    for passo in range(1, 5001):
+        x = caso.random()
+        g = None
+        if x < 0.02 or len(v.vivi) < 10:
+            saldo = caso.choice((caso.randint(0, 1000), caso.randint(0, 200_000), v.bordo()))
+            g = v.nuovo(saldo)
+            v.vivi.append(g)
+            c.aggiungi(g)
+        elif x < 0.03:
+            c.rimuovi(v.vivi.pop(caso.randrange(len(v.vivi))))
+        elif x < 0.035:
+            k = caso.randint(1, 5)
+            attesi = sorted(v.vivi, key=lambda h: (max(h.saldo, 0), -v.entrata[h]))[:k]
+            assert c.estrai_peggiori(k) == attesi
+            v.vivi = [h for h in v.vivi if h not in attesi]
+        else:
+            g = caso.choice(v.vivi)
+            y = caso.random()
+            if y < 0.01:
+                g.saldo += caso.randint(1, 20) * 20_000  # Oltre la dimensione dell'albero
+            elif y < 0.02:
+                g.saldo = v.bordo()
+            elif y < 0.05:
+                g.saldo = caso.randint(-100, 0)
+            else:
+                g.saldo += caso.randint(-50, 50)
+            c.aggiorna(g)
+        if g is not None:
+            assert c.posizione(g) == v.posizione_attesa(g)
+        if passo % 97 == 0:
+            v.controlla()
+    v.controlla()
+
+def test_spareggio_per_ordine_di_entrata_dopo_una_rimozione():
+    a, b, c = (bj.Giocatore(n, saldo=100, cpu=True) for n in "abc")
+    classifica = torneo.Classifica([a, b])
+    classifica.rimuovi(a)
+    classifica.aggiungi(c)
+    assert classifica.migliori(2) == [b, c]
+    assert classifica.peggiori(2) == [c, b]
+
+def test_torneo_arriva_al_tavolo_finale(monkeypatch):
+    monkeypatch.setattr(bj, "VERBOSO", False)
+    bj.imposta_seed(3)
+    t = torneo.Torneo(torneo.cpu_torneo(300), mani_per_turno=5)
+    podio = t.gioca()
+    assert 1 <= len(podio) <= t.posti
+    assert t.eliminati + t.usciti_a_zero + t.in_gara() == 300
+    assert [g.saldo for g in podio] == sorted((g.saldo for g in t.classifica), reverse=True)[:len(podio)]
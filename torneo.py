@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Torneo a eliminazione con molte CPU (10^4..10^6) sedute a tanti tavoli. A ogni
+# giro ogni tavolo gioca una mano; dopo MANI_PER_TURNO giri la parte peggiore
+# della classifica (QUOTA_ELIMINATI) esce e i sopravvissuti vengono rimescolati
+# su tavoli pieni, fino al tavolo finale. Chi arriva a 0€ esce subito.
+# La classifica è incrementale (Classifica): dopo una mano si aggiornano solo i
+# giocatori di quel tavolo il cui saldo è cambiato, in O(log n) ciascuno; primi,
+# ultimi e posizione di un giocatore non richiedono mai di ordinare tutti.
+import argparse, heapq, math, time
+import BlackJack as bj
+import simulazione
+
+MANI_PER_TURNO = 10  # Giri di mani tra due eliminazioni
+QUOTA_ELIMINATI = 0.5  # Frazione della classifica eliminata a fine turno
+MOSTRA_PRIMI = 5
+
+# ===============================
+# CLASSIFICA INCREMENTALE
+# ===============================
+
+class IndiceSaldi:
+    # Albero di Fenwick sui saldi (euro interi): quanti giocatori hanno più di un
+    # certo saldo in O(log M), M = saldo massimo visto. Raddoppia quando serve.
+    def __init__(self, dimensione=1 << 12):
+        self._albero = [0] * (dimensione + 1)
+        self.totale = 0
+    def _cresci(self, saldo):
+        # Con dimensione potenza di 2 il nuovo nodo radice copre tutto, gli altri nuovi nodi sono vuoti
+        n = len(self._albero) - 1
+        while saldo + 1 > n:
+            self._albero.extend([0] * n)
+            n *= 2
+            self._albero[n] = self.totale
+    def aggiungi(self, saldo, delta):
+        if saldo + 1 >= len(self._albero):
+            self._cresci(saldo)
+        self.totale += delta
+        albero = self._albero
+        n = len(albero)
+        i = saldo + 1
+        while i < n:
+            albero[i] += delta
+            i += i & -i
+    def sposta(self, vecchio, nuovo):
+        # Un giocatore passa da un saldo all'altro: i nodi comuni ai due percorsi non cambiano
+        if nuovo + 1 >= len(self._albero):
+            self._cresci(nuovo)
+        albero = self._albero
+        n = len(albero)
+        i, j = vecchio + 1, nuovo + 1
+        while i != j:
+            if i < j:
+                albero[i] -= 1
+                i += i & -i
+            else:
+                albero[j] += 1
+                j += j & -j
+            if i >= n and j >= n:
+                break
+    def fino_a(self, saldo):
+        albero = self._albero
+        i = min(saldo + 1, len(albero) - 1)
+        n = 0
+        while i > 0:
+            n += albero[i]
+            i -= i & -i
+        return n
+    def sopra(self, saldo):
+        return self.totale - self.fino_a(saldo)
+
+class Classifica:
+    # Ordine: saldo più alto prima, a pari saldo chi è entrato prima. Due heap
+    # (migliori e peggiori) con cancellazione pigra: ogni aggiornamento aggiunge
+    # una voce e rende vecchia la precedente, scartata quando affiora. Gli heap
+    # vengono ricostruiti quando le voci vecchie superano quelle valide.
+    def __init__(self, giocatori=()):
+        self._saldo = {}  # Giocatore -> saldo registrato
+        self._voce = {}  # Giocatore -> numero della voce valida negli heap
+        self._numero = {}  # Giocatore -> ordine di entrata (spareggio)
+        self._alto = []  # (-saldo, numero, voce, g)
+        self._basso = []  # (saldo, -numero, voce, g)
+        self._voci = 0
+        self._entrate = 0
+        self.indice = IndiceSaldi()
+        for g in giocatori:
+            self.aggiungi(g)
+
+    def __len__(self):
+        return len(self._saldo)
+    def __contains__(self, g):
+        return g in self._saldo
+    def __iter__(self):
+        return iter(self._saldo)
+
+    def _inserisci(self, g, saldo):
+        self._voci += 1
+        voce = self._voci
+        self._voce[g] = voce
+        numero = self._numero[g]
+        heapq.heappush(self._alto, (-saldo, numero, voce, g))
+        heapq.heappush(self._basso, (saldo, -numero, voce, g))
+        if len(self._alto) > 2 * len(self._saldo) + 64:
+            self._compatta()
+
+    def _compatta(self):
+        self._alto = [(-s, self._numero[g], self._voce[g], g) for g, s in self._saldo.items()]
+        self._basso = [(s, -self._numero[g], self._voce[g], g) for g, s in self._saldo.items()]
+        heapq.heapify(self._alto)
+        heapq.heapify(self._basso)
+
+    def aggiungi(self, g):
+        saldo = max(g.saldo, 0)
+        self._numero[g] = self._entrate  # Non len(_numero): dopo una rimozione ripeterebbe un numero
+        self._entrate += 1
+        self._saldo[g] = saldo
+        self.indice.aggiungi(saldo, 1)
+        self._inserisci(g, saldo)
+
+    def aggiorna(self, g):
+        vecchio = self._saldo[g]
+        saldo = max(g.saldo, 0)
+        if saldo == vecchio:
+            return
+        self._saldo[g] = saldo
+        self.indice.sposta(vecchio, saldo)
+        self._inserisci(g, saldo)
+
+    def rimuovi(self, g):
+        self.indice.aggiungi(self._saldo.pop(g), -1)
+        del self._voce[g]
+        del self._numero[g]
+
+    def _primi(self, heap, k, estrai=False):
+        presi = []
+        while heap and len(presi) < k:
+            voce = heapq.heappop(heap)
+            if self._voce.get(voce[3]) == voce[2]:
+                presi.append(voce)
+        if not estrai:
+            for voce in presi:
+                heapq.heappush(heap, voce)
+        return [v[3] for v in presi]
+
+    def migliori(self, k):
+        return self._primi(self._alto, k)
+    def peggiori(self, k):
+        return self._primi(self._basso, k)
+    def estrai_peggiori(self, k):
+        # Toglie dalla classifica i k peggiori e li restituisce
+        usciti = self._primi(self._basso, k, estrai=True)
+        for g in usciti:
+            self.rimuovi(g)
+        return usciti
+    def posizione(self, g):
+        # 1 + giocatori con saldo strettamente maggiore (i pari merito condividono la posizione)
+        return 1 + self.indice.sopra(self._saldo[g])
+
+# ===============================
+# TORNEO
+# ===============================
+
+def cpu_torneo(n, saldo=bj.START_SALDO):
+    # Nomi unici: il numero distingue gli omonimi di NOMI_REALI
+    return [bj.Giocatore(f"{bj.rng.choice(bj.NOMI_REALI)} #{i+1}", saldo=saldo, cpu=True,
+                         difficolta=bj.rng.choice(bj.DIFFICOLTA_CPU)) for i in range(n)]
+
+class Torneo:
+    def __init__(self, giocatori, regole=None, mani_per_turno=MANI_PER_TURNO, quota_eliminati=QUOTA_ELIMINATI,
+                 posti=bj.MAX_GIOCATORI_TAVOLO):
+        if not 0 < quota_eliminati < 1:
+            raise ValueError("La quota di eliminati deve essere tra 0 e 1.")
+        self.mazzo = bj.Mazzo(regole=regole)  # Un sabot per tutto il torneo: i tavoli giocano uno dopo l'altro
+        self.banco_bankroll_ref = [simulazione.SALDO_SIMULAZIONE]  # Il banco del torneo non salta
+        self.mani_per_turno = mani_per_turno
+        self.quota_eliminati = quota_eliminati
+        self.posti = posti
+        self.classifica = Classifica(giocatori)
+        self.umano = next((g for g in giocatori if not g.cpu), None)
+        self.tavoli = []
+        self.turno = 0
+        self.giri = 0
+        self.mani = 0
+        self.usciti_a_zero = 0
+        self.eliminati = 0
+        self.rimescola_posti()
+
+    def in_gara(self):
+        return len(self.classifica)
+    def finale(self):
+        return self.in_gara() <= self.posti
+
+    def rimescola_posti(self):
+        # Tavoli pieni e bilanciati (al più un posto di differenza): una volta per turno
+        vivi = list(self.classifica)
+        bj.rng.shuffle(vivi)
+        n_tavoli = math.ceil(len(vivi) / self.posti)
+        self.tavoli = [vivi[i::n_tavoli] for i in range(n_tavoli)]
+
+    def gioca_giro(self):
+        # Una mano per tavolo. Dopo la mano solo i giocatori del tavolo con il
+        # saldo cambiato toccano la classifica; chi è a 0€ lascia il posto.
+        classifica = self.classifica
+        for tavolo in self.tavoli:
+            if not tavolo:
+                continue
+            umano = self.umano is not None and self.umano in tavolo
+            bj.imposta_verboso(umano)
+            saldi = [g.saldo for g in tavolo]
+            bj.gioca_mano(self.mazzo, tavolo, simulazione._nessun_salvataggio, tavolo, self.banco_bankroll_ref)
+            self.mani += 1
+            a_zero = False
+            for g, saldo in zip(tavolo, saldi):
+                if g.saldo != saldo:
+                    classifica.aggiorna(g)
+                a_zero = a_zero or g.saldo <= 0
+            if a_zero:
+                for g in [g for g in tavolo if g.saldo <= 0]:
+                    tavolo.remove(g)
+                    classifica.rimuovi(g)
+                    self.usciti_a_zero += 1
+            if umano:
+                self.mostra_situazione_umano()
+        self.giri += 1
+
+    def elimina(self):
+        # Fuori la quota peggiore, ma mai sotto un tavolo finale pieno
+        n = self.in_gara()
+        quanti = min(math.ceil(n * self.quota_eliminati), n - self.posti)
+        if quanti <= 0:
+            return []
+        usciti = self.classifica.estrai_peggiori(quanti)
+        self.eliminati += len(usciti)
+        return usciti
+
+    def gioca_turno(self):
+        finale = self.finale()
+        for _ in range(self.mani_per_turno):
+            if self.in_gara() <= 1:
+                break
+            self.gioca_giro()
+        self.turno += 1
+        # Il tavolo finale non elimina: decide la classifica finale
+        usciti = [] if finale else self.elimina()
+        self.rimescola_posti()
+        return usciti
+
+    def gioca(self, callback_turno=None):
+        # Turni a eliminazione fino al tavolo finale, che gioca un ultimo turno
+        verboso = bj.VERBOSO
+        try:
+            while self.in_gara() > 1:
+                finale = self.finale()
+                usciti = self.gioca_turno()
+                if callback_turno is not None:
+                    callback_turno(self, usciti, finale)
+                if finale:
+                    break
+        finally:
+            bj.imposta_verboso(verboso)
+        return self.classifica.migliori(self.posti)
+
+    def mostra_situazione_umano(self):
+        g = self.umano
+        if g in self.classifica:
+            print(f"\n🏆 Sei {self.classifica.posizione(g)}° su {self.in_gara():,} con {bj.fmt_euro(g.saldo)} "
+                  f"(turno {self.turno + 1}, giro {self.giri % self.mani_per_turno + 1}/{self.mani_per_turno})")
+        else:
+            print(f"\n💀 Sei fuori dal torneo. Restano {self.in_gara():,} giocatori: il torneo prosegue senza di te.")
+
+def stampa_turno(torneo, usciti, finale):
+    c = torneo.classifica
+    titolo = "Tavolo finale" if finale else f"Turno {torneo.turno}"
+    print(f"\n🎯 {titolo}: {torneo.in_gara():,} in gara, {len(usciti):,} eliminati, "
+          f"{torneo.usciti_a_zero:,} usciti a 0€ finora, {len(torneo.tavoli):,} tavoli")
+    for i, g in enumerate(c.migliori(MOSTRA_PRIMI), 1):
+        ruolo = f"CPU {g.difficolta}" if g.cpu else "Tu"
+        print(f" {i}. {g.nome} ({ruolo}): {bj.fmt_euro(g.saldo)}")
+    if torneo.umano is not None and torneo.umano in c:
+        print(f" … tu: {c.posizione(torneo.umano)}° con {bj.fmt_euro(torneo.umano.saldo)}")
+    elif torneo.umano is not None and torneo.umano in usciti:
+        print(f" 💀 Sei stato eliminato con {bj.fmt_euro(torneo.umano.saldo)}.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Torneo a eliminazione con molte CPU")
+    parser.add_argument("--cpu", type=int, default=10_000, help="CPU iscritte")
+    parser.add_argument("--mani", type=int, default=MANI_PER_TURNO, help="giri di mani per turno")
+    parser.add_argument("--quota", type=float, default=QUOTA_ELIMINATI, help="frazione eliminata a ogni turno")
+    parser.add_argument("--saldo", type=int, default=bj.START_SALDO, help="saldo iniziale di ogni giocatore")
+    parser.add_argument("--umano", action="store_true", help="partecipa anche tu")
+    parser.add_argument("--seed", type=int, default=None)
+    simulazione.aggiungi_argomenti_regole(parser)
+    args = parser.parse_args(argv)
+    if not 0 < args.quota < 1:
+        parser.error("--quota deve essere tra 0 e 1")
+    if args.seed is not None:
+        bj.imposta_seed(args.seed)
+
+    giocatori = cpu_torneo(args.cpu, args.saldo)
+    if args.umano:
+        giocatori.insert(0, bj.Giocatore(input("Inserisci il tuo nome: ") or "Giocatore", saldo=args.saldo))
+        scelta = input("Velocità: [R]ealistica, [V]eloce, [I]stantanea (Invio = realistica) > ").strip().lower()
+        bj.imposta_velocita({"v": "veloce", "i": "istantanea"}.get(scelta[:1], "realistica"))
+    t0 = time.perf_counter()
+    torneo = Torneo(giocatori, simulazione.regole_da_argomenti(args), args.mani, args.quota)
+    print(f"🏟️  Torneo: {len(giocatori):,} iscritti su {len(torneo.tavoli):,} tavoli "
+          f"({time.perf_counter() - t0:.2f}s di preparazione)")
+    t0 = time.perf_counter()
+    podio = torneo.gioca(stampa_turno)
+    secondi = time.perf_counter() - t0
+    print(f"\n🏁 {torneo.mani:,} mani in {secondi:.2f}s ({torneo.mani / secondi if secondi > 0 else 0:,.0f} mani/s)")
+    if podio:
+        vincitore = podio[0]
+        print(f"👑 Vince {vincitore.nome} ({'CPU ' + vincitore.difficolta if vincitore.cpu else 'Tu'}) "
+              f"con {bj.fmt_euro(vincitore.saldo)}")
+
+if __name__ == "__main__":
+    main()
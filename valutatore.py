@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Valutatore Monte Carlo delle politiche CPU: gioca mani headless con
+# gioca_mano e stima l'EV per mano (in unità di puntata) con intervallo di
+# confidenza, anche suddiviso per mano iniziale x carta scoperta del banco.
+import argparse, importlib, json, math, time
+import BlackJack as bj
+import simulazione
+
+PUNTATA_VALUTAZIONE = 100  # Multiplo di 2: 3:2 e resa restano esatti
+Z_95 = 1.96
+
+ETICHETTE_BANCO = ["2", "3", "4", "5", "6", "7", "8", "9", "10", "A"]
+
+class Accumulatore:
+    __slots__ = ("n", "somma", "somma_q")
+
+    def __init__(self):
+        self.n = 0
+        self.somma = 0.0
+        self.somma_q = 0.0
+    def aggiungi(self, x):
+        self.n += 1
+        self.somma += x
+        self.somma_q += x * x
+    def media(self):
+        return self.somma / self.n if self.n else 0.0
+    def errore(self, z=Z_95):
+        if self.n < 2:
+            return float("inf")
+        var = (self.somma_q - self.somma * self.somma / self.n) / (self.n - 1)
+        return z * math.sqrt(max(var, 0.0) / self.n)
+
+def etichetta_mano(c1, c2):
+    if bj.RANGO_CARTA[c1] == bj.RANGO_CARTA[c2]:
+        return "P" + bj.RANGO_CARTA[c1]
+    m = bj.Mano((c1, c2))
+    return ("S" if m.soft else "H") + str(m.punteggio)
+
+def etichetta_banco(carta):
+    return "A" if bj.E_ASSO[carta] else str(bj.VALORE_CARTA[carta])
+
+def carte_iniziali(g):
+    # Dopo uno split la seconda carta originale è la prima della mano 1
+    if len(g.mani) > 1:
+        return g.mani[0][0], g.mani[1][0]
+    return g.mani[0][0], g.mani[0][1]
+
+def crea_posti(politica, n_posti, puntata=PUNTATA_VALUTAZIONE):
+    # politica: nome di difficoltà oppure sottoclasse di Giocatore
+    if isinstance(politica, str):
+        cls, diff = bj.Giocatore, politica
+    else:
+        cls, diff = politica, getattr(politica, "difficolta_default", "equilibrata")
+    posti = []
+    for i in range(n_posti):
+        g = cls(f"Posto{i+1}", saldo=simulazione.SALDO_SIMULAZIONE, cpu=True, difficolta=diff)
+        g.decide_puntata = lambda mazzo=None: puntata  # puntata fissa: EV confrontabili tra politiche
+        posti.append(g)
+    return posti
+
+def nome_politica(politica):
+    return politica if isinstance(politica, str) else politica.__name__
+
+def valuta(politica, n_mani, n_posti=bj.MAX_GIOCATORI_TAVOLO, puntata=PUNTATA_VALUTAZIONE, seed=None,
+           regole=None):
+    if seed is not None:
+        bj.imposta_seed(seed)
+    posti = crea_posti(politica, n_posti, puntata)
+    mazzo = bj.Mazzo(regole=regole)
+    banco_bankroll_ref = [bj.BANCO_START_BANKROLL]
+    # Un campione per mano giocata: media dei posti (sono correlati tramite il banco)
+    totale = Accumulatore()
+    celle = {}
+
+    verboso = bj.VERBOSO
+    bj.imposta_verboso(False)
+    t0 = time.perf_counter()
+    try:
+        for _ in range(n_mani):
+            saldi = [g.saldo for g in posti]
+            banco = bj.gioca_mano(mazzo, posti, simulazione._nessun_salvataggio, posti, banco_bankroll_ref)
+            su = etichetta_banco(banco[0])
+            somma = 0.0
+            for g, s0 in zip(posti, saldi):
+                x = (g.saldo - s0) / puntata
+                somma += x
+                chiave = (etichetta_mano(*carte_iniziali(g)), su)
+                acc = celle.get(chiave)
+                if acc is None:
+                    acc = celle[chiave] = Accumulatore()
+                acc.aggiungi(x)
+            totale.aggiungi(somma / n_posti)
+    finally:
+        bj.imposta_verboso(verboso)
+    secondi = time.perf_counter() - t0
+
+    return {
+        "politica": nome_politica(politica),
+        "mani": n_mani,
+        "posti": n_posti,
+        "secondi": secondi,
+        "mani_al_secondo": n_mani * n_posti / secondi if secondi > 0 else float("inf"),
+        "ev": totale.media(),
+        "ic95": totale.errore(),
+        "celle": {
+            f"{mano}|{su}": {"ev": acc.media(), "ic95": acc.errore(), "n": acc.n}
+            for (mano, su), acc in celle.items()
+        },
+    }
+
+def _ordine_mano(etichetta):
+    tipo, resto = etichetta[0], etichetta[1:]
+    ordine_tipo = {"H": 0, "S": 1, "P": 2}[tipo]
+    if tipo == "P":
+        return ordine_tipo, list(bj.VALORI).index(resto)
+    return ordine_tipo, int(resto)
+
+def stampa_valutazione(r, tabella=False):
+    print(f"🤖 {r['politica']}: EV {r['ev']*100:+.3f}% ± {r['ic95']*100:.3f}% "
+          f"({r['mani']:,} mani x {r['posti']} posti, {r['mani_al_secondo']:,.0f} mani/s)")
+    if not tabella:
+        return
+    mani = sorted({k.split("|")[0] for k in r["celle"]}, key=_ordine_mano)
+    print("      " + "".join(f"{u:>8}" for u in ETICHETTE_BANCO))
+    for m in mani:
+        riga = f"{m:<6}"
+        for u in ETICHETTE_BANCO:
+            cella = r["celle"].get(f"{m}|{u}")
+            riga += f"{cella['ev']*100:+8.1f}" if cella else f"{'-':>8}"
+        print(riga)
+
+def carica_politica(percorso):
+    # "modulo:Classe" -> sottoclasse di Giocatore con decide_* personalizzati
+    modulo, _, classe = percorso.partition(":")
+    return getattr(importlib.import_module(modulo), classe)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Valutazione Monte Carlo delle politiche CPU")
+    parser.add_argument("--mani", type=int, default=200_000)
+    parser.add_argument("--posti", type=int, default=bj.MAX_GIOCATORI_TAVOLO)
+    parser.add_argument("--difficolta", nargs="*", choices=bj.DIFFICOLTA_CPU, default=None,
+                        help="profili da valutare (default: tutti)")
+    parser.add_argument("--politica", action="append", default=[],
+                        help="politica personalizzata come modulo:Classe (sottoclasse di Giocatore)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--tabella", action="store_true", help="EV per mano iniziale x carta del banco")
+    parser.add_argument("--json", action="store_true", help="stampa i risultati in JSON")
+    simulazione.aggiungi_argomenti_regole(parser)
+    args = parser.parse_args(argv)
+    regole = simulazione.regole_da_argomenti(args)
+
+    politiche = list(args.difficolta if args.difficolta is not None else bj.DIFFICOLTA_CPU)
+    politiche += [carica_politica(p) for p in args.politica]
+    risultati = [valuta(p, args.mani, args.posti, seed=args.seed, regole=regole) for p in politiche]
+    if args.json:
+        print(json.dumps(risultati, indent=2))
+        return
+    print(f"📜 Regole: {regole.descrizione()}")
+    for r in risultati:
+        stampa_valutazione(r, args.tabella)
+
+if __name__ == "__main__":
+    main()
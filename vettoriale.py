@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Kernel vettoriale (NumPy, opzionale) per giocare e pagare migliaia di round
+# indipendenti in una volta: un posto per round, una mano, politica fissa
+# carta/stai (niente raddoppi, split, resa né assicurazione). Le regole sono
+# quelle scalari di gioca_mano:
+#  - distribuzione giocatore, banco, giocatore, banco
+#  - il banco sbircia solo con l'Asso scoperto: con il Blackjack vince subito
+#    su ogni mano, anche su un Blackjack del giocatore
+#  - con il 10 scoperto il Blackjack del banco vale 21 (pareggia col Blackjack)
+#  - il banco pesca sotto 17 (e sul 17 soft con banco_h17)
+#  - Blackjack pagato regole.pagamento_blackjack, troncato come int()
+# Le carte sono valori 1..10 (Asso = 1). Ogni round pesca da un sabot nuovo
+# (Sabot) oppure da una sequenza data (SequenzaCarte, per il confronto esatto
+# con il motore scalare: confronta).
+import argparse, json, time
+from array import array
+import BlackJack as bj
+import simulazione
+import valutatore
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BLOCCO = 100_000  # Round per chiamata del kernel: limita la memoria
+CARTE_CONFRONTO = 40  # Carte per round nel confronto: più di quante ne servano
+
+CARTA_PER_VALORE = {v: bj.VALORE_CONTEGGIO.index(v) for v in range(1, 11)}
+
+def richiedi_numpy():
+    if np is None:
+        raise RuntimeError("Il kernel vettoriale richiede NumPy: pip install numpy")
+
+class Sabot:
+    # Un sabot per round, tenuto come conteggi per valore: una pescata costa
+    # O(10) per round, senza mescolare le carte
+    def __init__(self, n, composizione, generatore):
+        self.conteggi = np.tile(np.asarray(composizione, dtype=np.int32), (n, 1))
+        self.generatore = generatore
+    def pesca(self, righe):
+        cumulati = self.conteggi[righe].cumsum(axis=1)
+        u = (self.generatore.random(len(righe)) * cumulati[:, -1]).astype(np.int64)
+        indici = (cumulati <= u[:, None]).sum(axis=1)
+        self.conteggi[righe, indici] -= 1
+        return (indici + 1).astype(np.int32)
+
+class SequenzaCarte:
+    # valori[r] = carte del round r nell'ordine in cui escono dal sabot
+    def __init__(self, valori):
+        self.valori = np.asarray(valori, dtype=np.int32)
+        self.posizione = np.zeros(len(self.valori), dtype=np.int64)
+    def pesca(self, righe):
+        carte = self.valori[righe, self.posizione[righe]]
+        self.posizione[righe] += 1
+        return carte
+
+def _totale(duro, asso):
+    return np.where(asso & (duro <= 11), duro + 10, duro)
+
+def _mano_rappresentativa(soft, tot):
+    if soft:
+        valori = (1, tot - 11)
+    elif tot == 21:
+        valori = (10, 9, 2)
+    else:
+        valori = (min(10, tot - 2), tot - min(10, tot - 2))
+    return bj.Mano(CARTA_PER_VALORE[v] for v in valori)
+
+def tabella_politica(politica, regole=None):
+    # pesca[soft][totale][scoperta] chiedendo a decide_pesca del giocatore su una
+    # mano rappresentativa: vale per i profili e per le sottoclassi di Giocatore
+    # la cui scelta dipende solo da totale, soft e carta scoperta
+    richiedi_numpy()
+    g = valutatore.crea_posti(politica, 1)[0]
+    regole = regole or bj.REGOLE_STANDARD
+    tabella = np.zeros((2, 22, 10), dtype=bool)
+    for soft, totali in ((0, range(4, 22)), (1, range(12, 22))):
+        for tot in totali:
+            mano = _mano_rappresentativa(soft, tot)
+            for v, carta in CARTA_PER_VALORE.items():
+                tabella[soft, tot, bj.INDICE_SCOPERTA[carta]] = g.decide_pesca(tot, carta, mano, regole=regole)
+    return tabella
+
+def gioca_round(sorgente, n, politica, regole=None, puntata=1):
+    # politica: tabella bool pesca[soft][totale][scoperta] (tabella_politica);
+    # puntata: intero o array di n interi. Restituisce array per round.
+    regole = regole or bj.REGOLE_STANDARD
+    tutte = np.arange(n)
+    g1 = sorgente.pesca(tutte)
+    scoperta = sorgente.pesca(tutte)
+    g2 = sorgente.pesca(tutte)
+    coperta = sorgente.pesca(tutte)
+    g_duro = g1 + g2
+    g_asso = (g1 == 1) | (g2 == 1)
+    g_bj = g_asso & (g_duro == 11)
+    b_duro = scoperta + coperta
+    b_asso = (scoperta == 1) | (coperta == 1)
+    b_bj = b_asso & (b_duro == 11)
+    sbirciata = (scoperta == 1) & b_bj
+    indice_scoperta = np.where(scoperta == 1, 9, scoperta - 2)
+
+    # Giocatore: carta finché la politica lo chiede (il Blackjack non gioca)
+    attivi = np.flatnonzero(~g_bj & ~sbirciata)
+    while attivi.size:
+        duro = g_duro[attivi]
+        soft = g_asso[attivi] & (duro <= 11)
+        chiede = politica[soft.astype(np.intp), np.where(soft, duro + 10, duro), indice_scoperta[attivi]]
+        attivi = attivi[chiede]
+        if not attivi.size:
+            break
+        carte = sorgente.pesca(attivi)
+        g_duro[attivi] += carte
+        g_asso[attivi] |= carte == 1
+        attivi = attivi[g_duro[attivi] <= 21]
+    g_tot = _totale(g_duro, g_asso)
+
+    # Banco: solo dove il risultato dipende ancora dalle sue carte
+    attivi = np.flatnonzero(~sbirciata & ~b_bj & (g_tot <= 21))
+    while attivi.size:
+        duro = b_duro[attivi]
+        soft = b_asso[attivi] & (duro <= 11)
+        tot = np.where(soft, duro + 10, duro)
+        pesca = tot < 17
+        if regole.banco_h17:
+            pesca |= (tot == 17) & soft
+        attivi = attivi[pesca]
+        if not attivi.size:
+            break
+        carte = sorgente.pesca(attivi)
+        b_duro[attivi] += carte
+        b_asso[attivi] |= carte == 1
+    b_tot = _totale(b_duro, b_asso)
+
+    puntate = np.broadcast_to(np.asarray(puntata, dtype=np.int64), (n,))
+    premio = np.where(g_bj, (puntate * regole.pagamento_blackjack).astype(np.int64), puntate)
+    vince = ~sbirciata & (g_tot <= 21) & ((b_tot > 21) | (g_tot > b_tot))
+    pari = ~sbirciata & (g_tot <= 21) & (g_tot == b_tot)
+    vincita = np.where(vince, premio, np.where(pari, 0, -puntate))
+    return {
+        "vincita": vincita,
+        "giocatore": g_tot,
+        "banco": b_tot,
+        "blackjack": g_bj,
+        "banco_blackjack": b_bj,
+    }
+
+def simula(n_round, politica="base", regole=None, puntata=valutatore.PUNTATA_VALUTAZIONE, seed=None,
+           blocco=BLOCCO):
+    richiedi_numpy()
+    regole = regole or bj.REGOLE_STANDARD
+    generatore = np.random.default_rng(seed)
+    tabella = tabella_politica(politica, regole)
+    totale = valutatore.Accumulatore()
+    esiti = dict.fromkeys(("vittorie", "pareggi", "sconfitte", "blackjack"), 0)
+    t0 = time.perf_counter()
+    for inizio in range(0, n_round, blocco):
+        n = min(blocco, n_round - inizio)
+        r = gioca_round(Sabot(n, regole.composizione_iniziale, generatore), n, tabella, regole, puntata)
+        x = r["vincita"] / puntata
+        totale.n += n
+        totale.somma += float(x.sum())
+        totale.somma_q += float((x * x).sum())
+        esiti["vittorie"] += int((r["vincita"] > 0).sum())
+        esiti["pareggi"] += int((r["vincita"] == 0).sum())
+        esiti["sconfitte"] += int((r["vincita"] < 0).sum())
+        esiti["blackjack"] += int(r["blackjack"].sum())
+    secondi = time.perf_counter() - t0
+    return {
+        "politica": valutatore.nome_politica(politica),
+        "mani": n_round,
+        "secondi": secondi,
+        "mani_al_secondo": n_round / secondi if secondi > 0 else float("inf"),
+        "ev": totale.media(),
+        "ic95": totale.errore(),
+        **esiti,
+    }
+
+# ===============================
+# CONFRONTO CON IL MOTORE SCALARE
+# ===============================
+
+class _SoloCartaStai(bj.Giocatore):
+    def decide_double(self, *args, **kwargs):
+        return False
+    def decide_split(self, *args, **kwargs):
+        return False
+    def decide_surrender(self, *args, **kwargs):
+        return False
+    def decide_assicurazione(self):
+        return False
+
+def confronta(n_round, politica="base", regole=None, puntata=valutatore.PUNTATA_VALUTAZIONE, seed=None):
+    # Gioca le stesse sequenze di carte con il kernel e con gioca_mano (profilo
+    # senza raddoppi, split, resa e assicurazione): le vincite devono coincidere
+    richiedi_numpy()
+    regole = regole or bj.REGOLE_STANDARD
+    generatore = np.random.default_rng(seed)
+    sabot = Sabot(n_round, regole.composizione_iniziale, generatore)
+    tutte = np.arange(n_round)
+    valori = np.stack([sabot.pesca(tutte) for _ in range(CARTE_CONFRONTO)], axis=1)
+
+    tabella = tabella_politica(politica, regole)
+    t0 = time.perf_counter()
+    vettoriale = gioca_round(SequenzaCarte(valori), n_round, tabella, regole, puntata)
+    t_vettoriale = time.perf_counter() - t0
+
+    difficolta = politica if isinstance(politica, str) else getattr(politica, "difficolta_default", "equilibrata")
+    cls = _SoloCartaStai if isinstance(politica, str) else type("SoloCartaStai", (_SoloCartaStai, politica), {})
+    g = cls("Confronto", saldo=simulazione.SALDO_SIMULAZIONE, cpu=True, difficolta=difficolta)
+    g.decide_puntata = lambda mazzo=None: puntata
+    mazzo = bj.Mazzo(regole=regole)
+    banco_bankroll_ref = [bj.BANCO_START_BANKROLL]
+    diverse = []
+    verboso = bj.VERBOSO
+    bj.imposta_verboso(False)
+    t0 = time.perf_counter()
+    try:
+        for r, riga in enumerate(valori.tolist()):
+            mazzo.mazzo = array("B", [CARTA_PER_VALORE[v] for v in reversed(riga)])  # pesca() prende dalla fine
+            mazzo.usate = 0
+            mazzo.ricalcola_conteggi()  # Conteggi per valore coerenti con il sabot sostituito
+            saldo = g.saldo
+            bj.gioca_mano(mazzo, [g], simulazione._nessun_salvataggio, [g], banco_bankroll_ref)
+            if g.saldo - saldo != vettoriale["vincita"][r]:
+                diverse.append((r, g.saldo - saldo))
+    finally:
+        bj.imposta_verboso(verboso)
+    t_scalare = time.perf_counter() - t0
+
+    return {
+        "politica": valutatore.nome_politica(politica),
+        "mani": n_round,
+        "diverse": len(diverse),
+        "esempi": [{"carte": valori[r].tolist(), "scalare": scalare, "vettoriale": int(vettoriale["vincita"][r])}
+                   for r, scalare in diverse[:5]],
+        "mani_al_secondo_scalare": n_round / t_scalare if t_scalare > 0 else float("inf"),
+        "mani_al_secondo_vettoriale": n_round / t_vettoriale if t_vettoriale > 0 else float("inf"),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Round indipendenti con il kernel vettoriale NumPy")
+    parser.add_argument("--mani", type=int, default=1_000_000)
+    parser.add_argument("--difficolta", nargs="*", choices=bj.DIFFICOLTA_CPU, default=["base"],
+                        help="profili da giocare (solo le scelte carta/stai)")
+    parser.add_argument("--politica", action="append", default=[],
+                        help="politica personalizzata come modulo:Classe (sottoclasse di Giocatore)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--confronta", action="store_true",
+                        help="verifica le vincite contro gioca_mano sulle stesse carte")
+    parser.add_argument("--json", action="store_true", help="stampa i risultati in JSON")
+    simulazione.aggiungi_argomenti_regole(parser)
+    args = parser.parse_args(argv)
+    regole = simulazione.regole_da_argomenti(args)
+    try:
+        richiedi_numpy()
+    except RuntimeError as e:
+        parser.error(str(e))
+
+    politiche = list(args.difficolta) + [valutatore.carica_politica(p) for p in args.politica]
+    if args.confronta:
+        risultati = [confronta(args.mani, p, regole, seed=args.seed) for p in politiche]
+    else:
+        risultati = [simula(args.mani, p, regole, seed=args.seed) for p in politiche]
+    if args.json:
+        print(json.dumps(risultati, indent=2))
+        return
+    print(f"📜 Regole: {regole.descrizione()}")
+    for r in risultati:
+        if args.confronta:
+            esito = "identiche" if not r["diverse"] else f"{r['diverse']:,} DIVERSE"
+            print(f"🔍 {r['politica']}: {r['mani']:,} mani, vincite {esito} "
+                  f"(scalare {r['mani_al_secondo_scalare']:,.0f} mani/s, "
+                  f"vettoriale {r['mani_al_secondo_vettoriale']:,.0f} mani/s)")
+            for e in r["esempi"]:
+                print(f"   carte {e['carte'][:12]}: scalare {e['scalare']:+}, vettoriale {e['vettoriale']:+}")
+        else:
+            print(f"🧮 {r['politica']}: EV {r['ev']*100:+.3f}% ± {r['ic95']*100:.3f}% "
+                  f"({r['mani']:,} mani, {r['mani_al_secondo']:,.0f} mani/s)")
+
+if __name__ == "__main__":
+    main()